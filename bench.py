@@ -0,0 +1,89 @@
+import argparse
+import tempfile
+import json
+from src.backends import BACKENDS
+from src.benchmark import compare_backends, generate_corpus, run_benchmark
+
+
+def compare(backends, md_dir_path, output_path, size, seed):
+    if not md_dir_path:
+        md_dir_path = tempfile.mkdtemp(prefix='tf-docset-compare-')
+        generate_corpus(md_dir_path, size, seed)
+
+    report = compare_backends(md_dir_path, backends)
+    for name, result in report.items():
+        line = '{0}: {1:.0f} pages/s'.format(name, result['pages_per_second'])
+        if 'similarity' in result:
+            line += ' | {0} identical, {1} differing, {2:.1%} similar | differing tags: {3}'.format(
+                result['identical'], result['differing'], result['similarity'],
+                ', '.join('{0} ({1})'.format(tag, count) for tag, count in result['tags']) or '-')
+        if result['unsupported']:
+            line += ' | unsupported: {0}'.format(', '.join(result['unsupported']))
+        print(line)
+        for source, ratio in result.get('worst', []):
+            print('    {0:.1%} {1}'.format(ratio, source))
+
+    if output_path:
+        with open(output_path, 'w') as f:
+            json.dump(report, f, indent=2)
+
+
+def main(sizes, output_path, jobs, seed, backends=None, md_dir_path=None):
+    if backends:
+        compare(backends, md_dir_path, output_path, sizes[0], seed)
+        return
+
+    report = run_benchmark(sizes, output_path, jobs, seed)
+    for result in report['results']:
+        stages = ', '.join('{0}: {1:.3f}s'.format(name, seconds)
+                           for name, seconds in result['stages'].items() if isinstance(seconds, float))
+        print('{0} pages: {1:.3f}s end to end ({2:.0f} pages/s) | {3}'.format(
+            result['pages'], result['end_to_end'], result['pages_per_second'], stages))
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='TF DocSet Benchmark')
+    parser.add_argument(
+        '-s',
+        '--sizes',
+        required=False,
+        default=[100, 1000, 5000],
+        nargs='+',
+        type=int,
+        help='The numbers of pages of the synthetic corpora.')
+    parser.add_argument(
+        '-o',
+        '--output_path',
+        required=False,
+        default='bench.json',
+        type=str,
+        help='The JSON file to save the results, to compare them between commits.')
+    parser.add_argument(
+        '-j',
+        '--jobs',
+        required=False,
+        default=1,
+        type=int,
+        help='The number of processes used for rendering.')
+    parser.add_argument(
+        '--seed',
+        required=False,
+        default=0,
+        type=int,
+        help='The seed of the synthetic corpus, the same seed always generates the same corpus.')
+    parser.add_argument(
+        '--backends',
+        required=False,
+        default=None,
+        nargs='+',
+        choices=list(BACKENDS),
+        help='Compares the speed and the output of these markdown backends with misaka instead, on the first size.')
+    parser.add_argument(
+        '-i',
+        '--md_dir_path',
+        required=False,
+        default=None,
+        type=str,
+        help='The markdown docs the backends are compared on (default: a synthetic corpus).')
+    args = parser.parse_args()
+    main(args.sizes, args.output_path, args.jobs, args.seed, args.backends, args.md_dir_path)
@@ -1,10 +1,21 @@
 import argparse
+from src.backends import BACKENDS
 from src.tf_manual_doc_setup import TFManualDocSetup
 
 
-def main(md_dir_path, html_dir_path, version):
-    tf_manual_doc_setup = TFManualDocSetup(md_dir_path, html_dir_path, version)
+def main(md_dir_path, html_dir_path, version, jobs, full, docset, static_math, report, profile, live, store=None,
+         watch=False, optimize=False, backend='misaka', base=None):
+    tf_manual_doc_setup = TFManualDocSetup(md_dir_path, html_dir_path, version, jobs, incremental=not full,
+                                           docset=docset, static_math=static_math,
+                                           report_path=report, profile=profile, live=live, store_path=store,
+                                           optimize=optimize, backend=backend, base_path=base)
     tf_manual_doc_setup.run()
+    if watch:
+        tf_manual_doc_setup.watch()
+
+    if tf_manual_doc_setup.store is not None:
+        removed, freed = tf_manual_doc_setup.store.gc()
+        print('{0} unreferenced files ({1:.1f} MB) removed from the store'.format(removed, freed / (1 << 20)))
 
 
 if __name__ == '__main__':
@@ -28,5 +39,72 @@ if __name__ == '__main__':
         default='',
         type=str,
         help='What version of TensorFlow do you need?')
+    parser.add_argument(
+        '-j',
+        '--jobs',
+        required=False,
+        default=1,
+        type=int,
+        help='The number of processes used for rendering the markdown docs.')
+    parser.add_argument(
+        '-f',
+        '--full',
+        action='store_true',
+        help='Renders every page again instead of only the ones changed since the previous run.')
+    parser.add_argument(
+        '--docset',
+        action='store_true',
+        help='Packs the rendered docs into a TensorFlow.docset bundle, no need to run `dashing build`.')
+    parser.add_argument(
+        '--static_math',
+        action='store_true',
+        help='Converts the formulas into MathML at build time (needs `latex2mathml`), instead of MathJax.')
+    parser.add_argument(
+        '--report',
+        required=False,
+        default=None,
+        type=str,
+        help='Saves a JSON report of the build (stage timings, slowest pages, highlighted languages) there.')
+    parser.add_argument(
+        '--profile',
+        required=False,
+        default=None,
+        choices=['cprofile', 'sampling'],
+        help='Profiles the render loop, the profile is saved next to the report.')
+    parser.add_argument(
+        '--live',
+        action='store_true',
+        help='Shows a summary while rendering and at the end of the build.')
+    parser.add_argument(
+        '--store',
+        required=False,
+        default=None,
+        type=str,
+        help='A content-addressed store shared by the HTML dirs of several versions, their identical files are '
+             'hardlinked to it instead of copied.')
+    parser.add_argument(
+        '-w',
+        '--watch',
+        action='store_true',
+        help='Keeps running after the build and renders the changed pages again whenever the markdown docs change.')
+    parser.add_argument(
+        '--optimize',
+        action='store_true',
+        help='Minifies the pages, keeps only the colored spans of the code blocks and bundles the stylesheets.')
+    parser.add_argument(
+        '--backend',
+        required=False,
+        default='misaka',
+        choices=list(BACKENDS),
+        help='The markdown engine, `markdown-it` needs `markdown-it-py` and `mdit-py-plugins`.')
+    parser.add_argument(
+        '--base',
+        required=False,
+        default=None,
+        type=str,
+        help='The HTML dir of a previous version (built with the same options), only the pages changed since then '
+             'are rendered into a new HTML dir, the others are hardlinked from it.')
     args = parser.parse_args()
-    main(args.md_dir_path, args.html_dir_path, args.version)
+    main(args.md_dir_path, args.html_dir_path, args.version, args.jobs, args.full, args.docset, args.static_math,
+         args.report, args.profile, args.live, args.store, args.watch, args.optimize, args.backend,
+         args.base)
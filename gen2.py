@@ -1,10 +1,40 @@
 import argparse
+import os
+import sys
+from src.backends import BACKENDS
+from src.scheduler import BatchScheduler
+from src.store import BlobStore
 from src.tf_auto_doc_setup import TFAutoDocSetup
 
 
-def main(dir_path, version):
-    tf_auto_doc_setup = TFAutoDocSetup(version, dir_path)
-    tf_auto_doc_setup.run()
+def collect_garbage(dir_path):
+    removed, freed = BlobStore(os.path.join(dir_path, TFAutoDocSetup.STORE_DIR)).gc()
+    print('{0} unreferenced files ({1:.1f} MB) removed from the store'.format(removed, freed / (1 << 20)))
+
+
+def main(dir_path, version, jobs, docset, static_math, report, profile, live, versions=None, concurrency=2,
+         network_slots=1, find_links=None, tf_url=None, tf_doc_url=None, store=False, optimize=False,
+         backend='misaka', base=None, cpu_slots=None):
+    if not versions:
+        tf_auto_doc_setup = TFAutoDocSetup(version, dir_path, jobs, docset, static_math, report, profile, live,
+                                           find_links=find_links, tf_url=tf_url, tf_doc_url=tf_doc_url, store=store,
+                                           optimize=optimize, backend=backend, base=base)
+        tf_auto_doc_setup.run()
+        if store:
+            collect_garbage(dir_path)
+        return
+
+    scheduler = BatchScheduler(versions, dir_path, concurrency, network_slots, jobs, cpu_slots=cpu_slots,
+                               docset=docset, static_math=static_math, report_path=report, profile=profile, live=live,
+                               find_links=find_links, tf_url=tf_url, tf_doc_url=tf_doc_url, store=store,
+                               optimize=optimize, backend=backend, base=base)
+    results = scheduler.run()
+    print('\n{0}'.format(scheduler.summary(results)))
+    # only once every build of the batch has finished writing to the store
+    if store:
+        collect_garbage(dir_path)
+    if not all(result['status'] for result in results):
+        sys.exit(1)
 
 
 if __name__ == '__main__':
@@ -22,5 +52,105 @@ if __name__ == '__main__':
         type=str,
         default='v2.0.0',
         help='What version of TensorFlow do you need?')
+    parser.add_argument(
+        '--versions',
+        required=False,
+        default=None,
+        nargs='+',
+        type=str,
+        help='Builds several versions concurrently, each installed into its own virtual environment.')
+    parser.add_argument(
+        '--concurrency',
+        required=False,
+        default=2,
+        type=int,
+        help='The maximum number of versions built at the same time (with `--versions`).')
+    parser.add_argument(
+        '--network_slots',
+        required=False,
+        default=1,
+        type=int,
+        help='The maximum number of versions downloading (pip installs and clones) at the same time.')
+    parser.add_argument(
+        '--cpu_slots',
+        required=False,
+        default=None,
+        type=int,
+        help='The CPUs shared by the versions rendering at the same time (with `--versions`), each of them takes '
+             '`--jobs` of them (default: all the CPUs).')
+    parser.add_argument(
+        '--find_links',
+        required=False,
+        default=None,
+        type=str,
+        help='Installs the packages only from the wheels in this dir, for offline builds.')
+    parser.add_argument(
+        '--tf_url',
+        required=False,
+        default=None,
+        type=str,
+        help='Where TensorFlow is cloned from, e.g. a local mirror (default: GitHub).')
+    parser.add_argument(
+        '--tf_doc_url',
+        required=False,
+        default=None,
+        type=str,
+        help='Where tensorflow-docs is installed from, e.g. a local mirror (default: GitHub).')
+    parser.add_argument(
+        '-j',
+        '--jobs',
+        required=False,
+        default=1,
+        type=int,
+        help='The number of processes used for rendering the markdown docs.')
+    parser.add_argument(
+        '--docset',
+        action='store_true',
+        help='Packs the rendered docs into a TensorFlow.docset bundle, no need to run `dashing build`.')
+    parser.add_argument(
+        '--static_math',
+        action='store_true',
+        help='Converts the formulas into MathML at build time (needs `latex2mathml`), instead of MathJax.')
+    parser.add_argument(
+        '--report',
+        required=False,
+        default=None,
+        type=str,
+        help='Saves a JSON report of the build (stage timings, slowest pages, highlighted languages) there.')
+    parser.add_argument(
+        '--profile',
+        required=False,
+        default=None,
+        choices=['cprofile', 'sampling'],
+        help='Profiles the render loop, the profile is saved next to the report.')
+    parser.add_argument(
+        '--live',
+        action='store_true',
+        help='Shows a summary while rendering and at the end of the build.')
+    parser.add_argument(
+        '--store',
+        action='store_true',
+        help='Writes the files once into a content-addressed store shared by every version (`{dir_path}/store`) '
+             'and hardlinks them into the HTML dir of each version.')
+    parser.add_argument(
+        '--optimize',
+        action='store_true',
+        help='Minifies the pages, keeps only the colored spans of the code blocks and bundles the stylesheets.')
+    parser.add_argument(
+        '--backend',
+        required=False,
+        default='misaka',
+        choices=list(BACKENDS),
+        help='The markdown engine, `markdown-it` needs `markdown-it-py` and `mdit-py-plugins`.')
+    parser.add_argument(
+        '--base',
+        required=False,
+        default=None,
+        type=str,
+        help='A version built before under the same dir (with the same options), e.g. v2.1.0: only the pages '
+             'changed since then are rendered, the others are hardlinked from its HTML dir.')
     args = parser.parse_args()
-    main(args.dir_path, args.version)
+    main(args.dir_path, args.version, args.jobs, args.docset, args.static_math, args.report,
+         args.profile, args.live, args.versions, args.concurrency, args.network_slots, args.find_links,
+         args.tf_url, args.tf_doc_url, args.store, args.optimize, args.backend, args.base,
+         args.cpu_slots)
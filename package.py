@@ -0,0 +1,61 @@
+import argparse
+import os
+from src.release import RELEASE_URL, pack_docset, write_feed
+
+
+def main(docset_path, version, output_dir, feed_path, url, threads):
+    tag = version if version.startswith('v') else 'v{0}'.format(version)
+    archive = 'tensorflow{0}.tgz'.format(tag)
+    archive_path = os.path.join(output_dir, archive)
+
+    os.makedirs(output_dir, exist_ok=True)
+    pack_docset(docset_path, archive_path, threads)
+    write_feed(feed_path, tag[1:], url.format(tag=tag, archive=archive))
+    print('{0} ({1:.1f} MB) and {2} are ready!'.format(
+        archive_path, os.path.getsize(archive_path) / (1 << 20), feed_path))
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='TF DocSet Packager')
+    parser.add_argument(
+        '-d',
+        '--docset_path',
+        required=True,
+        type=str,
+        help='The TensorFlow.docset bundle to release.')
+    parser.add_argument(
+        '-v',
+        '--version',
+        required=True,
+        type=str,
+        help='The version of TensorFlow in the DocSet, e.g. v2.1.0.')
+    parser.add_argument(
+        '-o',
+        '--output_dir',
+        required=False,
+        default='.',
+        type=str,
+        help='The dir to save the release archive.')
+    parser.add_argument(
+        '-f',
+        '--feed_path',
+        required=False,
+        default='TensorFlow.xml',
+        type=str,
+        help='The feed XML file to write.')
+    parser.add_argument(
+        '-u',
+        '--url',
+        required=False,
+        default=RELEASE_URL,
+        type=str,
+        help='The URL template of the release archive, with {tag} and {archive} placeholders.')
+    parser.add_argument(
+        '-t',
+        '--threads',
+        required=False,
+        default=None,
+        type=int,
+        help='The number of compression threads (default: the number of CPUs).')
+    args = parser.parse_args()
+    main(args.docset_path, args.version, args.output_dir, args.feed_path, args.url, args.threads)
@@ -0,0 +1,41 @@
+import argparse
+from src.server import serve
+
+
+def main(md_dir_path, host, port, cache_mb, static_math):
+    serve(md_dir_path, host, port, cache_mb << 20, static_math)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='TF Docs Server')
+    parser.add_argument(
+        '-i',
+        '--md_dir_path',
+        required=True,
+        type=str,
+        help='The root dir with generated markdown docs.')
+    parser.add_argument(
+        '--host',
+        required=False,
+        default='127.0.0.1',
+        type=str,
+        help='The address to listen on.')
+    parser.add_argument(
+        '-p',
+        '--port',
+        required=False,
+        default=8000,
+        type=int,
+        help='The port to listen on.')
+    parser.add_argument(
+        '--cache_mb',
+        required=False,
+        default=64,
+        type=int,
+        help='The maximum size of the rendered pages kept in memory, in MB.')
+    parser.add_argument(
+        '--static_math',
+        action='store_true',
+        help='Converts the formulas into MathML at build time (needs `latex2mathml`), instead of MathJax.')
+    args = parser.parse_args()
+    main(args.md_dir_path, args.host, args.port, args.cache_mb, args.static_math)
@@ -0,0 +1,145 @@
+import argparse
+from src.backends import BACKENDS
+from src.tf_sharded_doc_setup import TFShardedDocSetup
+
+
+def parse_shard(value):
+    # `K/N`, the shard K (from 0) out of N
+    try:
+        index, shards = (int(part) for part in value.split('/'))
+    except ValueError:
+        raise argparse.ArgumentTypeError('expected K/N, e.g. 0/4')
+    if not 0 <= index < shards:
+        raise argparse.ArgumentTypeError('K has to be in [0, N)')
+    return index, shards
+
+
+def main(command, md_dir_path, work_dir_path, html_dir_path=None, shards=None, shard=None, version='', jobs=1,
+         docset=False, static_math=False, optimize=False, store=None, report=None, live=False,
+         backend='misaka'):
+    tf_sharded_doc_setup = TFShardedDocSetup(md_dir_path, work_dir_path, version, jobs, docset=docset,
+                                             static_math=static_math, optimize=optimize, store_path=store,
+                                             report_path=report, live=live, backend=backend)
+    if command == 'plan':
+        tf_sharded_doc_setup.plan(shards)
+    elif command == 'render-shard':
+        tf_sharded_doc_setup.render_shard(*shard)
+    elif command == 'merge':
+        tf_sharded_doc_setup.merge(html_dir_path)
+    else:
+        tf_sharded_doc_setup.run(html_dir_path, shards)
+
+    if command in ('merge', 'local') and tf_sharded_doc_setup.store is not None:
+        removed, freed = tf_sharded_doc_setup.store.gc()
+        print('{0} unreferenced files ({1:.1f} MB) removed from the store'.format(removed, freed / (1 << 20)))
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='TF DocSet Sharded Generator')
+    subparsers = parser.add_subparsers(dest='command')
+    # not a keyword of `add_subparsers` before Python 3.7
+    subparsers.required = True
+
+    plan_parser = subparsers.add_parser(
+        'plan',
+        help='Splits the markdown docs into shards, the shards render with the options of the plan.')
+    shard_parser = subparsers.add_parser(
+        'render-shard',
+        help='Renders one shard of the plan into `{WORK_DIR_PATH}/shard-K-of-N`.')
+    merge_parser = subparsers.add_parser(
+        'merge',
+        help='Merges the rendered shards into one HTML dir.')
+    local_parser = subparsers.add_parser(
+        'local',
+        help='Plans, renders every shard in its own local process and merges them.')
+
+    for subparser in (plan_parser, shard_parser, merge_parser, local_parser):
+        subparser.add_argument(
+            '-i',
+            '--md_dir_path',
+            required=True,
+            type=str,
+            help='The root dir with generated markdown docs.')
+        subparser.add_argument(
+            '-w',
+            '--work_dir_path',
+            required=True,
+            type=str,
+            help='The dir of the plan and the rendered shards.')
+
+    for subparser in (plan_parser, local_parser):
+        subparser.add_argument(
+            '-n',
+            '--shards',
+            required=True,
+            type=int,
+            help='The number of shards.')
+        subparser.add_argument(
+            '--static_math',
+            action='store_true',
+            help='Converts the formulas into MathML at build time (needs `latex2mathml`), instead of MathJax.')
+        subparser.add_argument(
+            '--optimize',
+            action='store_true',
+            help='Minifies the pages, keeps only the colored spans of the code blocks and bundles the stylesheets.')
+        subparser.add_argument(
+            '--backend',
+            required=False,
+            default='misaka',
+            choices=list(BACKENDS),
+            help='The markdown engine, `markdown-it` needs `markdown-it-py` and `mdit-py-plugins`.')
+
+    shard_parser.add_argument(
+        'shard',
+        type=parse_shard,
+        help='The shard to render, K/N for the shard K (from 0) out of N.')
+
+    for subparser in (shard_parser, local_parser):
+        subparser.add_argument(
+            '-j',
+            '--jobs',
+            required=False,
+            default=1,
+            type=int,
+            help='The number of processes used for rendering a shard.')
+
+    for subparser in (merge_parser, local_parser):
+        subparser.add_argument(
+            '-o',
+            '--html_dir_path',
+            required=True,
+            type=str,
+            help='The root dir to save the merged HTML docs.')
+        subparser.add_argument(
+            '-v',
+            '--version',
+            required=False,
+            default='',
+            type=str,
+            help='What version of TensorFlow do you need?')
+        subparser.add_argument(
+            '--docset',
+            action='store_true',
+            help='Packs the merged docs into a TensorFlow.docset bundle, no need to run `dashing build`.')
+        subparser.add_argument(
+            '--store',
+            required=False,
+            default=None,
+            type=str,
+            help='A content-addressed store shared by the HTML dirs of several versions, their identical files are '
+                 'hardlinked to it instead of copied.')
+
+    for subparser in (shard_parser, merge_parser, local_parser):
+        subparser.add_argument(
+            '--report',
+            required=False,
+            default=None,
+            type=str,
+            help='Saves a JSON report of the build (stage timings, slowest pages, highlighted languages) there.')
+        subparser.add_argument(
+            '--live',
+            action='store_true',
+            help='Shows a summary while rendering and at the end of the build.')
+
+    args = vars(parser.parse_args())
+    main(**args)
@@ -0,0 +1,231 @@
+import collections
+import misaka
+from .utils import Highlighter
+
+try:
+    from markdown_it import MarkdownIt
+    from markdown_it.common.utils import escapeHtml
+    from mdit_py_plugins.dollarmath import dollarmath_plugin
+    from mdit_py_plugins.footnote import footnote_plugin
+except ImportError:
+    MarkdownIt = None
+
+
+class RendererBackend:
+    """ Converts the markdown of a page into HTML. The engines differ, but the code blocks, tables and formulas go
+    through the same hooks, so they look the same whatever the backend. Headers and links keep the markup of the
+    engine unless a subclass overrides `header`/`link`."""
+    NAME = None
+    available = True
+
+    def __init__(self, highlighter=None, static_math=None, extensions=()):
+        """
+        Initializing the backend.
+
+        Args:
+            highlighter (Highlighter): Highlights the code blocks (default: a new one).
+            static_math (StaticMath): If it is given, the formulas are converted into MathML while rendering.
+            extensions (:list:`str`): The markdown extensions, named after the misaka ones.
+        """
+        self.highlighter = highlighter or Highlighter()
+        self.static_math = static_math
+        self.extensions = extensions
+        self.formulas = 0
+        self.static_formulas = 0
+        self.languages = collections.Counter()
+
+    def reset(self):
+        # forgets what has been seen on the previous page
+        self.formulas = 0
+        self.static_formulas = 0
+        self.languages.clear()
+
+    def render(self, text):
+        """
+        Renders a page.
+
+        Args:
+            text (str): The markdown source.
+
+        Returns:
+            html (str): The HTML body.
+        """
+        raise NotImplementedError
+
+    def escape(self, text):
+        raise NotImplementedError
+
+    def _overrides(self, name):
+        return getattr(type(self), name) is not getattr(RendererBackend, name)
+
+    def header(self, content, level):
+        return '<h{0}>{1}</h{0}>\n'.format(level, content)
+
+    def link(self, content, link, title):
+        title = ' title="{0}"'.format(self.escape(title)) if title else ''
+        return '<a href="{0}"{1}>{2}</a>'.format(self.escape(link), title, content)
+
+    def blockcode(self, text, lang):
+        self.languages[lang or 'text'] += 1
+        return self.highlighter.highlight(text, lang)
+
+    def table(self, content):
+        return '<table class="table">\n' + content + '\n</table>'
+
+    def math(self, text, displaymode):
+        if self.static_math:
+            markup = self.static_math.render(text, displaymode)
+            if markup is not None:
+                self.static_formulas += 1
+                return markup
+
+        # the same markup as hoedown, only counted so that MathJax is included where it is needed
+        self.formulas += 1
+        if displaymode:
+            return '\\[' + self.escape(text) + '\\]'
+        return '\\(' + self.escape(text) + '\\)'
+
+
+class _MisakaRenderer(misaka.HtmlRenderer):
+
+    def __init__(self, backend, flags=0):
+        self.blockcode = backend.blockcode
+        self.table = backend.table
+        self.math = backend.math
+        # misaka only calls back into Python for the hooks the renderer has, the others run in C
+        if backend._overrides('header'):
+            self.header = backend.header
+        if backend._overrides('link'):
+            self.link = backend.link
+        super().__init__(flags)
+
+
+class MisakaBackend(RendererBackend):
+    """ Renders with misaka (hoedown, in C), the default."""
+    NAME = 'misaka'
+
+    def __init__(self, highlighter=None, static_math=None, extensions=(), flags=('hard-wrap',)):
+        """
+        Initializing the backend.
+
+        Args:
+            highlighter (Highlighter): Highlights the code blocks (default: a new one).
+            static_math (StaticMath): If it is given, the formulas are converted into MathML while rendering.
+            extensions (:list:`str`): The misaka extensions.
+            flags (:list:`str`): The misaka HTML flags.
+        """
+        super().__init__(highlighter, static_math, extensions)
+        self.markdown = misaka.Markdown(_MisakaRenderer(self, flags), extensions=extensions)
+
+    def render(self, text):
+        return self.markdown(text)
+
+    def escape(self, text):
+        return misaka.escape_html(text)
+
+
+class MarkdownItBackend(RendererBackend):
+    """ Renders with markdown-it-py (CommonMark, pure Python), the misaka extensions it has no equivalent of
+    (`UNSUPPORTED`) are left out."""
+    NAME = 'markdown-it'
+    available = MarkdownIt is not None
+    UNSUPPORTED = ('autolink', 'underline', 'highlight', 'quote', 'superscript', 'no-intra-emphasis')
+
+    def __init__(self, highlighter=None, static_math=None, extensions=()):
+        """
+        Initializing the backend.
+
+        Args:
+            highlighter (Highlighter): Highlights the code blocks (default: a new one).
+            static_math (StaticMath): If it is given, the formulas are converted into MathML while rendering.
+            extensions (:list:`str`): The misaka extensions to follow.
+
+        Raises:
+            ImportError: If `markdown-it-py` or `mdit-py-plugins` is not installed.
+        """
+        if not self.available:
+            raise ImportError('The markdown-it backend needs `pip install markdown-it-py mdit-py-plugins`')
+
+        super().__init__(highlighter, static_math, extensions)
+        # `hard-wrap`, like the misaka flags
+        md = MarkdownIt('commonmark', {'breaks': True, 'html': True})
+        if 'tables' in extensions:
+            md.enable('table')
+        if 'strikethrough' in extensions:
+            md.enable('strikethrough')
+        if 'disable-indented-code' in extensions:
+            md.disable('code')
+        if 'footnotes' in extensions:
+            md.use(footnote_plugin)
+        if 'math' in extensions:
+            # `$$...$$` within a paragraph is a display formula for hoedown too
+            md.use(dollarmath_plugin, allow_space=True, double_inline=True)
+            md.add_render_rule('math_inline', lambda r, tokens, idx, options, env: self.math(tokens[idx].content, 0))
+            md.add_render_rule('math_inline_double',
+                               lambda r, tokens, idx, options, env: self.math(tokens[idx].content, 1))
+            md.add_render_rule('math_block',
+                               lambda r, tokens, idx, options, env: '<p>{0}</p>\n'.format(
+                                   self.math(tokens[idx].content.strip(), 1)))
+        # the rules are bound to the renderer, the methods of the backend are wrapped into functions
+        md.add_render_rule('fence', lambda r, *args: self._fence(r, *args))
+        md.add_render_rule('table_open', lambda r, tokens, idx, options, env: '<table class="table">\n')
+        if self._overrides('header'):
+            md.add_render_rule('heading_open', lambda r, *args: self._heading(r, *args))
+            md.add_render_rule('heading_close', lambda r, tokens, idx, options, env: '')
+        if self._overrides('link'):
+            md.add_render_rule('link_open', lambda r, *args: self._link(r, *args))
+            md.add_render_rule('link_close', lambda r, tokens, idx, options, env: '')
+        self.markdown = md
+
+    def _fence(self, renderer, tokens, idx, options, env):
+        token = tokens[idx]
+        lang = token.info.split()[0] if token.info.strip() else ''
+        return self.blockcode(token.content, lang)
+
+    def _heading(self, renderer, tokens, idx, options, env):
+        # the whole header is rendered here, its inline content is emptied
+        inline = tokens[idx + 1]
+        content = renderer.renderInline(inline.children or [], options, env)
+        inline.children = []
+        return self.header(content, int(tokens[idx].tag[1]))
+
+    def _link(self, renderer, tokens, idx, options, env):
+        # the tokens up to the matching `link_close` are rendered here and skipped
+        close = idx + 1
+        while tokens[close].type != 'link_close':
+            close += 1
+        content = renderer.renderInline(tokens[idx + 1:close], options, env)
+        for token in tokens[idx + 1:close]:
+            token.type, token.content, token.children = 'text', '', None
+        return self.link(content, tokens[idx].attrGet('href') or '', tokens[idx].attrGet('title'))
+
+    def render(self, text):
+        return self.markdown.render(text)
+
+    def escape(self, text):
+        return escapeHtml(text)
+
+
+BACKENDS = collections.OrderedDict((backend.NAME, backend) for backend in (MisakaBackend, MarkdownItBackend))
+
+
+def create_backend(name, highlighter=None, static_math=None, extensions=()):
+    """
+    Creates a renderer backend by name.
+
+    Args:
+        name (str): One of `BACKENDS`.
+        highlighter (Highlighter): Highlights the code blocks (default: a new one).
+        static_math (StaticMath): If it is given, the formulas are converted into MathML while rendering.
+        extensions (:list:`str`): The markdown extensions, named after the misaka ones.
+
+    Raises:
+        ValueError: If there is no such backend.
+        ImportError: If the backend is not installed.
+
+    Returns:
+        backend (RendererBackend): The backend.
+    """
+    if name not in BACKENDS:
+        raise ValueError('Unknown renderer backend {0}, expected one of {1}'.format(name, ', '.join(BACKENDS)))
+    return BACKENDS[name](highlighter, static_math, extensions)
@@ -0,0 +1,324 @@
+import collections
+import difflib
+import json
+import os
+import platform
+import random
+import shutil
+import subprocess
+import tempfile
+import time
+from html.parser import HTMLParser
+from .backends import BACKENDS
+from .tf_doc_setup import TFDocSetup
+from .links import LinkIndex
+from .pipeline import OutputDirs
+
+PREAMBLE = 'page_type: reference\n<style>{% include "site-assets/css/style.css" %}</style>\n\n'
+WORDS = ('tensor', 'shape', 'graph', 'eager', 'gradient', 'layer', 'optimizer', 'dtype', 'batch', 'axis', 'kernel',
+         'variable', 'session', 'dataset', 'sparse', 'ragged', 'device', 'scope', 'random', 'loss')
+CODE_BLOCKS = (
+    ('python', 'import tensorflow as tf\n\nx = tf.constant([[1., 2.], [3., 4.]])\ny = tf.{0}(x, axis={1})\n'),
+    ('python', 'model = tf.keras.Sequential([\n    tf.keras.layers.Dense({1}, activation="relu"),\n])\n'
+               'model.compile(optimizer="adam", loss="{0}")\n'),
+    ('python', 'import tensorflow as tf\n'),
+    ('shell', 'pip install tensorflow=={1}.0\npython -c "import tensorflow as tf; print(tf.{0})"\n'),
+    ('json', '{{"name": "{0}", "shape": [{1}, {1}], "dtype": "float32"}}\n'),
+    ('c++', 'tensorflow::Tensor {0}(tensorflow::DT_FLOAT, tensorflow::TensorShape({{{1}}}));\n'),
+    ('', '{0} = {1}\n'),
+    ('unknownlang', '{0} :: {1}\n'),
+)
+FORMULAS = ('x_{{{0}}}^2 + y^2', '\\frac{{\\partial L}}{{\\partial w_{0}}}', '\\sum_{{i=1}}^{{{0}}} x_i',
+            '\\sqrt{{{0}}}')
+
+
+def _sentence(rng, words=12):
+    return ' '.join(rng.choice(WORDS) for _ in range(words)).capitalize() + '.'
+
+
+def _page(rng, name, links):
+    """
+    Writes a synthetic page shaped like the TensorFlow API docs.
+
+    Args:
+        rng (random.Random): The random generator.
+        name (str): The symbol documented by the page.
+        links (:list:`str`): The relative markdown links the page refers to.
+
+    Returns:
+        text (str): The markdown page.
+    """
+    is_module = rng.random() < 0.2
+    parts = [PREAMBLE, '# {0}{1}\n\n'.format('Module: ' if is_module else '', name)]
+    parts.append('<!-- Insert buttons and diff -->\n\n{0}\n\n'.format(_sentence(rng, 20)))
+
+    parts.append('### Aliases:\n\n' + ''.join('* `{0}.{1}`\n'.format(name, rng.choice(WORDS)) for _ in range(3)))
+    parts.append('\nSee also {0}.\n\n'.format(', '.join(
+        '[`{0}`]({1})'.format(os.path.splitext(os.path.basename(link))[0], link) for link in links)))
+
+    for _ in range(rng.randint(1, 6)):
+        lang, code = rng.choice(CODE_BLOCKS)
+        parts.append('```{0}\n{1}```\n\n'.format(lang, code.format(rng.choice(WORDS), rng.randint(1, 4))))
+        parts.append(_sentence(rng) + '\n\n')
+
+    if rng.random() < 0.5:
+        parts.append('#### Args:\n\n| Name | Description |\n|------|-------------|\n')
+        parts.extend('| `{0}` | {1} |\n'.format(rng.choice(WORDS), _sentence(rng, 8)) for _ in range(rng.randint(2, 8)))
+        parts.append('\n')
+
+    if rng.random() < 0.15:
+        parts.append('$${0}$$\n\nwhere $${1}$$ {2}\n\n'.format(
+            rng.choice(FORMULAS).format(rng.randint(1, 9)), rng.choice(FORMULAS).format('n'), _sentence(rng)))
+
+    for method in rng.sample(WORDS, rng.randint(0, 4)):
+        parts.append('<h3 id="{0}"><code>{0}</code></h3>\n\n{1}\n\n'.format(method, _sentence(rng)))
+
+    return ''.join(parts)
+
+
+def generate_corpus(md_dir_path, pages, seed=0):
+    """
+    Writes a deterministic synthetic corpus shaped like the TensorFlow API docs.
+
+    Args:
+        md_dir_path (str): The root dir of the corpus.
+        pages (int): The number of pages to write.
+        seed (int): The seed of the random generator, the same seed always writes the same corpus.
+
+    Returns:
+        sources (:list:`str`): The written pages, relative to `md_dir_path`.
+    """
+    rng = random.Random(seed)
+    modules = ['tf']
+    sources = []
+
+    while len(sources) < pages:
+        module = rng.choice(modules)
+        if rng.random() < 0.1 and module.count('/') < 4:
+            modules.append('{0}/{1}'.format(module, rng.choice(WORDS)))
+            continue
+
+        name = rng.choice(WORDS)
+        # one in ten pages collides with another one on a case insensitive filesystem
+        if rng.random() < 0.1:
+            name = name.capitalize()
+        source = '{0}/{1}.md'.format(module, name)
+        if source in sources:
+            source = '{0}/{1}_{2}.md'.format(module, name, len(sources))
+        sources.append(source)
+
+    for source in sources:
+        links = [os.path.relpath(target, os.path.dirname(source)) for target in rng.sample(sources, min(3, pages))]
+        md_file = os.path.join(md_dir_path, source)
+        os.makedirs(os.path.dirname(md_file), exist_ok=True)
+        with open(md_file, 'w') as f:
+            f.write(_page(rng, os.path.splitext(source)[0].replace('/', '.'), links))
+
+    with open(os.path.join(md_dir_path, '_toc.yaml'), 'w') as f:
+        f.write('toc:\n' + ''.join('- title: {0}\n  path: /{0}\n'.format(source) for source in sources))
+
+    return sources
+
+
+def _timed(stages, name, function, *args):
+    start = time.perf_counter()
+    result = function(*args)
+    stages[name] = stages.get(name, 0.0) + time.perf_counter() - start
+    return result
+
+
+def time_stages(doc_setup, md_dir_path, html_dir_path):
+    """
+    Times the stages of `md_to_html` one after another on a single thread.
+
+    Args:
+        doc_setup (TFDocSetup): The DocSet setup to benchmark.
+        md_dir_path (str): The root dir of the corpus.
+        html_dir_path (str): The root dir of the rendered pages.
+
+    Returns:
+        stages (dict): The stage -> seconds.
+    """
+    stages = {}
+    pages = _timed(stages, 'discovery', doc_setup._plan_pages, md_dir_path, html_dir_path)
+    doc_setup.link_index = LinkIndex({page.source: os.path.relpath(page.out_file, html_dir_path) for page in pages})
+    items = _timed(stages, 'read', lambda: [doc_setup._read_page(page) for page in pages])
+
+    renderer = doc_setup._create_renderer()
+    highlighter = renderer.highlighter
+    highlight = highlighter.highlight
+    highlighter.highlight = lambda text, lang: _timed(stages, 'highlight', highlight, text, lang)
+    rendered = _timed(stages, 'render', lambda: [doc_setup._render_page(renderer, item) for item in items])
+    # highlighting happens inside rendering, the render stage is reported without it
+    stages['render'] -= stages.get('highlight', 0.0)
+    stages['highlight_cache'] = highlighter.stats()
+
+    out_dirs = OutputDirs()
+    _timed(stages, 'write', lambda: [doc_setup._write_page(out_dirs, item) for item in rendered])
+    return stages
+
+
+class _Structure(HTMLParser):
+    """ Flattens a page into its tags (with sorted attributes) and whitespace-normalized texts."""
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.tokens = []
+
+    def handle_starttag(self, tag, attrs):
+        self.tokens.append('<{0}{1}>'.format(tag, ''.join(' {0}="{1}"'.format(*attr) for attr in sorted(attrs))))
+
+    def handle_endtag(self, tag):
+        self.tokens.append('</{0}>'.format(tag))
+
+    def handle_data(self, data):
+        text = ' '.join(data.split())
+        if text:
+            self.tokens.append(text)
+
+
+def _structure(html):
+    parser = _Structure()
+    parser.feed(html)
+    parser.close()
+    return parser.tokens
+
+
+def _tag(token):
+    # `<table class="table">` -> `table`, the texts are reported as `#text`
+    return token.strip('</>').split(' ')[0] if token.startswith('<') else '#text'
+
+
+def compare_backends(md_dir_path, backends=None, reference='misaka', worst=10):
+    """
+    Renders the same markdown tree with every backend, in-process, and compares their speed and their output with
+    the one of the reference backend. The pages are compared on their structure (tags, attributes and texts), so the
+    differences of whitespace between the engines do not count.
+
+    Args:
+        md_dir_path (str): The root dir of the markdown docs, e.g. a corpus of `generate_corpus`.
+        backends (:list:`str`): The backends to compare (default: every installed one).
+        reference (str): The backend the others are compared with.
+        worst (int): The number of most differing pages reported per backend.
+
+    Raises:
+        Exception: If a backend is unknown or not installed.
+
+    Returns:
+        report (dict): The backend -> speed, identical pages, mean similarity, most differing tags and pages.
+    """
+    backends = list(backends or [name for name, backend in BACKENDS.items() if backend.available])
+    if reference not in backends:
+        backends.insert(0, reference)
+    for name in backends:
+        if name not in BACKENDS or not BACKENDS[name].available:
+            raise Exception('The {0} backend is unknown or not installed'.format(name))
+
+    doc_setup = TFDocSetup()
+    pages = doc_setup._plan_pages(md_dir_path, '')
+    doc_setup.link_index = LinkIndex({page.source: page.out_file for page in pages})
+    items = [doc_setup._read_page(page) for page in pages]
+
+    outputs = {}
+    report = {}
+    for name in backends:
+        doc_setup.backend = name
+        # an untimed pass loads the lexers and the modules, whichever backend comes first
+        warm_up = doc_setup._create_renderer()
+        for item in items[:50]:
+            doc_setup._render_page(warm_up, item)
+
+        renderer = doc_setup._create_renderer()
+        start = time.perf_counter()
+        rendered = [doc_setup._render_page(renderer, item) for item in items]
+        seconds = time.perf_counter() - start
+        # the bodies, the template around them is the same for every backend
+        outputs[name] = [_structure(parts[1].decode('utf-8')) for _, parts, _ in rendered]
+        report[name] = {
+            'seconds': seconds,
+            'pages_per_second': len(items) / seconds if seconds else None,
+            'unsupported': [extension for extension in getattr(BACKENDS[name], 'UNSUPPORTED', ())
+                            if extension in doc_setup.MD_EXTENSIONS],
+        }
+
+    for name in backends:
+        if name == reference:
+            continue
+        ratios = []
+        tags = collections.Counter()
+        for page, expected, actual in zip(pages, outputs[reference], outputs[name]):
+            matcher = difflib.SequenceMatcher(None, expected, actual, autojunk=False)
+            ratios.append((matcher.ratio(), page.source))
+            for opcode, i1, i2, j1, j2 in matcher.get_opcodes():
+                if opcode != 'equal':
+                    tags.update(_tag(token) for token in expected[i1:i2] + actual[j1:j2])
+
+        report[name].update({
+            'identical': sum(1 for ratio, _ in ratios if ratio == 1.0),
+            'differing': sum(1 for ratio, _ in ratios if ratio < 1.0),
+            'similarity': sum(ratio for ratio, _ in ratios) / len(ratios) if ratios else 1.0,
+            'tags': tags.most_common(10),
+            'worst': [(source, ratio) for ratio, source in sorted(ratios)[:worst] if ratio < 1.0],
+        })
+
+    return report
+
+
+def _git_commit():
+    try:
+        return subprocess.check_output(['git', 'rev-parse', 'HEAD'], stderr=subprocess.DEVNULL).decode().strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run_benchmark(sizes, output_path=None, jobs=1, seed=0):
+    """
+    Times `md_to_html` end to end and stage by stage on synthetic corpora of several sizes.
+
+    Args:
+        sizes (:list:`int`): The numbers of pages of the corpora.
+        output_path (str): If it is given, the results are saved there as JSON.
+        jobs (int): The number of processes used by the end to end run.
+        seed (int): The seed of the corpus generator.
+
+    Returns:
+        report (dict): The environment and the results of every size.
+    """
+    report = {
+        'commit': _git_commit(),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'cpus': os.cpu_count(),
+        'jobs': jobs,
+        'seed': seed,
+        'results': [],
+    }
+
+    for size in sizes:
+        work_dir = tempfile.mkdtemp(prefix='tf-docset-bench-')
+        try:
+            md_dir_path = os.path.join(work_dir, 'md')
+            generate_corpus(md_dir_path, size, seed)
+            doc_setup = TFDocSetup()
+
+            start = time.perf_counter()
+            doc_setup.md_to_html(md_dir_path, os.path.join(work_dir, 'html'), jobs=jobs)
+            end_to_end = time.perf_counter() - start
+
+            stages = time_stages(doc_setup, md_dir_path, os.path.join(work_dir, 'html-stages'))
+            report['results'].append({
+                'pages': size,
+                'markdown_bytes': sum(os.path.getsize(os.path.join(root, filename))
+                                      for root, _, filenames in os.walk(md_dir_path) for filename in filenames),
+                'end_to_end': end_to_end,
+                'pages_per_second': size / end_to_end if end_to_end else None,
+                'stages': stages,
+            })
+        finally:
+            shutil.rmtree(work_dir, ignore_errors=True)
+
+    if output_path:
+        with open(output_path, 'w') as f:
+            json.dump(report, f, indent=2)
+
+    return report
@@ -0,0 +1,93 @@
+import hashlib
+import json
+import os
+
+
+def fingerprint(*inputs):
+    """
+    Computes the fingerprint of the inputs of a stage.
+
+    Args:
+        inputs: JSON-serializable values (paths, versions, configurations, ...).
+
+    Returns:
+        digest (str): The hex digest of the inputs.
+    """
+    return hashlib.sha1(json.dumps(inputs, sort_keys=True).encode('utf-8')).hexdigest()
+
+
+class Checkpoints:
+    """ Records the completed stages of a build along with the fingerprint of their inputs, so a re-run only runs
+    the stages whose inputs have changed, whose outputs are gone, or which come after such a stage."""
+
+    def __init__(self, path, stages):
+        """
+        Initializing the checkpoints.
+
+        Args:
+            path (str): The JSON file of the checkpoints.
+            stages (:list:`str`): The stages in the order they run.
+        """
+        self.path = path
+        self.stages = list(stages)
+        self.completed = {}
+        if os.path.exists(path):
+            try:
+                with open(path) as f:
+                    self.completed = json.load(f)
+            except ValueError:
+                # a damaged file costs a full build, not a failed one
+                pass
+
+    def save(self):
+        """
+        Writes the checkpoints atomically.
+
+        Returns:
+            None
+        """
+        tmp_path = self.path + '.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump(self.completed, f, indent=1, sort_keys=True)
+        os.replace(tmp_path, self.path)
+
+    def is_done(self, stage, digest):
+        """
+        Checks if a stage has completed with the same inputs.
+
+        Args:
+            stage (str): The stage.
+            digest (str): The fingerprint of its current inputs.
+
+        Returns:
+            done (bool)
+        """
+        return self.completed.get(stage) == digest
+
+    def start(self, stage):
+        """
+        Forgets a stage and the ones after it before it runs, their outputs are not valid from now on.
+
+        Args:
+            stage (str): The stage.
+
+        Returns:
+            None
+        """
+        for later in self.stages[self.stages.index(stage):]:
+            self.completed.pop(later, None)
+        self.save()
+
+    def done(self, stage, digest):
+        """
+        Records a completed stage.
+
+        Args:
+            stage (str): The stage.
+            digest (str): The fingerprint of the inputs it has completed with.
+
+        Returns:
+            None
+        """
+        self.completed[stage] = digest
+        self.save()
@@ -0,0 +1,134 @@
+import html
+import os
+import plistlib
+import re
+import shutil
+import sqlite3
+
+# the same selectors `dashing.json` hands to the dashing generator, applied while the page is still in memory
+H1_PATTERN = re.compile(r'<h1[^>]*>(.*?)</h1>', re.S)
+H3_ID_PATTERN = re.compile(r'<h3[^>]*\sid="([^"]+)"')
+TAG_PATTERN = re.compile(r'<[^>]+>')
+MODULE_PREFIX = 'Module: '
+IGNORED_NAMES = {'Aliases:', '', 'References', 'Arguments', 'Returns'}
+
+
+def extract_symbols(rendered):
+    """
+    Collects the search index entries of a rendered page.
+
+    Args:
+        rendered (str): The rendered HTML page.
+
+    Returns:
+        symbols (:list:`list`): The [name, type, anchor] entries, where anchor is None for the page itself.
+    """
+    symbols = []
+
+    match = H1_PATTERN.search(rendered)
+    if match:
+        name = html.unescape(TAG_PATTERN.sub('', match.group(1))).strip()
+        if name.startswith(MODULE_PREFIX):
+            symbols.append([name[len(MODULE_PREFIX):], 'Module', None])
+        elif name not in IGNORED_NAMES:
+            symbols.append([name, 'Function', None])
+
+    for anchor in H3_ID_PATTERN.findall(rendered):
+        name = html.unescape(anchor)
+        if name not in IGNORED_NAMES:
+            symbols.append([name, 'Method', anchor])
+
+    return symbols
+
+
+class DocSetBuilder:
+    """ Writes the Dash/Zeal `.docset` bundle out of the rendered HTML tree, without the dashing generator."""
+    IGNORED_FILES = ('dashing.json', 'manifest.json', 'broken_links.json', '*.tmp')
+
+    def __init__(self, html_dir_path, docset_path, config, copy=shutil.copy2):
+        """
+        Initializing the DocSet builder.
+
+        Args:
+            html_dir_path (str): The root dir of the rendered HTML files.
+            docset_path (str): The `.docset` bundle to write.
+            config (dict): The dashing configuration (name, package, index, externalURL and icons).
+            copy (callable): Copies a document into the bundle, like `shutil.copy2`.
+        """
+        self.html_dir_path = html_dir_path
+        self.docset_path = docset_path
+        self.config = config
+        self.copy = copy
+        self.contents_path = os.path.join(docset_path, 'Contents')
+        self.resources_path = os.path.join(self.contents_path, 'Resources')
+        self.documents_path = os.path.join(self.resources_path, 'Documents')
+
+    def _write_info_plist(self):
+        info = {
+            'CFBundleIdentifier': self.config['package'],
+            'CFBundleName': self.config['name'],
+            'DocSetPlatformFamily': self.config['package'],
+            'dashIndexFilePath': self.config['index'],
+            'DashDocSetFallbackURL': self.config.get('externalURL', ''),
+            'isDashDocset': True,
+            'isJavaScriptEnabled': True,
+        }
+        with open(os.path.join(self.contents_path, 'Info.plist'), 'wb') as f:
+            plistlib.dump(info, f)
+
+    def _copy_icons(self):
+        for key, name in (('icon16x16', 'icon.png'), ('icon32x32', 'icon@2x.png')):
+            icon_path = os.path.join(self.html_dir_path, self.config.get(key, ''))
+            if self.config.get(key) and os.path.isfile(icon_path):
+                shutil.copy(icon_path, os.path.join(self.docset_path, name))
+
+    def _write_index(self, symbols):
+        """
+        Fills `docSet.dsidx` in a single transaction and creates the index once all the rows are there.
+
+        Args:
+            symbols (iterable): The (name, type, path) entries.
+
+        Returns:
+            rows (int): The number of indexed entries.
+        """
+        index_path = os.path.join(self.resources_path, 'docSet.dsidx')
+        if os.path.exists(index_path):
+            os.remove(index_path)
+
+        # the unique index would reject duplicated entries, so they are dropped up front
+        rows = list(dict.fromkeys(tuple(symbol) for symbol in symbols))
+
+        connection = sqlite3.connect(index_path)
+        try:
+            connection.execute('PRAGMA journal_mode = OFF')
+            connection.execute('PRAGMA synchronous = OFF')
+            with connection:
+                connection.execute(
+                    'CREATE TABLE searchIndex(id INTEGER PRIMARY KEY, name TEXT, type TEXT, path TEXT)')
+                connection.executemany('INSERT INTO searchIndex(name, type, path) VALUES (?, ?, ?)', rows)
+                connection.execute('CREATE UNIQUE INDEX anchor ON searchIndex (name, type, path)')
+        finally:
+            connection.close()
+
+        return len(rows)
+
+    def build(self, symbols):
+        """
+        Writes the whole bundle: Info.plist, Documents, icons and the search index.
+
+        Args:
+            symbols (iterable): The (name, type, path) entries, path being relative to the HTML root.
+
+        Returns:
+            rows (int): The number of indexed entries.
+        """
+        if os.path.exists(self.docset_path):
+            shutil.rmtree(self.docset_path)
+
+        os.makedirs(self.resources_path)
+        shutil.copytree(self.html_dir_path, self.documents_path, ignore=shutil.ignore_patterns(*self.IGNORED_FILES),
+                        copy_function=self.copy)
+        self._write_info_plist()
+        self._copy_icons()
+        return self._write_index(symbols)
@@ -0,0 +1,63 @@
+import collections
+
+try:
+    from latex2mathml.converter import convert as latex_to_mathml
+except ImportError:
+    latex_to_mathml = None
+
+
+class StaticMath:
+    """ Converts TeX formulas into MathML at build time, so the pages need no client-side typesetting."""
+    available = latex_to_mathml is not None
+
+    def __init__(self, cache_size=4096):
+        """
+        Initializing the converter.
+
+        Args:
+            cache_size (int): The maximum number of converted formulas kept in the LRU cache.
+        """
+        self.cache_size = cache_size
+        self.cache = collections.OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def _convert(self, text, displaymode):
+        if not self.available:
+            return None
+
+        try:
+            markup = latex_to_mathml(text, display='block' if displaymode else 'inline')
+        except Exception:
+            return None
+
+        # commands latex2mathml does not know are copied as they are, MathJax renders those better
+        if '>\\' in markup:
+            return None
+
+        return markup
+
+    def render(self, text, displaymode):
+        """
+        Converts a formula.
+
+        Args:
+            text (str): The TeX source of the formula.
+            displaymode (int): If it is not 0, the formula is a display (block) one.
+
+        Returns:
+            markup (str): The MathML markup or None if the formula could not be converted.
+        """
+        key = (text, bool(displaymode))
+        if key in self.cache:
+            self.hits += 1
+            self.cache.move_to_end(key)
+            return self.cache[key]
+
+        self.misses += 1
+        markup = self._convert(text, displaymode)
+        self.cache[key] = markup
+        if len(self.cache) > self.cache_size:
+            self.cache.popitem(last=False)
+
+        return markup
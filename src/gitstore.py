@@ -0,0 +1,119 @@
+import os
+import shutil
+import subprocess
+import threading
+from .utils import run_task
+
+# mirror path -> lock, the builds of several versions share a mirror and git does not like concurrent fetches
+_LOCKS = {}
+_LOCKS_LOCK = threading.Lock()
+
+
+def _lock(path):
+    with _LOCKS_LOCK:
+        return _LOCKS.setdefault(os.path.abspath(path), threading.Lock())
+
+
+class GitMirror:
+    """ A local bare mirror shared by the builds of every version, checked out as shallow and sparse worktrees."""
+    REF_PREFIX = 'refs/versions/'
+
+    def __init__(self, path, url):
+        """
+        Initializing the mirror, it is created on the first fetch.
+
+        Args:
+            path (str): The bare repository, e.g. `{dir_path}/tensorflow.git`.
+            url (str): The upstream repository.
+        """
+        self.path = path
+        self.url = url
+
+    def _git(self, *args, cwd=None):
+        """
+        Runs a quick git command, the long ones (fetches) go through `run_task` to show their progress.
+
+        Returns:
+            status (bool)
+        """
+        cmd = ['git'] + list(args) if cwd else ['git', '--git-dir={0}'.format(self.path)] + list(args)
+        return subprocess.call(cmd, cwd=cwd, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL) == 0
+
+    def _rev_parse(self, rev, cwd=None):
+        cmd = ['git', 'rev-parse', rev] if cwd else ['git', '--git-dir={0}'.format(self.path), 'rev-parse', rev]
+        return subprocess.run(cmd, cwd=cwd, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL).stdout.strip()
+
+    def _ensure(self):
+        if not os.path.exists(os.path.join(self.path, 'HEAD')):
+            os.makedirs(self.path, exist_ok=True)
+            if not self._git('init', '--bare', '--quiet'):
+                return False
+        # the url may have changed since the mirror has been created, e.g. to a local mirror
+        self._git('remote', 'remove', 'origin')
+        return self._git('remote', 'add', 'origin', self.url)
+
+    def fetch(self, ref):
+        """
+        Fetches the single commit of a tag or branch, without its history and (if the server can filter) blobs.
+
+        Args:
+            ref (str): The tag or branch, e.g. `v2.0.0`.
+
+        Returns:
+            status (bool)
+        """
+        with _lock(self.path):
+            if self._git('rev-parse', '--verify', '--quiet', self.REF_PREFIX + ref):
+                return True
+
+            if not self._ensure():
+                return False
+
+            _, status = run_task(['git', '--git-dir={0}'.format(self.path), 'fetch', '--progress', '--no-tags',
+                                  '--depth', '1', '--filter=blob:none', 'origin',
+                                  '+{0}:{1}{0}'.format(ref, self.REF_PREFIX)])
+            return status
+
+    def checkout(self, ref, worktree_path, sparse_paths):
+        """
+        Checks a fetched ref out as a worktree which only contains the given paths.
+
+        Args:
+            ref (str): The tag or branch, e.g. `v2.0.0`.
+            worktree_path (str): Where it is checked out, it is replaced if it is a stale checkout.
+            sparse_paths (:list:`str`): The dirs checked out (with the files at the top of the repository).
+
+        Returns:
+            status (bool)
+        """
+        with _lock(self.path):
+            commit = self._rev_parse(self.REF_PREFIX + ref + '^{commit}')
+            head = self._rev_parse('HEAD', cwd=worktree_path) if os.path.isdir(worktree_path) else None
+            if commit and commit == head:
+                return True
+
+            if os.path.exists(worktree_path):
+                shutil.rmtree(worktree_path)
+            self._git('worktree', 'prune')
+
+            return (self._git('worktree', 'add', '--no-checkout', '--detach', os.path.abspath(worktree_path),
+                              self.REF_PREFIX + ref)
+                    and self._git('sparse-checkout', 'set', *sparse_paths, cwd=worktree_path)
+                    and self._git('checkout', '--quiet', cwd=worktree_path))
+
+    def clean(self, paths):
+        """
+        Removes old checkouts (e.g. the full clones of the previous attempts) and forgets their worktrees.
+
+        Args:
+            paths (:list:`str`): The dirs to remove.
+
+        Returns:
+            None
+        """
+        for path in paths:
+            shutil.rmtree(path, ignore_errors=True)
+
+        if os.path.exists(os.path.join(self.path, 'HEAD')):
+            with _lock(self.path):
+                self._git('worktree', 'prune')
@@ -0,0 +1,229 @@
+import collections
+import contextlib
+import cProfile
+import heapq
+import io
+import json
+import os
+import pstats
+import sys
+import threading
+import time
+
+
+class Sampler:
+    """ A tiny sampling profiler: it periodically records the stacks of the other threads of the process."""
+    IDLE_FILES = ('threading.py', 'queue.py', 'selectors.py')
+
+    def __init__(self, interval=0.005, depth=30):
+        """
+        Initializing the sampler.
+
+        Args:
+            interval (float): The seconds between two samples.
+            depth (int): The maximum number of frames kept per stack.
+        """
+        self.interval = interval
+        self.depth = depth
+        self.stacks = collections.Counter()
+        self.samples = 0
+        self._stop = threading.Event()
+        self._thread = None
+
+    def _sample(self):
+        own = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == own:
+                    continue
+
+                # threads blocked on a lock/queue are idle, not slow
+                if os.path.basename(frame.f_code.co_filename) in self.IDLE_FILES:
+                    continue
+
+                stack = []
+                while frame is not None and len(stack) < self.depth:
+                    code = frame.f_code
+                    stack.append('{0}:{1}'.format(os.path.basename(code.co_filename), code.co_name))
+                    frame = frame.f_back
+
+                self.stacks[';'.join(reversed(stack))] += 1
+            self.samples += 1
+
+    def start(self):
+        self._thread = threading.Thread(target=self._sample, daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+    def save(self, path):
+        """
+        Writes the stacks in the collapsed format most flame graph tools read.
+
+        Args:
+            path (str): The output file.
+
+        Returns:
+            None
+        """
+        with open(path, 'w') as f:
+            for stack, count in self.stacks.most_common():
+                f.write('{0} {1}\n'.format(stack, count))
+
+    def summary(self, top=20):
+        # the functions (leaf frames) the samples have been taken in
+        leaves = collections.Counter()
+        for stack, count in self.stacks.items():
+            leaves[stack.rsplit(';', 1)[-1]] += count
+        return {'samples': self.samples, 'interval': self.interval, 'top': leaves.most_common(top)}
+
+
+class BuildStats:
+    """ Collects the timings of a build: per stage, per page and per highlighted language."""
+
+    def __init__(self, slowest=20, live=False, profile=None, profile_path=None):
+        """
+        Initializing the statistics.
+
+        Args:
+            slowest (int): The number of slowest pages kept in the report.
+            live (bool): If it is True, a summary is shown on the progress bar while rendering.
+            profile (str): The profiler wrapped around the render loop, `cprofile` or `sampling` (default: none).
+            profile_path (str): Where the profile is saved, a pstats file for `cprofile`, collapsed stacks for
+                `sampling`.
+        """
+        self.slowest = slowest
+        self.live = live
+        self.profile = profile
+        self.profile_path = profile_path
+        self.stages = collections.OrderedDict()
+        self.pages = []
+        self.languages = collections.Counter()
+        self.render_seconds = 0.0
+        self.output_bytes = 0
+        # the output size without the optimizations of the build, see `TFDocSetup.md_to_html`
+        self.raw_bytes = 0
+        self.profile_summary = None
+        self.lock = threading.Lock()
+
+    @contextlib.contextmanager
+    def stage(self, name):
+        """
+        Times a stage of the build, the time of a stage run several times adds up.
+
+        Args:
+            name (str): The name of the stage.
+        """
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            with self.lock:
+                self.stages[name] = self.stages.get(name, 0.0) + time.perf_counter() - start
+
+    @contextlib.contextmanager
+    def profiling(self):
+        """
+        Runs the configured profiler, if any, around a block.
+        """
+        if self.profile == 'sampling':
+            sampler = Sampler()
+            sampler.start()
+            try:
+                yield None
+            finally:
+                sampler.stop()
+                self.profile_summary = sampler.summary()
+                if self.profile_path:
+                    sampler.save(self.profile_path)
+        elif self.profile == 'cprofile':
+            profiler = cProfile.Profile()
+            try:
+                yield profiler
+            finally:
+                stream = io.StringIO()
+                pstats.Stats(profiler, stream=stream).sort_stats('cumulative').print_stats(30)
+                self.profile_summary = stream.getvalue()
+                if self.profile_path:
+                    profiler.dump_stats(self.profile_path)
+        else:
+            yield None
+
+    def add_page(self, source, seconds, size, languages=None, raw_size=None):
+        """
+        Records a rendered page.
+
+        Args:
+            source (str): The source path of the page.
+            seconds (float): The time taken to render it.
+            size (int): The size of its output in bytes.
+            languages (dict): The language -> number of highlighted code blocks.
+            raw_size (int): The size its output would have without the optimizations (default: `size`).
+
+        Returns:
+            None
+        """
+        with self.lock:
+            self.pages.append((seconds, size, source))
+            self.languages.update(languages or {})
+            self.render_seconds += seconds
+            self.output_bytes += size
+            self.raw_bytes += size if raw_size is None else raw_size
+
+    def postfix(self):
+        # the live summary shown on the progress bar
+        if not self.pages:
+            return {}
+        return {'avg_ms': '{0:.1f}'.format(1000 * self.render_seconds / len(self.pages)),
+                'out_mb': '{0:.1f}'.format(self.output_bytes / (1 << 20))}
+
+    def summary(self, top=5):
+        """
+        Formats the stages and the slowest pages in a few human-readable lines.
+
+        Args:
+            top (int): The number of slowest pages listed.
+
+        Returns:
+            summary (str): The summary.
+        """
+        lines = ['{0:>16}: {1:.2f}s'.format(name, seconds) for name, seconds in self.stages.items()]
+        lines.extend('{0:>16}: {1:.0f}ms {2}'.format('slow page', 1000 * seconds, source)
+                     for seconds, _, source in heapq.nlargest(top, self.pages))
+        return '\n'.join(lines)
+
+    def report(self):
+        """
+        Summarizes the build.
+
+        Returns:
+            report (dict): The machine-readable report.
+        """
+        return {
+            'stages': dict(self.stages),
+            'pages': {
+                'count': len(self.pages),
+                'render_seconds': self.render_seconds,
+                'output_bytes': self.output_bytes,
+                'raw_bytes': self.raw_bytes,
+                'slowest': [{'source': source, 'seconds': seconds, 'bytes': size}
+                            for seconds, size, source in heapq.nlargest(self.slowest, self.pages)],
+            },
+            'highlighted_blocks': dict(self.languages.most_common()),
+            'profile': self.profile_summary,
+        }
+
+    def save(self, report_path):
+        """
+        Writes the report as JSON.
+
+        Args:
+            report_path (str): The report file.
+
+        Returns:
+            None
+        """
+        with open(report_path, 'w') as f:
+            json.dump(self.report(), f, indent=2)
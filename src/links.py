@@ -0,0 +1,100 @@
+import os
+import posixpath
+import re
+from urllib.parse import unquote
+
+HREF_PATTERN = re.compile(r'(\shref=")([^"]*)(")')
+SCHEME_PATTERN = re.compile(r'^[a-zA-Z][a-zA-Z0-9+.-]*:')
+
+
+def to_posix(path):
+    return path.replace(os.sep, '/')
+
+
+class LinkIndex:
+    """ Maps every markdown source to its final HTML output, so links are rewritten to the pages actually written."""
+
+    def __init__(self, outputs):
+        """
+        Initializing the index.
+
+        Args:
+            outputs (dict): The source path -> output path, both relative to their roots.
+        """
+        self.outputs = {to_posix(source): to_posix(output) for source, output in outputs.items()}
+
+    def resolve(self, source, href):
+        """
+        Resolves the markdown target of a link.
+
+        Args:
+            source (str): The source path of the page holding the link.
+            href (str): The href of the link.
+
+        Returns:
+            target (str): The source path the link points to or None if it does not point to a markdown page.
+            suffix (str): The query/fragment of the link.
+        """
+        if not href or href.startswith(('#', '//')) or SCHEME_PATTERN.match(href):
+            return None, ''
+
+        split = min((i for i in (href.find('#'), href.find('?')) if i >= 0), default=len(href))
+        path, suffix = href[:split], href[split:]
+        if not path.endswith('.md'):
+            return None, ''
+
+        path = unquote(path)
+        if path.startswith('/'):
+            target = posixpath.normpath(path.lstrip('/'))
+        else:
+            target = posixpath.normpath(posixpath.join(posixpath.dirname(to_posix(source)), path))
+        return target, suffix
+
+    def rewrite(self, source, rendered):
+        """
+        Rewrites the href of every link to a markdown page in a single pass.
+
+        Args:
+            source (str): The source path of the rendered page.
+            rendered (str): The rendered HTML page.
+
+        Returns:
+            rendered (str): The rendered HTML page with the rewritten links.
+            links (:list:`str`): The source paths of the pages it links to.
+            broken (:list:`str`): The source paths it links to which are not in the index.
+        """
+        page_dir = posixpath.dirname(self.outputs.get(to_posix(source), to_posix(source)))
+        links, broken = set(), set()
+
+        def replace(match):
+            target, suffix = self.resolve(source, match.group(2))
+            if target is None:
+                return match.group(0)
+
+            output = self.outputs.get(target)
+            if output is None:
+                broken.add(target)
+                # keeps pointing to where the page would be, if it existed
+                href = match.group(2)
+                href = href[:len(href) - len(suffix) - len('.md')] + '.html' + suffix
+            else:
+                links.add(target)
+                href = posixpath.relpath(output, page_dir or '.') + suffix
+
+            return match.group(1) + href + match.group(3)
+
+        rendered = HREF_PATTERN.sub(replace, rendered)
+        return rendered, sorted(links), sorted(broken)
+
+    def changed(self, record):
+        """
+        Checks if the links of a previously rendered page point somewhere else now.
+
+        Args:
+            record (dict): The manifest record of the page.
+
+        Returns:
+            changed (bool): True if a linked page is gone or a broken link can be resolved now.
+        """
+        return (any(target not in self.outputs for target in record.get('links', ()))
+                or any(target in self.outputs for target in record.get('broken', ())))
@@ -0,0 +1,145 @@
+import hashlib
+import json
+import os
+
+
+def file_hash(file_path, block_size=1 << 20):
+    """
+    Computes the content hash of a file.
+
+    Args:
+        file_path (str): The file to hash.
+        block_size (int): The number of bytes read at once.
+
+    Returns:
+        digest (str): The hex digest of the file content.
+    """
+    digest = hashlib.sha1()
+    with open(file_path, 'rb') as f:
+        for block in iter(lambda: f.read(block_size), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def tree_hash(dir_path):
+    """
+    Computes a single hash over the names and contents of every file in a dir.
+
+    Args:
+        dir_path (str): The root dir to hash.
+
+    Returns:
+        digest (str): The hex digest of the whole tree.
+    """
+    digest = hashlib.sha1()
+    for root, dirnames, filenames in os.walk(dir_path):
+        dirnames.sort()
+        for filename in sorted(filenames):
+            if filename.startswith('.'):
+                continue
+
+            file_path = os.path.join(root, filename)
+            digest.update(os.path.relpath(file_path, dir_path).encode('utf-8'))
+            digest.update(file_hash(file_path).encode('utf-8'))
+    return digest.hexdigest()
+
+
+class Manifest:
+    """ Records what every rendered page was built from, so that unchanged pages can be skipped on the next run."""
+
+    def __init__(self, config='', pages=None, assets=''):
+        """
+        Initializing the manifest.
+
+        Args:
+            config (str): The hash of the renderer/asset configuration.
+            pages (dict): The source path (relative to the markdown root) -> page record.
+            assets (str): The hash of the copied assets.
+        """
+        self.config = config
+        self.pages = pages or {}
+        self.assets = assets
+
+    @classmethod
+    def load(cls, manifest_path):
+        """
+        Reads the manifest of a previous run.
+
+        Args:
+            manifest_path (str): The manifest file.
+
+        Returns:
+            manifest (Manifest): The previous manifest or None if there is no usable one.
+        """
+        if not os.path.exists(manifest_path):
+            return None
+
+        try:
+            with open(manifest_path) as f:
+                manifest = json.load(f)
+        except ValueError:
+            return None
+
+        return cls(manifest.get('config', ''), manifest.get('pages', {}), manifest.get('assets', ''))
+
+    def save(self, manifest_path):
+        """
+        Writes the manifest atomically, so an interrupted run never leaves a truncated one behind.
+
+        Args:
+            manifest_path (str): The manifest file.
+
+        Returns:
+            None
+        """
+        tmp_path = manifest_path + '.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump({'config': self.config, 'pages': self.pages, 'assets': self.assets}, f, indent=1, sort_keys=True)
+        os.replace(tmp_path, manifest_path)
+
+    def is_fresh(self, source, md_file, out_file):
+        """
+        Checks if a page has been rendered from the current content of its source.
+
+        Args:
+            source (str): The source path relative to the markdown root.
+            md_file (str): The markdown source file.
+            out_file (str): The HTML output file.
+
+        Returns:
+            fresh (bool): True if the page does not need to be rendered again.
+        """
+        record = self.pages.get(source)
+        if not record or not os.path.exists(out_file):
+            return False
+
+        stat = os.stat(md_file)
+        if record.get('size') == stat.st_size and record.get('mtime') == stat.st_mtime_ns:
+            return True
+
+        # touched but maybe not changed, the hash has the final say
+        if record.get('hash') != file_hash(md_file):
+            return False
+
+        record['size'], record['mtime'] = stat.st_size, stat.st_mtime_ns
+        return True
+
+    def record(self, source, md_file, output, info=None):
+        """
+        Records a rendered page.
+
+        Args:
+            source (str): The source path relative to the markdown root.
+            md_file (str): The markdown source file.
+            output (str): The output path relative to the HTML root.
+            info (dict): What has been collected while rendering the page (content hash, symbols, links, ...).
+
+        Returns:
+            None
+        """
+        record = dict(info or {})
+        stat = os.stat(md_file)
+        record['hash'] = record.get('hash') or file_hash(md_file)
+        record['size'], record['mtime'] = stat.st_size, stat.st_mtime_ns
+        record['output'] = output
+        self.pages[source] = record
@@ -0,0 +1,59 @@
+import re
+
+# the whitespace of these is kept as it is
+PRESERVED_PATTERN = re.compile(r'(<(pre|textarea|script)\b.*?</\2>)', re.S | re.I)
+COMMENT_PATTERN = re.compile(r'<!--.*?-->', re.S)
+WHITESPACE_PATTERN = re.compile(r'\s+')
+# the whitespace around block tags is not rendered, unlike the one around inline tags
+BLOCK_TAG_PATTERN = re.compile(
+    r'\s*(</?(?:address|blockquote|br|dd|div|dl|dt|h[1-6]|hr|li|link|ol|p|section|table|tbody|td|tfoot|th|thead|'
+    r'tr|ul)\b[^>]*>)\s*', re.I)
+
+CSS_COMMENT_PATTERN = re.compile(r'/\*.*?\*/', re.S)
+CSS_PUNCTUATION_PATTERN = re.compile(r'\s*([{};,>])\s*')
+CSS_COLON_PATTERN = re.compile(r':\s+')
+# a rule of a Pygments token stylesheet, e.g. `.k { color: #080; font-weight: bold } /* Keyword */`
+PYGMENTS_RULE_PATTERN = re.compile(r'^\.[\w-]+ \{[^}]*\}(?: /\*[^*]*\*/)?\n?', re.M)
+
+
+def _minify_text(html):
+    html = COMMENT_PATTERN.sub('', html)
+    html = WHITESPACE_PATTERN.sub(' ', html)
+    return BLOCK_TAG_PATTERN.sub(r'\1', html)
+
+
+def minify_html(html):
+    """
+    Collapses the whitespace of a HTML page, except inside `<pre>` (the code blocks), and drops its comments.
+
+    Args:
+        html (str): The HTML page.
+
+    Returns:
+        html (str): The minified HTML page.
+    """
+    parts = PRESERVED_PATTERN.split(html)
+    # split() puts the preserved block and its tag name after every text part
+    minified = []
+    for i in range(0, len(parts), 3):
+        minified.append(_minify_text(parts[i]))
+        if i + 1 < len(parts):
+            minified.append(parts[i + 1])
+    return ''.join(minified).strip()
+
+
+def minify_css(css):
+    """
+    Drops the comments and the whitespace of a stylesheet.
+
+    Args:
+        css (str): The stylesheet.
+
+    Returns:
+        css (str): The minified stylesheet.
+    """
+    css = CSS_COMMENT_PATTERN.sub('', css)
+    css = WHITESPACE_PATTERN.sub(' ', css)
+    css = CSS_PUNCTUATION_PATTERN.sub(r'\1', css)
+    css = CSS_COLON_PATTERN.sub(':', css)
+    return css.replace(';}', '}').strip()
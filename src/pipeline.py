@@ -0,0 +1,215 @@
+import os
+import queue
+import threading
+
+# marks the end of the items flowing through a queue
+_DONE = object()
+
+
+def scan_files(dir_path, suffix):
+    """
+    Discovers the files of a tree lazily with `os.scandir`, in the same order as a sorted `os.walk`.
+
+    Args:
+        dir_path (str): The root dir to scan.
+        suffix (str): Only the files ending with it are yielded.
+
+    Returns:
+        paths (generator): The file paths relative to `dir_path`.
+    """
+    stack = ['']
+    while stack:
+        prefix = stack.pop()
+        with os.scandir(os.path.join(dir_path, prefix)) as it:
+            entries = sorted(it, key=lambda entry: entry.name)
+
+        dirnames = []
+        for entry in entries:
+            if entry.is_dir():
+                # like os.walk, symlinked dirs are not followed
+                if not entry.is_symlink():
+                    dirnames.append(os.path.join(prefix, entry.name))
+            elif entry.name.endswith(suffix):
+                yield os.path.join(prefix, entry.name)
+
+        # pushed in reverse, so the first sub-dir is visited first
+        stack.extend(reversed(dirnames))
+
+
+class OutputDirs:
+    """ Creates every output dir once, however many files are written into it."""
+
+    def __init__(self):
+        self.created = set()
+        self.lock = threading.Lock()
+
+    def ensure(self, dir_path):
+        if dir_path in self.created:
+            return
+
+        with self.lock:
+            if dir_path not in self.created:
+                os.makedirs(dir_path, exist_ok=True)
+                self.created.add(dir_path)
+
+
+class _Failure:
+    """ Carries an exception raised in one of the stages over to the consumer."""
+
+    def __init__(self, error):
+        self.error = error
+
+
+class RenderPipeline:
+    """ Runs read -> render -> write in separate stages connected by bounded queues, so I/O overlaps with rendering."""
+
+    def __init__(self, read, render, write, readers=2, writers=4, read_ahead=64, write_queue=64, pool=None,
+                 in_flight=None):
+        """
+        Initializing the pipeline.
+
+        Args:
+            read (callable): item -> data, runs on the reader threads.
+            render (callable): data -> result, runs on the render thread or in `pool`.
+            write (callable): result -> output, runs on the writer threads.
+            readers (int): The number of reader threads.
+            writers (int): The number of writer threads.
+            read_ahead (int): The maximum number of read items waiting to be rendered.
+            write_queue (int): The maximum number of rendered items waiting to be written.
+            pool (multiprocessing.Pool): If it is given, `render` runs in its worker processes.
+            in_flight (int): The maximum number of items rendered in `pool` at once.
+        """
+        self.read = read
+        self.render = render
+        self.write = write
+        self.readers = max(1, readers)
+        self.writers = max(1, writers)
+        self.read_ahead = max(1, read_ahead)
+        self.write_queue = max(1, write_queue)
+        self.pool = pool
+        self.in_flight = max(1, in_flight or 1)
+
+    def _reader(self, items, lock, read_queue, stop):
+        while not stop.is_set():
+            with lock:
+                item = next(items, _DONE)
+            if item is _DONE:
+                break
+            try:
+                read_queue.put(self.read(item))
+            except Exception as e:
+                read_queue.put(_Failure(e))
+        read_queue.put(_DONE)
+
+    def _renderer(self, read_queue, write_queue, stop):
+        slots = threading.BoundedSemaphore(self.in_flight)
+
+        def done(result):
+            write_queue.put(result)
+            slots.release()
+
+        def failed(error):
+            done(_Failure(error))
+
+        finished = 0
+        while finished < self.readers:
+            data = read_queue.get()
+            if stop.is_set():
+                break
+            elif data is _DONE:
+                finished += 1
+            elif isinstance(data, _Failure):
+                write_queue.put(data)
+            elif self.pool:
+                slots.acquire()
+                self.pool.apply_async(self.render, (data,), callback=done, error_callback=failed)
+            else:
+                try:
+                    write_queue.put(self.render(data))
+                except Exception as e:
+                    write_queue.put(_Failure(e))
+
+        # waits for everything still rendering in the pool
+        for _ in range(self.in_flight):
+            slots.acquire()
+        for _ in range(self.writers):
+            write_queue.put(_DONE)
+
+    def _writer(self, write_queue, done_queue, stop):
+        for result in iter(write_queue.get, _DONE):
+            if stop.is_set():
+                break
+            elif isinstance(result, _Failure):
+                done_queue.put(result)
+                continue
+            try:
+                done_queue.put(self.write(result))
+            except Exception as e:
+                done_queue.put(_Failure(e))
+        done_queue.put(_DONE)
+
+    def run(self, items):
+        """
+        Pushes the items through all the stages.
+
+        Args:
+            items (iterable): The items to process, consumed lazily.
+
+        Raises:
+            Exception: The first error raised by any of the stages.
+
+        Returns:
+            outputs (generator): The outputs of `write`, in the order they have been written.
+        """
+        read_queue = queue.Queue(self.read_ahead)
+        write_queue = queue.Queue(self.write_queue)
+        # outputs are small (no page content), this one is only bounded by the bounded stages before it
+        done_queue = queue.Queue()
+
+        # set once the consumer is gone (an error, or the generator closed early), every stage stops at its next item
+        stop = threading.Event()
+        items, lock = iter(items), threading.Lock()
+        threads = [threading.Thread(target=self._reader, args=(items, lock, read_queue, stop), daemon=True)
+                   for _ in range(self.readers)]
+        threads.append(threading.Thread(target=self._renderer, args=(read_queue, write_queue, stop), daemon=True))
+        threads.extend(threading.Thread(target=self._writer, args=(write_queue, done_queue, stop), daemon=True)
+                       for _ in range(self.writers))
+        for thread in threads:
+            thread.start()
+
+        try:
+            finished = 0
+            while finished < self.writers:
+                output = done_queue.get()
+                if output is _DONE:
+                    finished += 1
+                elif isinstance(output, _Failure):
+                    raise output.error
+                else:
+                    yield output
+        finally:
+            stop.set()
+            self._stop(threads, (read_queue, write_queue))
+
+    @staticmethod
+    def _stop(threads, queues, interval=0.01):
+        # nothing is read, rendered or written once this returns
+        while True:
+            threads = [thread for thread in threads if thread.is_alive()]
+            if not threads:
+                return
+
+            for bounded in queues:
+                # unblocks the stages waiting to put into a full queue ...
+                try:
+                    while True:
+                        bounded.get_nowait()
+                except queue.Empty:
+                    pass
+                # ... and the ones waiting for an empty one
+                try:
+                    bounded.put_nowait(_DONE)
+                except queue.Full:
+                    pass
+            for thread in threads:
+                thread.join(interval)
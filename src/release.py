@@ -0,0 +1,139 @@
+import collections
+import os
+import struct
+import tarfile
+import time
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+
+FEED = """<entry>
+    <version>{version}</version>
+    <url>{url}</url>
+</entry>"""
+RELEASE_URL = 'https://github.com/m3hrdadfi/dash-tf-docset/releases/download/{tag}/{archive}'
+# deflate looks back at most 32 KB, which is what every block is primed with
+WINDOW_SIZE = 1 << 15
+
+
+def _deflate_block(block, dictionary, level, last):
+    """
+    Compresses one block as a piece of a single raw deflate stream (the way pigz does it).
+
+    Args:
+        block (bytes): The data of the block.
+        dictionary (bytes): The last 32 KB before the block, so matches can cross the block boundary.
+        level (int): The compression level.
+        last (bool): If it is True, the block closes the deflate stream.
+
+    Returns:
+        compressed (bytes): The compressed block.
+    """
+    if dictionary:
+        compressor = zlib.compressobj(level, zlib.DEFLATED, -zlib.MAX_WBITS, zdict=dictionary)
+    else:
+        compressor = zlib.compressobj(level, zlib.DEFLATED, -zlib.MAX_WBITS)
+
+    # a sync flush ends on a byte boundary without marking the final block, so the next block can follow
+    return compressor.compress(block) + compressor.flush(zlib.Z_FINISH if last else zlib.Z_SYNC_FLUSH)
+
+
+class ParallelGzipWriter:
+    """ A write-only file object producing a standard single-member gzip stream, compressed block by block in
+    threads."""
+
+    def __init__(self, fileobj, threads=None, block_size=1 << 20, level=9):
+        """
+        Initializing the writer.
+
+        Args:
+            fileobj (file): The binary file object which receives the gzip stream.
+            threads (int): The number of compression threads (default: the number of CPUs).
+            block_size (int): The size of the blocks compressed independently.
+            level (int): The compression level.
+        """
+        self.fileobj = fileobj
+        self.threads = threads or os.cpu_count() or 1
+        self.block_size = block_size
+        self.level = level
+        self.executor = ThreadPoolExecutor(self.threads)
+        self.pending = collections.deque()
+        self.buffer = bytearray()
+        self.dictionary = b''
+        self.crc = 0
+        self.size = 0
+        self.closed = False
+
+        # gzip header: magic, deflate, no flags, mtime, no extra flags, unknown OS
+        self.fileobj.write(b'\x1f\x8b\x08\x00' + struct.pack('<I', int(time.time())) + b'\x00\xff')
+
+    def _submit(self, last=False):
+        block = bytes(self.buffer[:self.block_size])
+        del self.buffer[:self.block_size]
+
+        self.crc = zlib.crc32(block, self.crc)
+        self.size += len(block)
+        self.pending.append(self.executor.submit(_deflate_block, block, self.dictionary, self.level, last))
+        self.dictionary = (self.dictionary + block)[-WINDOW_SIZE:]
+
+        # keeps at most two blocks per thread in memory, written in their original order
+        while len(self.pending) > self.threads * 2:
+            self.fileobj.write(self.pending.popleft().result())
+
+    def write(self, data):
+        self.buffer += data
+        while len(self.buffer) > self.block_size:
+            self._submit()
+        return len(data)
+
+    def close(self):
+        if self.closed:
+            return
+
+        self._submit(last=True)
+        while self.pending:
+            self.fileobj.write(self.pending.popleft().result())
+        self.executor.shutdown()
+
+        self.fileobj.write(struct.pack('<II', self.crc, self.size & 0xffffffff))
+        self.closed = True
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+
+def pack_docset(docset_path, archive_path, threads=None):
+    """
+    Streams the `.docset` dir into a `.tgz` archive, without staging a copy of the tree or of the tar file.
+
+    Args:
+        docset_path (str): The `.docset` bundle.
+        archive_path (str): The `.tgz` archive to write.
+        threads (int): The number of compression threads (default: the number of CPUs).
+
+    Returns:
+        archive_path (str): The written archive.
+    """
+    with open(archive_path, 'wb') as f, ParallelGzipWriter(f, threads) as gz:
+        with tarfile.open(fileobj=gz, mode='w|', format=tarfile.GNU_FORMAT) as tar:
+            tar.add(docset_path, arcname=os.path.basename(os.path.normpath(docset_path)))
+
+    return archive_path
+
+
+def write_feed(feed_path, version, url):
+    """
+    Writes the Dash/Zeal feed of a release.
+
+    Args:
+        feed_path (str): The feed XML file.
+        version (str): The version of the release.
+        url (str): The URL of the release archive.
+
+    Returns:
+        None
+    """
+    with open(feed_path, 'w') as f:
+        f.write(FEED.format(version=version, url=url))
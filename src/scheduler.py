@@ -0,0 +1,198 @@
+import concurrent.futures
+import contextlib
+import multiprocessing
+import os
+import sys
+import threading
+import time
+import traceback
+import venv
+from .tf_auto_doc_setup import TFAutoDocSetup
+
+
+class SlotBudget:
+    """ A number of slots shared by threads, each of them takes as many slots as it needs at once."""
+
+    def __init__(self, slots):
+        """
+        Initializing the budget.
+
+        Args:
+            slots (int): The number of slots.
+        """
+        self.slots = max(1, slots)
+        self.free = self.slots
+        self.condition = threading.Condition()
+
+    @contextlib.contextmanager
+    def take(self, count):
+        """
+        Waits until `count` slots are free and holds them, a request larger than the budget gets the whole budget.
+
+        Args:
+            count (int): The number of slots.
+
+        Returns:
+            count (int): The number of slots held, as the value of the `with` statement.
+        """
+        count = max(1, min(count, self.slots))
+        with self.condition:
+            self.condition.wait_for(lambda: self.free >= count)
+            self.free -= count
+        try:
+            yield count
+        finally:
+            with self.condition:
+                self.free += count
+                self.condition.notify_all()
+
+
+class BatchScheduler:
+    """ Builds the DocSets of several TensorFlow versions concurrently, each in its own isolated environment."""
+    ENV_DIR = 'env'
+    # the rendering pools are started next to the threads of the other builds, which a forked process would inherit
+    # halfway (e.g. holding a lock)
+    START_METHOD = 'forkserver' if 'forkserver' in multiprocessing.get_all_start_methods() else 'spawn'
+
+    def __init__(self, versions, dir_path, concurrency=2, network_slots=1, jobs=1, isolated=True, cpu_slots=None,
+                 **options):
+        """
+        Initializing the batch of builds.
+
+        Args:
+            versions (:list:`str`): The versions of TensorFlow to build, e.g. `v2.0.0`.
+            dir_path (str): Root dir to where the docs would be saved, every version gets its own sub dir.
+            concurrency (int): The maximum number of builds running at the same time.
+            network_slots (int): The maximum number of builds downloading (pip installs and clones) at the same time.
+            jobs (int): The number of processes used for rendering a version, taken from `cpu_slots`.
+            isolated (bool): If it is True, every version is installed into its own virtual environment, otherwise
+                into the current one (only safe for a single version).
+            cpu_slots (int): The CPU slots shared by the CPU-bound stages of all the builds, each of them holds
+                `jobs` slots (at most all of them), so the render processes of the batch never exceed it while the
+                other builds download (default: the number of CPUs).
+            options: The other keyword arguments of `TFAutoDocSetup` (docset, static_math, find_links, ...).
+        """
+        self.versions = list(dict.fromkeys(versions))
+        self.dir_path = dir_path
+        self.concurrency = max(1, concurrency)
+        self.network_slots = threading.BoundedSemaphore(max(1, network_slots))
+        self.cpu_slots = SlotBudget(cpu_slots or os.cpu_count() or 1)
+        self.jobs = jobs
+        self.isolated = isolated
+        self.options = options
+
+    def _create_env(self, version):
+        """
+        Creates (once) the virtual environment of a version, with its own pip.
+
+        Args:
+            version (str): The version of TensorFlow.
+
+        Returns:
+            python (str): The interpreter of the environment.
+        """
+        env_path = os.path.join(self.dir_path, version, self.ENV_DIR)
+        bin_dir = 'Scripts' if sys.platform == 'win32' else 'bin'
+        python = os.path.join(env_path, bin_dir, 'python.exe' if sys.platform == 'win32' else 'python')
+
+        if not os.path.exists(python):
+            venv.create(env_path, with_pip=True, symlinks=sys.platform != 'win32')
+
+        return python
+
+    def _create_setup(self, version, python, options):
+        """
+        Creates the setup of a version.
+
+        Args:
+            version (str): The version of TensorFlow.
+            python (str): The interpreter of its environment (default: the current one).
+            options (dict): The keyword arguments of `TFAutoDocSetup`.
+
+        Returns:
+            doc_setup (TFAutoDocSetup): The setup.
+        """
+        doc_setup = TFAutoDocSetup(version, self.dir_path, self.jobs, python=python, **options)
+        doc_setup.START_METHOD = self.START_METHOD
+        return doc_setup
+
+    def _build(self, version):
+        """
+        Builds the DocSet of a version: the network-bound stage and the CPU-bound stage wait for their own slots.
+
+        Args:
+            version (str): The version of TensorFlow.
+
+        Returns:
+            result (dict): The version, status, failed stage, error and seconds of the build.
+        """
+        start = time.perf_counter()
+        result = {'version': version, 'status': False, 'stage': None, 'error': None}
+
+        try:
+            result['stage'] = 'environment'
+            python = self._create_env(version) if self.isolated else None
+            options = dict(self.options)
+            if options.get('report_path'):
+                # one report per version, next to each other
+                root, ext = os.path.splitext(options['report_path'])
+                options['report_path'] = '{0}-{1}{2}'.format(root, version, ext)
+            doc_setup = self._create_setup(version, python, options)
+
+            try:
+                result['stage'] = 'prepare'
+                with self.network_slots:
+                    doc_setup.prepare()
+
+                result['stage'] = 'generate'
+                with self.cpu_slots.take(self.jobs) as slots:
+                    # fewer render processes if the budget is smaller than `jobs`
+                    doc_setup.jobs = slots
+                    doc_setup.generate()
+            finally:
+                doc_setup._report_stats(doc_setup.stats, doc_setup.report_path)
+
+            result['stage'] = None
+            result['status'] = True
+            result['html_dir_path'] = doc_setup.html_dir_path
+        except Exception as e:
+            result['error'] = '{0}: {1}'.format(type(e).__name__, e)
+            result['traceback'] = traceback.format_exc()
+
+        result['seconds'] = time.perf_counter() - start
+        return result
+
+    def run(self):
+        """
+        Runs every build, a failed build does not stop the others.
+
+        Returns:
+            results (:list:`dict`): The results of the builds, in the order of the versions.
+        """
+        with concurrent.futures.ThreadPoolExecutor(max_workers=self.concurrency) as executor:
+            futures = [executor.submit(self._build, version) for version in self.versions]
+            return [future.result() for future in futures]
+
+    @staticmethod
+    def summary(results):
+        """
+        Formats the results of a batch in a few human-readable lines.
+
+        Args:
+            results (:list:`dict`): The results returned by `run`.
+
+        Returns:
+            summary (str): The summary.
+        """
+        lines = []
+        for result in results:
+            if result['status']:
+                lines.append('{0:>12}: ok in {1:.1f}s -> {2}'.format(
+                    result['version'], result['seconds'], result['html_dir_path']))
+            else:
+                lines.append('{0:>12}: failed in {1:.1f}s at {2} ({3})'.format(
+                    result['version'], result['seconds'], result['stage'], result['error']))
+
+        failed = sum(1 for result in results if not result['status'])
+        lines.append('{0} succeeded, {1} failed'.format(len(results) - failed, failed))
+        return '\n'.join(lines)
@@ -0,0 +1,251 @@
+import collections
+import hashlib
+import mimetypes
+import os
+import posixpath
+import socketserver
+import threading
+import time
+from http import HTTPStatus
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from urllib.parse import unquote, urlsplit
+from .links import LinkIndex, to_posix
+from .tf_doc_setup import TFDocSetup
+
+
+class PageCache:
+    """ A LRU cache of rendered pages bounded by their total size, every entry remembers the mtime of its source."""
+
+    def __init__(self, max_bytes=64 << 20):
+        """
+        Initializing the cache.
+
+        Args:
+            max_bytes (int): The maximum total size of the cached pages.
+        """
+        self.max_bytes = max_bytes
+        self.entries = collections.OrderedDict()
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self.lock = threading.Lock()
+
+    def get(self, key, mtime):
+        """
+        Gets a page, if it has been rendered from the current version of its source.
+
+        Args:
+            key (str): The source path of the page.
+            mtime (int): The current mtime (ns) of the source.
+
+        Returns:
+            entry (tuple): The (mtime, etag, body) of the page or None.
+        """
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None or entry[0] != mtime:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self.entries.move_to_end(key)
+            return entry
+
+    def put(self, key, mtime, body):
+        """
+        Caches a page, the least recently used ones are dropped to stay under `max_bytes`.
+
+        Args:
+            key (str): The source path of the page.
+            mtime (int): The mtime (ns) of the source it has been rendered from.
+            body (bytes): The rendered page.
+
+        Returns:
+            entry (tuple): The (mtime, etag, body) of the page.
+        """
+        entry = (mtime, '"{0}"'.format(hashlib.sha1(body).hexdigest()), body)
+        with self.lock:
+            previous = self.entries.pop(key, None)
+            if previous is not None:
+                self.size -= len(previous[2])
+            self.entries[key] = entry
+            self.size += len(body)
+            while self.size > self.max_bytes and len(self.entries) > 1:
+                _, (_, _, dropped) = self.entries.popitem(last=False)
+                self.size -= len(dropped)
+        return entry
+
+
+class ThreadingHTTPServer(socketserver.ThreadingMixIn, HTTPServer):
+    """ The `http.server.ThreadingHTTPServer` of Python 3.7, for the earlier ones."""
+    daemon_threads = True
+
+
+class DocServer:
+    """ Serves a markdown tree as HTML, every page is rendered on its first request rather than up front."""
+    # the minimum seconds between two scans of the tree for unknown pages (favicons, stale links, new pages, ...)
+    RESCAN_INTERVAL = 2.0
+
+    def __init__(self, md_dir_path, cache_bytes=64 << 20, static_math=False, doc_setup=None):
+        """
+        Initializing the server.
+
+        Args:
+            md_dir_path (str): The root dir with TensorFlow generated markdown docs.
+            cache_bytes (int): The maximum total size of the cached pages.
+            static_math (bool): If it is True, the formulas are converted into MathML while rendering.
+            doc_setup (TFDocSetup): The setup whose renderer and assets are used (default: a `TFDocSetup`).
+        """
+        self.md_dir_path = md_dir_path
+        self.doc_setup = doc_setup or TFDocSetup()
+        self.renderer = self.doc_setup._create_renderer(static_math)
+        self.cache = PageCache(cache_bytes)
+        # output path -> source path, the same names (and conflict suffixes) as a full build
+        self.routes = {}
+        # asset path -> (etag, body), read on their first request
+        self.assets = {}
+        self.lock = threading.Lock()
+        self.scan_lock = threading.Lock()
+        self.scanned = None
+        self._scan()
+
+    def _scan(self):
+        # only lists the tree, nothing is read or rendered
+        pages = self.doc_setup._plan_pages(self.md_dir_path, '')
+        outputs = {page.source: page.out_file for page in pages}
+        with self.lock:
+            self.doc_setup.link_index = LinkIndex(outputs)
+            self.routes = {to_posix(page.out_file): page for page in pages}
+        self.scanned = time.monotonic()
+
+    def _rescan(self):
+        # the requests of unknown pages list the tree again, but only once per `RESCAN_INTERVAL`
+        with self.scan_lock:
+            if time.monotonic() - self.scanned < self.RESCAN_INTERVAL:
+                return False
+            self._scan()
+            return True
+
+    def _render(self, page):
+        item = self.doc_setup._read_page(page)
+        # the renderer keeps the state of the page it renders, so pages are rendered one at a time
+        with self.lock:
+            _, parts, _ = self.doc_setup._render_page(self.renderer, item)
+        return b''.join(parts)
+
+    def page(self, path):
+        """
+        Gets a rendered page, from the cache if its source has not changed since.
+
+        Args:
+            path (str): The output path of the page, e.g. `tf/math/add.html`.
+
+        Returns:
+            entry (tuple): The (mtime, etag, body) of the page or None if there is no such page.
+        """
+        page = self.routes.get(path)
+        if page is None or not os.path.exists(page.md_file):
+            # the tree may have changed since it has been listed
+            if not self._rescan():
+                return None
+            page = self.routes.get(path)
+            if page is None or not os.path.exists(page.md_file):
+                return None
+
+        mtime = os.stat(page.md_file).st_mtime_ns
+        entry = self.cache.get(page.source, mtime)
+        if entry is None:
+            entry = self.cache.put(page.source, mtime, self._render(page))
+        return entry
+
+    def asset(self, path):
+        """
+        Gets an asset, from memory after its first request.
+
+        Args:
+            path (str): The path of the asset, e.g. `css/style.css`.
+
+        Returns:
+            entry (tuple): The (etag, body) of the asset or None if there is no such asset.
+        """
+        entry = self.assets.get(path)
+        if entry is None:
+            asset_path = os.path.join(self.doc_setup.ASSETS_PATH, *path.split('/'))
+            if not os.path.isfile(asset_path):
+                return None
+            with open(asset_path, 'rb') as f:
+                body = f.read()
+            entry = self.assets[path] = ('"{0}"'.format(hashlib.sha1(body).hexdigest()), body)
+        return entry
+
+
+class DocRequestHandler(BaseHTTPRequestHandler):
+    """ Answers the requests of a `DocServer`: pages (`.html`) first, then assets."""
+    doc_server = None
+
+    def _send(self, etag, body, content_type):
+        if self.headers.get('If-None-Match') == etag:
+            self.send_response(HTTPStatus.NOT_MODIFIED)
+            self.send_header('ETag', etag)
+            self.end_headers()
+            return
+
+        self.send_response(HTTPStatus.OK)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        self.send_header('ETag', etag)
+        # revalidated on every request, so an edited page shows up on the next reload
+        self.send_header('Cache-Control', 'no-cache')
+        self.end_headers()
+        if self.command != 'HEAD':
+            self.wfile.write(body)
+
+    def do_GET(self):
+        start = time.perf_counter()
+        # rooted before normalizing, so `..` can not climb out of the tree
+        path = posixpath.normpath('/' + unquote(urlsplit(self.path).path)).lstrip('/')
+        if not path:
+            path = 'index.html'
+
+        if path.endswith('.html'):
+            entry = self.doc_server.page(path)
+            if entry is not None:
+                self._send(entry[1], entry[2], 'text/html; charset=utf-8')
+                self.log_message('"%s" %.1fms', path, 1000 * (time.perf_counter() - start))
+                return
+
+        entry = self.doc_server.asset(path)
+        if entry is not None:
+            self._send(entry[0], entry[1], mimetypes.guess_type(path)[0] or 'application/octet-stream')
+            return
+
+        self.send_error(HTTPStatus.NOT_FOUND)
+
+    do_HEAD = do_GET
+
+    def log_request(self, code='-', size='-'):
+        # the pages are logged with their time, the rest only if it fails
+        if not isinstance(code, int) or code >= 400:
+            super().log_request(code, size)
+
+
+def serve(md_dir_path, host='127.0.0.1', port=8000, cache_bytes=64 << 20, static_math=False):
+    """
+    Serves a markdown tree over HTTP until it is interrupted.
+
+    Args:
+        md_dir_path (str): The root dir with TensorFlow generated markdown docs.
+        host (str): The address to listen on.
+        port (int): The port to listen on.
+        cache_bytes (int): The maximum total size of the cached pages.
+        static_math (bool): If it is True, the formulas are converted into MathML while rendering.
+
+    Returns:
+        None
+    """
+    handler = type('Handler', (DocRequestHandler,), {'doc_server': DocServer(md_dir_path, cache_bytes, static_math)})
+    with ThreadingHTTPServer((host, port), handler) as httpd:
+        print('Serving {0} on http://{1}:{2}/'.format(md_dir_path, host, port))
+        try:
+            httpd.serve_forever()
+        except KeyboardInterrupt:
+            pass
@@ -0,0 +1,204 @@
+import errno
+import hashlib
+import os
+import shutil
+import tempfile
+import uuid
+
+try:
+    import fcntl
+except ImportError:
+    # Windows
+    fcntl = None
+
+# ioctl(dest, FICLONE, source) shares the extents of a file on btrfs/xfs, see `ioctl_ficlone(2)`
+FICLONE = 0x40049409
+
+
+def _tmp_path(path):
+    return '{0}.{1}.tmp'.format(path, uuid.uuid4().hex[:8])
+
+
+def atomic_write(path, chunks):
+    """
+    Writes a file through a temporary one, so the old file (or another hardlink of it) is never written in place.
+
+    Args:
+        path (str): The file.
+        chunks (:list:`bytes`): The pieces of the content, written one after another.
+
+    Returns:
+        None
+    """
+    tmp_path = _tmp_path(path)
+    with open(tmp_path, 'wb') as f:
+        for chunk in chunks:
+            f.write(chunk)
+    os.replace(tmp_path, path)
+
+
+def atomic_copy(source, destination):
+    """
+    Copies a file like `shutil.copy`, but replaces the destination instead of writing into it.
+
+    Args:
+        source (str): The file to copy.
+        destination (str): The file or dir to copy to.
+
+    Returns:
+        destination (str): The written file.
+    """
+    if os.path.isdir(destination):
+        destination = os.path.join(destination, os.path.basename(source))
+    tmp_path = _tmp_path(destination)
+    shutil.copyfile(source, tmp_path)
+    os.replace(tmp_path, destination)
+    return destination
+
+
+def _reflink(source, destination):
+    if fcntl is None:
+        return False
+
+    with open(source, 'rb') as fin, open(destination, 'wb') as fout:
+        try:
+            fcntl.ioctl(fout.fileno(), FICLONE, fin.fileno())
+            return True
+        except OSError:
+            pass
+
+    os.remove(destination)
+    return False
+
+
+def link_file(source, destination):
+    """
+    Hardlinks a file into place, or reflinks or copies it where hardlinks are not possible, replacing whatever is
+    there. The files are never written in place, so sharing their inode is safe.
+
+    Args:
+        source (str): The file to link.
+        destination (str): The file to replace.
+
+    Returns:
+        None
+    """
+    tmp_path = _tmp_path(destination)
+    try:
+        os.link(source, tmp_path)
+    except OSError as e:
+        # another filesystem, too many links or no hardlinks at all
+        if e.errno not in (errno.EXDEV, errno.EMLINK, errno.EPERM, errno.ENOTSUP):
+            raise
+        if not _reflink(source, tmp_path):
+            shutil.copyfile(source, tmp_path)
+    os.replace(tmp_path, destination)
+
+
+class BlobStore:
+    """ A content-addressed store of files, shared by the output trees of several versions through hardlinks."""
+    OBJECTS_DIR = 'objects'
+
+    def __init__(self, path):
+        """
+        Initializing the store.
+
+        Args:
+            path (str): The root dir of the store, it has to be on the same filesystem as the output trees to link
+                them, otherwise the files are reflinked or copied.
+        """
+        self.path = path
+        self.objects_path = os.path.join(path, self.OBJECTS_DIR)
+        os.makedirs(self.objects_path, exist_ok=True)
+
+    def _blob_path(self, digest):
+        return os.path.join(self.objects_path, digest[:2], digest[2:])
+
+    def put(self, chunks):
+        """
+        Stores a content, once.
+
+        Args:
+            chunks (:list:`bytes`): The pieces of the content.
+
+        Returns:
+            blob_path (str): The file of the content in the store.
+        """
+        digest = hashlib.sha1()
+        for chunk in chunks:
+            digest.update(chunk)
+        blob_path = self._blob_path(digest.hexdigest())
+        if not os.path.exists(blob_path):
+            os.makedirs(os.path.dirname(blob_path), exist_ok=True)
+            # concurrent writers of the same content race harmlessly, the last rename wins
+            fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(blob_path), suffix='.tmp')
+            with os.fdopen(fd, 'wb') as f:
+                for chunk in chunks:
+                    f.write(chunk)
+            os.chmod(tmp_path, 0o644)
+            os.replace(tmp_path, blob_path)
+        return blob_path
+
+    def link(self, blob_path, destination):
+        """
+        Places a stored file in an output tree, replacing whatever is there.
+
+        Args:
+            blob_path (str): The file of the content in the store.
+            destination (str): The file in the output tree.
+
+        Returns:
+            None
+        """
+        link_file(blob_path, destination)
+
+    def write(self, destination, chunks):
+        """
+        Writes a file of an output tree through the store.
+
+        Args:
+            destination (str): The file in the output tree.
+            chunks (:list:`bytes`): The pieces of the content.
+
+        Returns:
+            None
+        """
+        self.link(self.put(chunks), destination)
+
+    def copy(self, source, destination):
+        """
+        Copies a file into an output tree through the store, it has the signature of `shutil.copy`.
+
+        Args:
+            source (str): The file to copy.
+            destination (str): The file or dir to copy to.
+
+        Returns:
+            destination (str): The written file.
+        """
+        if os.path.isdir(destination):
+            destination = os.path.join(destination, os.path.basename(source))
+        with open(source, 'rb') as f:
+            self.write(destination, [f.read()])
+        return destination
+
+    def gc(self):
+        """
+        Removes the blobs no output tree links to anymore (and the leftovers of interrupted writes).
+        It must not run while a build writes to the store. The reflinked or copied files of the trees are
+        independent of their blobs, removing those only costs the sharing of future writes.
+
+        Returns:
+            removed (int): The number of removed blobs.
+            freed (int): The number of freed bytes.
+        """
+        removed, freed = 0, 0
+        for root, _, filenames in os.walk(self.objects_path):
+            for filename in filenames:
+                blob_path = os.path.join(root, filename)
+                stat = os.stat(blob_path)
+                if stat.st_nlink == 1 or filename.endswith('.tmp'):
+                    os.remove(blob_path)
+                    removed += 1
+                    freed += stat.st_size
+        return removed, freed
@@ -0,0 +1,210 @@
+import asyncio
+import collections
+import os
+import sys
+import threading
+import time
+from tqdm import tqdm
+
+TaskResult = collections.namedtuple('TaskResult', ['argv', 'output', 'status', 'return_code', 'timed_out'])
+
+
+class RingBuffer:
+    """ Keeps the last `size` bytes written to it, e.g. the tail of a verbose child process for its error report."""
+
+    def __init__(self, size=64 * 1024):
+        """
+        Initializing the buffer.
+
+        Args:
+            size (int): The maximum number of bytes kept.
+        """
+        self.size = size
+        self.buffer = bytearray()
+        self.total = 0
+
+    def write(self, chunk):
+        self.total += len(chunk)
+        self.buffer += chunk
+        if len(self.buffer) > self.size:
+            del self.buffer[:len(self.buffer) - self.size]
+
+    def getvalue(self):
+        return self.buffer.decode('utf-8', 'replace')
+
+
+async def _run(argv, timeout=None, tail=64 * 1024, chunk_size=64 * 1024, interval=0.5, progress=True):
+    """
+    Runs a child process and reads its (merged) output in chunks.
+
+    Args:
+        argv (:list:`str`): The program and its arguments, nothing is split or passed through a shell.
+        timeout (float): If it is given, the child is killed after so many seconds.
+        tail (int): The number of bytes of output kept.
+        chunk_size (int): The maximum number of bytes read at once.
+        interval (float): The minimum seconds between two updates of the progress bar.
+        progress (bool): If it is True, the bytes read so far are shown on a progress bar.
+
+    Returns:
+        result (TaskResult): The tail of the output and the status of the child.
+    """
+    output = RingBuffer(tail)
+    process = await asyncio.create_subprocess_exec(*argv, stdout=asyncio.subprocess.PIPE,
+                                                   stderr=asyncio.subprocess.STDOUT)
+
+    async def read():
+        with tqdm(unit='B', unit_scale=True, desc=os.path.basename(argv[0]), disable=not progress) as pbar:
+            pending, updated = 0, time.monotonic()
+            while True:
+                chunk = await process.stdout.read(chunk_size)
+                if not chunk:
+                    break
+                output.write(chunk)
+
+                # the terminal is only redrawn every `interval` seconds, not on every chunk
+                pending += len(chunk)
+                if time.monotonic() - updated >= interval:
+                    pbar.update(pending)
+                    pending, updated = 0, time.monotonic()
+            pbar.update(pending)
+        return await process.wait()
+
+    timed_out = False
+    try:
+        return_code = await asyncio.wait_for(read(), timeout)
+    except asyncio.TimeoutError:
+        timed_out = True
+        process.kill()
+        return_code = await process.wait()
+
+    return TaskResult(argv, output.getvalue(), return_code == 0 and not timed_out, return_code, timed_out)
+
+
+def _report(result):
+    if not result.status:
+        sys.stderr.write('common::run_command() : [ERROR]: output = {0}, error code = {1}{2}\n'.format(
+            result.output, result.return_code, ' (timed out)' if result.timed_out else ''))
+
+
+class _ThreadedChildWatcher(asyncio.AbstractChildWatcher):
+    """ The child watcher of Python 3.8 for the earlier ones: a thread waits for every child and reports its exit to
+    the loop which has started it. The default watcher of Python < 3.8 relies on SIGCHLD, so it only works with a
+    loop attached on the main thread."""
+
+    def add_child_handler(self, pid, callback, *args):
+        loop = asyncio.get_event_loop()
+        thread = threading.Thread(target=self._wait, args=(loop, pid, callback, args), daemon=True)
+        thread.start()
+
+    def _wait(self, loop, pid, callback, args):
+        try:
+            _, status = os.waitpid(pid, 0)
+        except ChildProcessError:
+            # reaped by someone else, its exit code is lost
+            return_code = 255
+        else:
+            if os.WIFSIGNALED(status):
+                return_code = -os.WTERMSIG(status)
+            elif os.WIFEXITED(status):
+                return_code = os.WEXITSTATUS(status)
+            else:
+                return_code = status
+
+        if not loop.is_closed():
+            loop.call_soon_threadsafe(callback, pid, return_code, *args)
+
+    def remove_child_handler(self, pid):
+        return True
+
+    def attach_loop(self, loop):
+        pass
+
+    def close(self):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        pass
+
+
+_WATCHER_LOCK = threading.Lock()
+_watcher = None
+
+
+def _run_loop(coroutine):
+    # a loop of its own, so tasks can also be run from the threads of the batch scheduler
+    loop = asyncio.new_event_loop()
+    legacy = sys.version_info < (3, 8) and sys.platform != 'win32'
+    if legacy:
+        global _watcher
+        with _WATCHER_LOCK:
+            if _watcher is None:
+                _watcher = _ThreadedChildWatcher()
+                asyncio.set_child_watcher(_watcher)
+        # the children are registered with the current loop of the thread
+        asyncio.set_event_loop(loop)
+
+    try:
+        return loop.run_until_complete(coroutine)
+    finally:
+        if legacy:
+            asyncio.set_event_loop(None)
+        loop.close()
+
+
+def run_tasks(commands, concurrency=4, timeout=None, tail=64 * 1024):
+    """
+    Runs several child processes at once.
+
+    Args:
+        commands (:list:`list`): The argv of every child.
+        concurrency (int): The maximum number of children running at the same time.
+        timeout (float): If it is given, every child is killed after so many seconds.
+        tail (int): The number of bytes of output kept per child.
+
+    Returns:
+        results (:list:`TaskResult`): The results, in the order of the commands.
+    """
+    async def run_all():
+        semaphore = asyncio.Semaphore(max(1, concurrency))
+
+        async def run_one(argv):
+            async with semaphore:
+                print('run_task: {0}'.format(' '.join(argv)))
+                try:
+                    return await _run(argv, timeout, tail, progress=False)
+                except OSError as e:
+                    return TaskResult(argv, str(e), False, None, False)
+
+        return await asyncio.gather(*(run_one(list(argv)) for argv in commands))
+
+    results = _run_loop(run_all())
+    for result in results:
+        _report(result)
+    return results
+
+
+def run_task(argv, timeout=None, tail=64 * 1024):
+    """
+    Runs a child process, showing its progress.
+
+    Args:
+        argv (:list:`str`): The program and its arguments.
+        timeout (float): If it is given, the child is killed after so many seconds.
+        tail (int): The number of bytes of output kept, e.g. for the error report.
+
+    Returns:
+        output (str): The last `tail` bytes of the output.
+        status (bool): If it is True, the child has exited with 0.
+    """
+    argv = list(argv)
+    print('run_task: {0}'.format(' '.join(argv)))
+    try:
+        result = _run_loop(_run(argv, timeout, tail))
+    except OSError as e:
+        result = TaskResult(argv, str(e), False, None, False)
+
+    _report(result)
+    return result.output, result.status
@@ -0,0 +1,64 @@
+import re
+
+# the metadata the TensorFlow generator puts on top of every page, e.g.
+#   page_type: reference
+#   <style>{% include "site-assets/css/style.css" %}</style>
+PREAMBLE_PATTERN = re.compile(r'\A(?:[a-z_]+: [^\n]*\n)*<style>\{%[^\n]*%\}</style>[ \t]*\n')
+
+
+def strip_preamble(text):
+    """
+    Removes the metadata preamble from the markdown source of a page, our own assets replace its style.
+
+    Args:
+        text (str): The markdown source.
+
+    Returns:
+        text (str): The markdown source without its preamble.
+    """
+    match = PREAMBLE_PATTERN.match(text)
+    return text[match.end():] if match else text
+
+
+class PageTemplate:
+    """ The header and footer of the rendered pages, built once per dir depth rather than once per page."""
+
+    def __init__(self, assets_map, math_assets):
+        """
+        Initializing the template.
+
+        Args:
+            assets_map (dict): The asset dir -> files, the `css` ones are linked in the header and the `js` ones in
+                the footer.
+            math_assets (:list:`str`): The `js` files only the pages with math need.
+        """
+        self.assets_map = assets_map
+        self.math_assets = math_assets
+        self.cache = {}
+
+    def _build(self, depth, math):
+        # the assets are at the root of the output tree, `depth` dirs above the page
+        prefix = '../' * depth
+        header = ''.join('<link rel="stylesheet" href="{0}css/{1}" />\n'.format(prefix, asset_path)
+                         for asset_path in self.assets_map.get('css', []))
+        footer = ''.join('<script src="{0}js/{1}"></script>\n'.format(prefix, asset_path)
+                         for asset_path in self.assets_map.get('js', [])
+                         if math or asset_path not in self.math_assets)
+        return header.encode('utf-8'), footer.encode('utf-8')
+
+    def fragments(self, depth, math=False):
+        """
+        Gets the encoded header and footer of a page.
+
+        Args:
+            depth (int): The number of dirs between the output root and the page.
+            math (bool): If the page has formulas left to MathJax.
+
+        Returns:
+            header (bytes): The header of the page.
+            footer (bytes): The footer of the page.
+        """
+        key = (depth, bool(math))
+        if key not in self.cache:
+            self.cache[key] = self._build(depth, math)
+        return self.cache[key]
@@ -1,25 +1,70 @@
+import glob
 import json
 import os
-import subprocess
+import shutil
 import sys
+from .checkpoint import Checkpoints, fingerprint
+from .gitstore import GitMirror
+from .manifest import Manifest
+from .store import BlobStore
 from .tf_doc_setup import TFDocSetup
 from .utils import run_task, install_package, search_package
-from .dashing import DASHING
 
 
 class TFAutoDocSetup(TFDocSetup):
     """ This class is designed to create DocSet for all versions of TensorFlow 2.x automatically."""
-
-    def __init__(self, version, dir_path):
+    MIRROR_DIR = 'tensorflow.git'
+    STORE_DIR = 'store'
+    # the docs generator and the guides of 1.x, the rest of TensorFlow is used from its pip package
+    SPARSE_PATHS = ('tensorflow/tools/docs', 'tensorflow/docs_src')
+    CHECKPOINTS_FILE = 'checkpoints.json'
+    # the stages of a build in order, running one of them invalidates the ones after it
+    STAGES = ('install_tf_doc', 'clone_tf', 'install_tf', 'generate_md', 'render_html', 'dashing', 'docset')
+
+    def __init__(self, version, dir_path, jobs=1, docset=False, static_math=False, report_path=None, profile=None,
+                 live=False, python=None, find_links=None, tf_url=None, tf_doc_url=None, store=False,
+                 optimize=False, backend='misaka', base=None):
         """
         Initializing the DocSet automation based on which version of x in TensorFlow 2.x
 
         Args:
             version (str): What version of TensorFlow do you need?
             dir_path (str): Root dir to where the docs would be saved.
+            jobs (int): The number of processes used for rendering.
+            docset (bool): If it is True, the `.docset` bundle is packed next to the HTML dir.
+            static_math (bool): If it is True, the formulas are converted into MathML at build time.
+            report_path (str): If it is given, the build report is saved there as JSON.
+            profile (str): The profiler wrapped around the render loop, `cprofile` or `sampling` (default: none).
+            live (bool): If it is True, a summary is shown while rendering and at the end of the build.
+            python (str): The interpreter TensorFlow is installed into and the docs are generated with
+                (default: the current one).
+            find_links (str): If it is given, packages are only installed from the wheels in this dir (offline).
+            tf_url (str): Where TensorFlow is cloned from (default: `TF_URL`).
+            tf_doc_url (str): Where tensorflow-docs is installed from (default: `TF_DOC_URL`).
+            store (bool): If it is True, the files are written once into a content-addressed store shared by every
+                version (`{dir_path}/store`) and hardlinked into the HTML dir of each one.
+            optimize (bool): If it is True, the pages are minified and the stylesheets are bundled.
+            backend (str): The markdown engine, one of `backends.BACKENDS`.
+            base (str): A version built before under the same `dir_path`, the pages which have not changed since
+                then are linked from its HTML dir instead of rendered.
         """
         self.version = version
+        self.python = python or sys.executable
+        self.find_links = find_links
+        self.TF_URL = tf_url or self.TF_URL
+        self.TF_DOC_URL = tf_doc_url or self.TF_DOC_URL
+        self.jobs = jobs
+        self.docset = docset
+        self.static_math = static_math
+        self.optimize = optimize
+        self.backend = backend
+        self.base_html_dir_path = os.path.join(dir_path, base, 'html') if base else None
+        self.report_path = report_path
+        self.stats = self._create_stats(report_path, profile, live)
         self.dir_path = dir_path
+        # one mirror of TensorFlow for all the versions built under the same root
+        self.mirror = GitMirror(os.path.join(dir_path, self.MIRROR_DIR), self.TF_URL)
+        self.store = BlobStore(os.path.join(dir_path, self.STORE_DIR)) if store else None
         self.dir_path = os.path.join(self.dir_path, version)
         # checks if the dir_path exist or not
         os.makedirs(self.dir_path, exist_ok=True)
@@ -27,14 +72,15 @@ class TFAutoDocSetup(TFDocSetup):
         # writes/reads information for such details like the number of tried
         self.INFO = self._setup(os.path.join(self.dir_path, self.INFO_FILE))
         self.TRIED = int(self.INFO.get('TRIED', 0))
+        self.checkpoints = Checkpoints(os.path.join(self.dir_path, self.CHECKPOINTS_FILE), self.STAGES)
 
-        # initials the dir paths
-        self.md_dir_path = self._check_dir_path(
-            os.path.join(self.dir_path, 'md--{0}'.format(self.TRIED)))
-        self.html_dir_path = self._check_dir_path(
-            os.path.join(self.dir_path, 'html--{0}'.format(self.TRIED)))
-        self.tf_dir_path = self._check_dir_path(
-            os.path.join(self.dir_path, 'tf--{0}'.format(self.TRIED)))
+        # the attempts share their dirs, a failed one is resumed from its last completed stage
+        self.md_dir_path = os.path.join(self.dir_path, 'md')
+        self.html_dir_path = os.path.join(self.dir_path, 'html')
+        self.tf_dir_path = os.path.join(self.dir_path, 'tf')
+        self._migrate_layout()
+        os.makedirs(self.md_dir_path, exist_ok=True)
+        os.makedirs(self.html_dir_path, exist_ok=True)
 
         # configures the dashing
         self.DASHING_CONFIG = {
@@ -55,7 +101,8 @@ class TFAutoDocSetup(TFDocSetup):
         Returns:
             info (dict): The information parameters!
         """
-        info = self.INFO
+        # a copy, so the class-level default is never shared between builds
+        info = dict(self.INFO)
         if os.path.exists(info_path):
             with open(info_path) as f:
                 info = json.load(f)
@@ -70,26 +117,6 @@ class TFAutoDocSetup(TFDocSetup):
         with open(info_path, 'w') as f:
             json.dump(self.INFO, f)
 
-    def _check_dir_path(self, dir_path):
-        """
-        Checks the `dir_path` version if it has been already made or not.
-
-        Args:
-            dir_path (str): The root dir to where the docs would be saved.
-
-        Returns:
-            new_dir_path (str): The new root dir to where the docs would be saved.
-        """
-        dir_path_split = dir_path.split('--')
-        tried = int(dir_path_split[-1])
-
-        if os.path.exists(dir_path) and len(os.listdir(dir_path)) > 0:
-            tried += 1
-
-        new_dir_path = '{0}--{1}'.format(dir_path_split[0], tried)
-        os.makedirs(new_dir_path, exist_ok=True)
-        return new_dir_path
-
     def _print(self, title, length=20, hashing=True):
         """
         A fancy way to print out information in a human-readable form.
@@ -112,6 +139,31 @@ class TFAutoDocSetup(TFDocSetup):
         else:
             print('\n{0}\n'.format(title))
 
+    def _stage(self, name, inputs, step, valid=None):
+        """
+        Runs a stage of the build, unless it has completed with the same inputs and its outputs are still there.
+
+        Args:
+            name (str): The stage, one of `STAGES`.
+            inputs (list): What the outputs of the stage depend on, besides the stages before it.
+            step (callable): Runs the stage, returns its status.
+            valid (callable): Checks if the outputs of the completed stage are still there (default: they are).
+
+        Returns:
+            status (bool)
+        """
+        digest = fingerprint(inputs)
+        if self.checkpoints.is_done(name, digest) and (valid is None or valid()):
+            self._print('`{0}` is up to date, skipped'.format(name), hashing=False)
+            return True
+
+        self.checkpoints.start(name)
+        with self.stats.stage(name):
+            status = step()
+        if status:
+            self.checkpoints.done(name, digest)
+        return status
+
     def _install_tf_doc(self):
         """
         The first step is to install TensorFlow-docs in `https://github.com/tensorflow/docs`.
@@ -124,8 +176,9 @@ class TFAutoDocSetup(TFDocSetup):
         """
         status = [False] * 1
 
-        if not search_package('tensorflow_docs', None):
-            installed = install_package('git+{0}'.format(self.TF_DOC_URL), 'tensorflow_docs')
+        if not search_package('tensorflow_docs', None, python=self.python):
+            installed = install_package('git+{0}'.format(self.TF_DOC_URL), 'tensorflow_docs', python=self.python,
+                                        find_links=self.find_links)
             if installed:
                 status[0] = True
         else:
@@ -134,82 +187,202 @@ class TFAutoDocSetup(TFDocSetup):
 
         return status
 
-    def _install_tf(self, tf_version, tf_output, md_output):
+    def _migrate_layout(self):
+        """
+        Removes the dirs of every attempt of the earlier layout (`md--{N}`, `html--{N}`). The HTML of the latest
+        attempt becomes the shared `html` dir if it has a manifest, so its pages are not rendered again; the markdown
+        docs are generated again anyway.
+
+        Returns:
+            None
+        """
+        def attempt(dir_path):
+            suffix = dir_path.rsplit('--', 1)[1]
+            return int(suffix) if suffix.isdigit() else -1
+
+        html_dir_paths = sorted(glob.glob(os.path.join(self.dir_path, 'html--*')), key=attempt)
+        if not os.path.exists(self.html_dir_path):
+            for html_dir_path in reversed(html_dir_paths):
+                if os.path.exists(os.path.join(html_dir_path, self.MANIFEST_FILE)):
+                    os.rename(html_dir_path, self.html_dir_path)
+                    break
+
+        for dir_path in glob.glob(os.path.join(self.dir_path, 'md--*')) + html_dir_paths:
+            if os.path.isdir(dir_path):
+                shutil.rmtree(dir_path, ignore_errors=True)
+
+    def _clone_tf(self, tf_version, tf_output):
         """
-        The second step is to install TensorFlow->Docs and TensorFlow in `https://github.com/tensorflow/tensorflow`.
+        Checks out the docs generator of TensorFlow, in `https://github.com/tensorflow/tensorflow`, from the mirror
+        shared by every version: only the commit of the version is fetched and only `SPARSE_PATHS` are checked out.
 
         Args:
             tf_version (str): The version of TensorFlow which is used
-            tf_output (str): The root dir for clone of TensorFlow->Docs
-            md_output (str): The root dir for output of TensorFlow->Docs in markdown format.
+            tf_output (str): The root dir for checkout of TensorFlow->Docs
 
         Returns:
-            status (:list:`bool`)
+            status (bool)
         """
-        status = [False] * 3
+        # the full clones the previous attempts have made
+        self.mirror.clean(glob.glob(os.path.join(self.dir_path, 'tf--*')))
 
-        # print('tf_output', tf_output)
-        # print('status', not os.path.exists(tf_output) or not len(os.listdir(tf_output)) > 0)
-        if not os.path.exists(tf_output) or not len(os.listdir(tf_output)) > 0:
-            # subprocess.call(['git', 'clone', '--branch', tf_version, self.TF_URL, tf_output])
-            _, s = run_task('git clone --progress --branch {0} {1} {2}'.format(tf_version, self.TF_URL, tf_output))
-            status[0] = s
-        else:
-            status[0] = False
+        return self.mirror.fetch(tf_version) and self.mirror.checkout(tf_version, tf_output, self.SPARSE_PATHS)
 
-        if not search_package('tensorflow', tf_version[1:].replace('-', '')):
-            installed = install_package('tensorflow', 'tensorflow', tf_version[1:])
-            if installed:
-                status[1] = True
+    def _install_tf(self, tf_version):
+        """
+        Installs the pip package of TensorFlow, which the docs generator documents.
 
-        else:
+        Args:
+            tf_version (str): The version of TensorFlow which is used
+
+        Returns:
+            status (bool)
+        """
+        if search_package('tensorflow', tf_version[1:].replace('-', ''), python=self.python):
             self._print('The `tensorflow=={0}` has already been installed!'.format(tf_version), hashing=False)
-            status[1] = True
+            return True
+
+        return install_package('tensorflow', 'tensorflow', tf_version[1:], python=self.python,
+                               find_links=self.find_links)
+
+    def _generate_md(self, tf_output, md_output, clean=False):
+        """
+        Generates the markdown docs with the generator of the cloned TensorFlow.
+
+        Args:
+            tf_output (str): The root dir for clone of TensorFlow->Docs
+            md_output (str): The root dir for output of TensorFlow->Docs in markdown format.
+            clean (bool): If it is True, the docs of a previous attempt are removed first.
+
+        Returns:
+            status (bool)
+        """
+        if clean:
+            shutil.rmtree(md_output, ignore_errors=True)
+            os.makedirs(md_output, exist_ok=True)
 
         doc_path = os.path.join(tf_output, 'tensorflow', 'tools', 'docs')
-        if doc_path not in sys.path:
-            sys.path.insert(0, doc_path)
 
-        # subprocess.call(['python', os.path.join(doc_path, 'generate2.py'), '--output_dir={0}'.format(md_output)])
         generate_py = 'generate2.py' if self.version[1] == '2' else 'generate.py'
-        _, s = run_task('python {0} --output_dir={1}'.format(os.path.join(doc_path, generate_py),
-                                                             self._sanitize_dir_path(md_output, abspath=True)))
-        status[2] = s
-
+        _, status = run_task([self.python, os.path.join(doc_path, generate_py),
+                              '--output_dir={0}'.format(self._sanitize_dir_path(md_output, abspath=True))])
         return status
 
-    def run(self):
+    def prepare(self):
         """
-        The procedure of auto-generating the DocSet for TensorFlow 2.x
+        The network-bound part of the build: installs tensorflow-docs, clones and installs TensorFlow.
+
+        Raises:
+            Exception: If any of the steps has failed.
 
         Returns:
             None
         """
         self._print('Installing tensorflow-docs', self.LENGTH)
-        status = self._install_tf_doc()
-        if not all(status):
+        status = self._stage('install_tf_doc', [self.TF_DOC_URL, self.python, self.find_links],
+                             lambda: all(self._install_tf_doc()),
+                             lambda: search_package('tensorflow_docs', None, python=self.python))
+        if not status:
             self._update_info(os.path.join(self.dir_path, self.INFO_FILE))
             raise Exception(
                 'Some error has been occurred during installing {0}--{1}'.format('tensorflow_docs', self.TF_DOC_URL))
 
         self._print('Installing tensorflow & documents for TF-{0}'.format(self.version), self.LENGTH)
-        status = self._install_tf(self.version, self.tf_dir_path, self.md_dir_path)
-        if not all(status):
+        cloned = self._stage('clone_tf', [self.TF_URL, self.version, self.SPARSE_PATHS],
+                             lambda: self._clone_tf(self.version, self.tf_dir_path),
+                             lambda: os.path.isdir(self.tf_dir_path))
+        installed = cloned and self._stage(
+            'install_tf', [self.version, self.python, self.find_links], lambda: self._install_tf(self.version),
+            lambda: search_package('tensorflow', self.version[1:].replace('-', ''), python=self.python))
+        if not installed:
             self._update_info(os.path.join(self.dir_path, self.INFO_FILE))
             raise Exception(
                 'Some error has been occurred during installing {0}=={1}'.format('tensorflow', self.version))
 
+    def generate(self):
+        """
+        The CPU-bound part of the build: generates the markdown docs and renders them into the DocSet.
+
+        Raises:
+            Exception: If the markdown docs could not be generated.
+
+        Returns:
+            None
+        """
+        generated = self._stage('generate_md', [self.version, self.python],
+                                lambda: self._generate_md(self.tf_dir_path, self.md_dir_path, clean=True),
+                                lambda: len(os.listdir(self.md_dir_path)) > 0)
+        if not generated:
+            self._update_info(os.path.join(self.dir_path, self.INFO_FILE))
+            raise Exception('Some error has been occurred during generating the docs of {0}=={1}'.format(
+                'tensorflow', self.version))
+
         self._print('Preparing documents for DocSet', self.LENGTH)
 
+        md_dir_path = self.md_dir_path
         if self.version[1] == '1':
-            self.md_dir_path = os.path.join(self.md_dir_path, 'api_docs', 'python')
+            md_dir_path = os.path.join(md_dir_path, 'api_docs', 'python')
+
+        # the manifest resumes an interrupted rendering at the pages which have not been written yet
+        manifest_path = os.path.join(self.html_dir_path, self.MANIFEST_FILE)
+        self._stage('render_html', [self._config_hash(self.static_math), self.store is not None],
+                    lambda: self._render_html(md_dir_path), lambda: os.path.exists(manifest_path))
+        self._stage('dashing', [self._dashing_config()], self._write_dashing,
+                    lambda: os.path.exists(os.path.join(self.html_dir_path, 'dashing.json')))
+
+        if self.docset:
+            self._print('Packing the DocSet', self.LENGTH)
+            self._stage('docset', [self.store is not None], self._pack_docset,
+                        lambda: os.path.isdir(os.path.join(self.dir_path, self.DOCSET_NAME)))
+
+    def _render_html(self, md_dir_path):
+        """
+        Renders the markdown docs, only the pages which have not been rendered yet or have changed.
 
-        self.md_to_html(self.md_dir_path, self.html_dir_path)
-        dashing_cfg = json.loads(DASHING)
-        for k, v in self.DASHING_CONFIG.items():
-            dashing_cfg[k] = v
+        Args:
+            md_dir_path (str): The root dir of the markdown docs.
+
+        Returns:
+            status (bool)
+        """
+        self.md_to_html(md_dir_path, self.html_dir_path, jobs=self.jobs, incremental=True,
+                        static_math=self.static_math, stats=self.stats, store=self.store, optimize=self.optimize,
+                        backend=self.backend, base=self.base_html_dir_path)
+        return True
+
+    def _write_dashing(self):
+        """
+        Writes the dashing configuration next to the rendered docs.
 
+        Returns:
+            status (bool)
+        """
         with open(os.path.join(self.html_dir_path, 'dashing.json'), 'w') as fout:
-            json.dump(dashing_cfg, fout)
+            json.dump(self._dashing_config(), fout)
+        return True
+
+    def _pack_docset(self):
+        """
+        Packs the `.docset` bundle, with the search index entries recorded in the manifest of the rendered docs.
+
+        Returns:
+            status (bool)
+        """
+        manifest = Manifest.load(os.path.join(self.html_dir_path, self.MANIFEST_FILE))
+        self.build_docset(self.html_dir_path, self._collect_symbols(manifest), self.store)
+        return True
+
+    def run(self):
+        """
+        The procedure of auto-generating the DocSet for TensorFlow 2.x
+
+        Returns:
+            None
+        """
+        try:
+            self.prepare()
+            self.generate()
+        finally:
+            self._report_stats(self.stats, self.report_path)
 
         self._print('It is done!', hashing=False)
@@ -1,11 +1,59 @@
 import collections
-import fnmatch
-import misaka
+import functools
+import hashlib
+import json
+import multiprocessing
 import os
 import shutil
+import time
 from tqdm import tqdm
-from .utils import HighlighterRenderer
+from .utils import Highlighter
 from .utils import copytree
+from .backends import BACKENDS, create_backend
+from .store import atomic_copy, atomic_write, link_file
+from .template import PREAMBLE_PATTERN, PageTemplate, strip_preamble
+from .minify import PYGMENTS_RULE_PATTERN, minify_css, minify_html
+from .manifest import Manifest, file_hash, tree_hash
+from .docset import DocSetBuilder, extract_symbols
+from .dashing import DASHING
+from .pipeline import OutputDirs, RenderPipeline, scan_files
+from .links import LinkIndex, to_posix
+from .formulas import StaticMath
+from .instrument import BuildStats
+
+# a markdown source (relative to the markdown root) and the absolute paths it is rendered from/to
+Page = collections.namedtuple('Page', ['source', 'md_file', 'out_file'])
+
+# per-process state of the rendering pool, see `_init_worker`
+_WORKER = {}
+
+
+def _init_worker(doc_setup, static_math=False):
+    """
+    Builds the renderer once per worker process.
+
+    Args:
+        doc_setup (TFDocSetup): The DocSet setup which owns the rendering.
+        static_math (bool): If it is True, the formulas are converted into MathML while rendering.
+
+    Returns:
+        None
+    """
+    _WORKER['doc_setup'] = doc_setup
+    _WORKER['renderer'] = doc_setup._create_renderer(static_math)
+
+
+def _render_worker(item):
+    """
+    Renders a single page inside a worker process.
+
+    Args:
+        item (tuple): The page, its markdown content and its info, as read by `TFDocSetup._read_page`.
+
+    Returns:
+        item (tuple): The page, its rendered HTML and its info.
+    """
+    return _WORKER['doc_setup']._render_page(_WORKER['renderer'], item)
 
 
 class TFDocSetup:
@@ -16,13 +64,57 @@ class TFDocSetup:
         'images': ['icon.png', 'icon@2x.png'],
         'js': ['math.js', 'main.js']
     }
+    MATH_ASSETS = ['math.js', 'main.js']
+    # the stylesheets of `ASSETS_MAP` and the code highlighting, in one file linked by the optimized pages
+    CSS_BUNDLE = 'bundle.css'
     TF_URL = 'https://github.com/tensorflow/tensorflow'
     TF_DOC_URL = 'https://github.com/tensorflow/docs'
     INFO_FILE = 'info.json'
+    MANIFEST_FILE = 'manifest.json'
+    BROKEN_LINKS_FILE = 'broken_links.json'
+    DOCSET_NAME = 'TensorFlow.docset'
+    # the depths of the read-ahead/write queues and the number of reader/writer threads of the rendering pipeline
+    READ_AHEAD = 64
+    WRITE_QUEUE = 64
+    IO_THREADS = 4
+    # the seconds between two saves of the manifest while rendering, an interrupted run resumes from the last one
+    CHECKPOINT_INTERVAL = 10.0
     INFO = {'TRIED': 0}
     LENGTH = 70
     DASHING_CONFIG = {}
-    STYLE_RELACER = '<p>page_type: reference<br>\n<style>{% include &quot;site-assets/css/style.css&quot; %}</style>'
+    MD_EXTENSIONS = (
+        'tables',
+        'fenced-code',
+        'footnotes',
+        'autolink',
+        'strikethrough',
+        'underline',
+        'highlight',
+        'quote',
+        'superscript',
+        'math',
+        'no-intra-emphasis',
+        'space-headers',
+        'math-explicit',
+        'disable-indented-code')
+
+    _template = None
+    # if it is True, the pages are minified and link the bundled stylesheet, see `md_to_html`
+    optimize = False
+    # the markdown engine, one of `backends.BACKENDS`
+    backend = 'misaka'
+    # what the processes of the rendering pool get of a setup, see `_render_setup`
+    RENDER_STATE = ('link_index', 'optimize', 'backend', '_template')
+    # the start method of the rendering pool, `spawn` on macOS (default: the one of the platform)
+    START_METHOD = None
+
+    @property
+    def template(self):
+        # built lazily, so every rendering process caches the fragments of its own
+        assets_map = dict(self.ASSETS_MAP, css=[self.CSS_BUNDLE]) if self.optimize else self.ASSETS_MAP
+        if self._template is None or self._template.assets_map != assets_map:
+            self._template = PageTemplate(assets_map, self.MATH_ASSETS)
+        return self._template
 
     def _sanitize_dir_path(self, dir_path, abspath=False):
         """
@@ -65,96 +157,620 @@ class TFDocSetup:
         else:
             print('\n{0}\n'.format(title))
 
-    def md_to_html(self, md_dir_path, html_dir_path):
+    def _create_renderer(self, static_math=False):
+        """
+        Creates the markdown renderer used to convert every single page, with compact code blocks if `optimize`.
+
+        Args:
+            static_math (bool): If it is True, the formulas are converted into MathML while rendering.
+
+        Returns:
+            renderer (RendererBackend): The markdown renderer of `backend`.
+        """
+        return create_backend(self.backend, Highlighter(compact=self.optimize),
+                              StaticMath() if static_math else None, self.MD_EXTENSIONS)
+
+    def _config_hash(self, static_math=False):
+        """
+        Computes the hash of everything, besides the markdown sources, which affects the rendered pages.
+
+        Args:
+            static_math (bool): If the formulas are converted into MathML while rendering.
+
+        Returns:
+            digest (str): The hex digest of the renderer/asset configuration.
+        """
+        digest = hashlib.sha1()
+        config = [type(self).__name__, self.backend, self.MD_EXTENSIONS, self.ASSETS_MAP, self.MATH_ASSETS,
+                  PREAMBLE_PATTERN.pattern, static_math, self.optimize]
+        # the pages only refer to the assets by name, their contents are tracked apart (`Manifest.assets`)
+        digest.update(json.dumps(config, sort_keys=True).encode('utf-8'))
+        return digest.hexdigest()
+
+    def _plan_pages(self, md_dir_path, html_dir_path, previous=None):
+        """
+        Walks the markdown tree in a deterministic order and assigns the output path of each page.
+
+        Args:
+            md_dir_path (str): The root dir with TensorFlow generated markdown docs
+            html_dir_path (str): The root dir to save rendered HTML files.
+            previous (dict): The page records of a previous run, whose output paths are kept as they are.
+
+        Returns:
+            pages (:list:`Page`): The pages in rendering order.
+        """
+        # the tree is scanned in sorted order, so the conflict suffixes are the same on every run
+        sources = list(scan_files(md_dir_path, '.md'))
+
+        # lower-cased output paths which have already been taken
+        taken = set()
+        outputs = {}
+        for source in sources:
+            if previous and source in previous:
+                outputs[source] = previous[source]['output']
+                taken.add(outputs[source].lower())
+
+        pages = []
+        for source in sources:
+            output = outputs.get(source)
+            if output is None:
+                output = os.path.splitext(source)[0] + '.html'
+
+                # If the same file name (case insensitive) has already been
+                # written to this folder, add a suffix to make it different to
+                # avoid problems in case insensitive filesystems
+                start, ext = os.path.splitext(output)
+                num = 0
+                while output.lower() in taken:
+                    num += 1
+                    output = '{start}_{num}{ext}'.format(start=start, num=num, ext=ext)
+
+                taken.add(output.lower())
+
+            pages.append(Page(source, os.path.join(md_dir_path, source), os.path.join(html_dir_path, output)))
+
+        return pages
+
+    def _read_page(self, page):
+        """
+        Reads the markdown source of a page.
+
+        Args:
+            page (Page): The page to read.
+
+        Returns:
+            item (tuple): The page, its markdown content and its info (the content hash so far).
+        """
+        with open(page.md_file, 'rb') as fin:
+            data = fin.read()
+
+        return page, data.decode('utf-8'), {'hash': hashlib.sha1(data).hexdigest()}
+
+    def _render_setup(self):
+        """
+        Copies the configuration the rendering needs (`RENDER_STATE`) for the processes of the pool, which get it
+        pickled under `spawn`. The rest of the build (stats, store, locks, ...) stays in the parent process.
+
+        Returns:
+            doc_setup (TFDocSetup): A setup of the same class, which can only render pages.
+        """
+        doc_setup = type(self).__new__(type(self))
+        for name in self.RENDER_STATE:
+            if name in self.__dict__:
+                setattr(doc_setup, name, self.__dict__[name])
+        return doc_setup
+
+    def _render_page(self, renderer, item):
+        """
+        Renders the markdown content of a page into the HTML page.
+
+        Args:
+            renderer (RendererBackend): The markdown renderer.
+            item (tuple): The page, its markdown content and its info.
+
+        Returns:
+            item (tuple): The page, the encoded pieces of its HTML (header, body, footer) and its info, along with
+                its search index entries.
+        """
+        page, text, info = item
+        start = time.perf_counter()
+        renderer.reset()
+        saved = renderer.highlighter.saved
+        rendered = renderer.render(strip_preamble(text))
+        info['math'] = renderer.formulas
+        info['static_math'] = renderer.static_formulas
+        info['languages'] = dict(renderer.languages)
+        # points the links to the rendered pages
+        rendered, info['links'], info['broken'] = self.link_index.rewrite(page.source, rendered)
+
+        info['symbols'] = extract_symbols(rendered)
+        raw_size = None
+        if self.optimize:
+            # the size of the body without the compact code blocks and the minification
+            raw_size = len(rendered.encode('utf-8')) + renderer.highlighter.saved - saved
+            rendered = minify_html(rendered)
+
+        # the output keeps the dirs of the source, whatever the conflict suffix of its name
+        header, footer = self.template.fragments(to_posix(page.source).count('/'), info['math'])
+        parts = (header, rendered.encode('utf-8'), footer)
+        if raw_size is not None:
+            info['raw_size'] = len(header) + raw_size + len(footer)
+        info['time'] = time.perf_counter() - start
+        return page, parts, info
+
+    def _write_page(self, out_dirs, item, store=None):
+        """
+        Writes the rendered HTML page, the file is replaced rather than written in place since it may be a hardlink.
+
+        Args:
+            out_dirs (OutputDirs): The output dirs created so far.
+            item (tuple): The page, the encoded pieces of its HTML and its info.
+            store (BlobStore): If it is given, the page is written once into the store and linked from there.
+
+        Returns:
+            page (Page): The written page.
+            info (dict): The info of the page.
+        """
+        page, parts, info = item
+        out_dirs.ensure(os.path.dirname(page.out_file))
+        # the pieces are written one after another, the page is never joined in memory
+        if store is not None:
+            store.write(page.out_file, parts)
+        else:
+            atomic_write(page.out_file, parts)
+
+        info['size'] = sum(len(part) for part in parts)
+        return page, info
+
+    def md_to_html(self, md_dir_path, html_dir_path, jobs=1, incremental=False, read_ahead=None, write_queue=None,
+                   static_math=False, stats=None, store=None, renderer=None, optimize=False, backend='misaka',
+                   base=None):
         """
         Converts the markdown format of TensorFlow-Doc into HTML format, which is suitable by DocSet Dashing.
 
         Args:
             md_dir_path: The root dir with TensorFlow generated markdown docs
             html_dir_path: The root dir to save rendered HTML files.
+            jobs (int): The number of processes used for rendering (default: 1, no process pool).
+            incremental (bool): If it is True, only the pages changed since the previous run are rendered.
+            read_ahead (int): The maximum number of pages read but not rendered yet (default: `READ_AHEAD`).
+            write_queue (int): The maximum number of pages rendered but not written yet (default: `WRITE_QUEUE`).
+            static_math (bool): If it is True, the formulas are converted into MathML at build time and MathJax is
+                only kept for the ones which could not be converted.
+            stats (BuildStats): Collects the timings of the stages and the pages (default: a new one).
+            store (BlobStore): If it is given, the pages and assets are stored once and hardlinked into the tree,
+                which shares them with the trees of other versions.
+            renderer (RendererBackend): A renderer to reuse when rendering in-process, e.g. by the runs of the watch
+                mode (default: a new one).
+            optimize (bool): If it is True, the pages are minified, their code blocks only keep the spans of the
+                colored tokens and the stylesheets are bundled into `CSS_BUNDLE`.
+            backend (str): The markdown engine, one of `backends.BACKENDS`.
+            base (str): The HTML dir of a previous version, rendered with the same configuration. If it is given
+                and `html_dir_path` has not been built yet, only the pages added or changed since the base are
+                rendered, the others are linked from it.
+
+        Raises:
+            Exception: If the backend is not installed.
+
+        Returns:
+            symbols (:list:`tuple`): The (name, type, path) search index entries of the whole tree.
+        """
+        stats = stats or BuildStats()
+        # set before the pool is created, the workers get a copy of `self`
+        self.optimize = optimize
+        self.backend = backend
+        # fails here rather than in every worker
+        if not BACKENDS[backend].available:
+            raise Exception('The {0} backend is not installed'.format(backend))
+        manifest_path = os.path.join(html_dir_path, self.MANIFEST_FILE)
+        if static_math and not StaticMath.available:
+            self._print('`latex2mathml` is not installed, the formulas are left to MathJax', self.LENGTH, False)
+            static_math = False
+
+        if stats.profile and jobs > 1:
+            self._print('The render loop is profiled in-process, `jobs` is ignored', self.LENGTH, False)
+            jobs = 1
+
+        with stats.stage('plan'):
+            config = self._config_hash(static_math)
+            # a full build renders every page again, but still removes the pages removed since the previous one
+            manifest = Manifest.load(manifest_path)
+            rebuild = not incremental or manifest is None or manifest.config != config
+            # a new version starts from the pages of the base, an existing tree is updated as usual
+            base_manifest = self._load_base(base, config) if base and incremental and manifest is None else None
+            if manifest is None:
+                manifest = Manifest(config)
+
+            # the output paths are assigned up front, so the conflict suffixes do not depend on `jobs`
+            pages = self._plan_pages(md_dir_path, html_dir_path,
+                                     base_manifest.pages if base_manifest is not None else manifest.pages)
+
+            # all the links are resolved against the final output paths, including the conflict suffixes
+            self.link_index = LinkIndex(
+                {page.source: os.path.relpath(page.out_file, html_dir_path) for page in pages})
+            if base_manifest is not None:
+                self._reuse_base(pages, base, base_manifest, html_dir_path, manifest)
+                rebuild = False
+            stale = self._stale_pages(pages, manifest, rebuild, html_dir_path)
+        self._print('Rendering {0} out of {1} pages'.format(len(stale), len(pages)), self.LENGTH, False)
+
+        self._copy_assets(html_dir_path, manifest, rebuild, stats, store)
+        manifest.config = config
+        self._render_pages(stale, html_dir_path, manifest, stats, jobs, static_math, store, renderer, read_ahead,
+                           write_queue)
+        return self._finish(md_dir_path, html_dir_path, manifest, [page.source for page in pages], static_math,
+                            stats, store)
+
+    def _load_base(self, base, config):
+        """
+        Reads the manifest of the base version, if its pages can be reused.
+
+        Args:
+            base (str): The HTML dir of the base version.
+            config (str): The hash of the current configuration.
+
+        Returns:
+            manifest (Manifest): The manifest of the base, or None if it has none or another configuration.
+        """
+        manifest = Manifest.load(os.path.join(base, self.MANIFEST_FILE))
+        if manifest is None:
+            self._print('{0} has not been built, every page is rendered'.format(base), self.LENGTH, False)
+        elif manifest.config != config:
+            self._print('{0} has been rendered with another configuration, every page is rendered'.format(base),
+                        self.LENGTH, False)
+            manifest = None
+        return manifest
+
+    def _reuse_base(self, pages, base, base_manifest, html_dir_path, manifest):
+        """
+        Links the pages which have not changed since the base version into the output and records them, so only
+        the added and changed pages are left to render. A page is unchanged if its markdown has the same content
+        hash and the pages it links to have kept their output paths; the removed pages are simply not carried over.
+
+        Args:
+            pages (:list:`Page`): The planned pages.
+            base (str): The HTML dir of the base version.
+            base_manifest (Manifest): The manifest of the base version.
+            html_dir_path (str): The root dir of the rendered HTML files.
+            manifest (Manifest): The manifest of the rendered tree, the reused pages are recorded into it.
 
         Returns:
             None
         """
-        renderer = HighlighterRenderer(flags=('hard-wrap',))
-        extensions = (
-            'tables',
-            'fenced-code',
-            'footnotes',
-            'autolink',
-            'strikethrough',
-            'underline',
-            'highlight',
-            'quote',
-            'superscript',
-            'math',
-            'no-intra-emphasis',
-            'space-headers',
-            'math-explicit',
-            'disable-indented-code')
-        renderer = misaka.Markdown(renderer, extensions=extensions)
-
-        # converted filename -> number of (case sensitive) conflicts
-        case_sensitive_conflicts = collections.defaultdict(int)
-
-        # copy whole assets
-        copytree(self.ASSETS_PATH, html_dir_path)
-
-        root_len = len(md_dir_path)
-        for root, dirnames, filenames in tqdm(os.walk(md_dir_path)):
-            for filename in fnmatch.filter(filenames, '*.md'):
-                md_file = os.path.join(root, filename)
-                out_file = os.path.splitext(md_file)[0] + '.html'
-
-                # Remove markdown root from path and append to HTML output root
-                # Also strip path separators since
-                #   os.path.join('foo', '/bar') == '/bar'
-                out_file = os.path.join(html_dir_path, out_file[root_len:].strip(os.sep))
-
-                # If destination folder does not exist, create it
-                out_dir = os.path.dirname(out_file)
-                if not os.path.exists(out_dir):
-                    os.makedirs(os.path.dirname(out_file))
+        out_dirs = OutputDirs()
+        reused = 0
+        for page in pages:
+            record = base_manifest.pages.get(page.source)
+            if (not record or 'hash' not in record or record['output'] != os.path.relpath(page.out_file, html_dir_path)
+                    or record['hash'] != file_hash(page.md_file) or self.link_index.changed(record)):
+                continue
 
-                # If the same file name (case insensitive) has already been
-                # written to this folder, add a suffix to make it different to
-                # avoid problems in case insensitive filesystems
-                if case_sensitive_conflicts[out_file.lower()] > 0:
-                    start, ext = os.path.splitext(out_file)
-                    out_file = '{start}_{num}{ext}'.format(
-                        start=start,
-                        num=case_sensitive_conflicts[out_file.lower()],
-                        ext=ext)
-
-                case_sensitive_conflicts[out_file.lower()] += 1
-
-                # Render Markdown and write it
-                with open(md_file, 'r') as fin, open(out_file, 'w') as fout:
-                    rendered = renderer(fin.read())
-                    depth_path = '../' * (len(out_file.split(os.sep)) - 5)
-
-                    # Replace initial metadata with link to our style
-                    css, js = '', ''
-                    for asset_name, asset_paths in self.ASSETS_MAP.items():
-                        for asset_path in asset_paths:
-
-                            if asset_name == 'css':
-                                asset_path = '{0}{1}/{2}'.format(depth_path, asset_name, asset_path)
-                                css += f'<link rel="stylesheet" href="{asset_path}" />\n'
-
-                            if asset_name == 'js':
-                                asset_path = '{0}{1}/{2}'.format(depth_path, asset_name, asset_path)
-                                js += f'<script src="{asset_path}"></script>\n'
-
-                    if rendered[:len(self.STYLE_RELACER)] == self.STYLE_RELACER:
-                        rendered = rendered[len(self.STYLE_RELACER):] + '<p>'
-                    rendered = css + rendered + js
-
-                    # replace .md link with .html
-                    rendered = rendered.replace('.md', '.html')
-                    fout.write(rendered)
-
-        shutil.copy(os.path.join(md_dir_path, '_toc.yaml'), html_dir_path)
+            base_file = os.path.join(base, record['output'])
+            if not os.path.exists(base_file):
+                continue
+            out_dirs.ensure(os.path.dirname(page.out_file))
+            # the store (if any) already holds the file of the base, a hardlink shares it as well
+            link_file(base_file, page.out_file)
+            manifest.record(page.source, page.md_file, record['output'], record)
+            reused += 1
+
+        removed = len(set(base_manifest.pages) - set(page.source for page in pages))
+        self._print('{0} pages are unchanged since {1}, {2} have been removed'.format(reused, base, removed),
+                    self.LENGTH, False)
+
+    def _stale_pages(self, pages, manifest, rebuild, html_dir_path):
+        """
+        Finds the pages to render, and forgets (and removes) the ones whose sources have been removed.
+
+        Args:
+            pages (:list:`Page`): The planned pages.
+            manifest (Manifest): The manifest of the previous run.
+            rebuild (bool): If every page has to be rendered again, e.g. the configuration has changed.
+            html_dir_path (str): The root dir of the rendered HTML files.
+
+        Returns:
+            stale (:list:`Page`): The pages to render, in order.
+        """
+        # drops the pages whose sources have been removed since the previous run
+        sources = set(page.source for page in pages)
+        for source in sorted(set(manifest.pages) - sources):
+            out_file = os.path.join(html_dir_path, manifest.pages.pop(source)['output'])
+            if os.path.exists(out_file):
+                os.remove(out_file)
+
+        if rebuild:
+            # only the output paths stay valid, so a resumed run does not take the old pages for fresh ones
+            manifest.pages = {source: {'output': record['output']} for source, record in manifest.pages.items()}
+            return list(pages)
+
+        return [page for page in pages if not manifest.is_fresh(page.source, page.md_file, page.out_file)
+                or self.link_index.changed(manifest.pages[page.source])]
+
+    def _copy_assets(self, html_dir_path, manifest, rebuild, stats, store=None):
+        """
+        Copies the assets into the output, if they have changed since the previous run.
+
+        Args:
+            html_dir_path (str): The root dir of the rendered HTML files.
+            manifest (Manifest): The manifest of the rendered tree, it records the hash of the copied assets.
+            rebuild (bool): If the assets have to be copied anyway.
+            stats (BuildStats): Collects the timings of the stages.
+            store (BlobStore): If it is given, the assets are linked from the store.
+
+        Returns:
+            None
+        """
+        assets = tree_hash(self.ASSETS_PATH)
+        if not rebuild and manifest.assets == assets:
+            return
+
+        with stats.stage('assets'):
+            # copy whole assets
+            copytree(self.ASSETS_PATH, html_dir_path, store.copy if store is not None else atomic_copy)
+            if self.optimize:
+                self._bundle_css(html_dir_path, store)
+            elif os.path.exists(os.path.join(html_dir_path, 'css', self.CSS_BUNDLE)):
+                # left by a previous optimized build
+                os.remove(os.path.join(html_dir_path, 'css', self.CSS_BUNDLE))
+            manifest.assets = assets
+
+    def _render_pages(self, stale, html_dir_path, manifest, stats, jobs=1, static_math=False, store=None,
+                      renderer=None, read_ahead=None, write_queue=None):
+        """
+        Renders and writes the stale pages, and records them into the manifest, which is saved along the way.
+
+        Args:
+            stale (:list:`Page`): The pages to render.
+            html_dir_path (str): The root dir of the rendered HTML files, the manifest is saved there.
+            manifest (Manifest): The manifest of the rendered tree.
+            stats (BuildStats): Collects the timings of the stages and the pages.
+            jobs (int): The number of processes used for rendering.
+            static_math (bool): If it is True, the formulas are converted into MathML while rendering.
+            store (BlobStore): If it is given, the pages are written once into the store and linked from there.
+            renderer (RendererBackend): A renderer to reuse when rendering in-process (default: a new one).
+            read_ahead (int): The maximum number of pages read but not rendered yet (default: `READ_AHEAD`).
+            write_queue (int): The maximum number of pages rendered but not written yet (default: `WRITE_QUEUE`).
+
+        Returns:
+            None
+        """
+        manifest_path = os.path.join(html_dir_path, self.MANIFEST_FILE)
+        pool = None
+        if jobs > 1 and len(stale) > 1:
+            context = multiprocessing.get_context(self.START_METHOD)
+            pool = context.Pool(jobs, initializer=_init_worker, initargs=(self._render_setup(), static_math))
+            render = _render_worker
+        else:
+            render = functools.partial(self._render_page, renderer or self._create_renderer(static_math))
+
+        with stats.stage('render'), stats.profiling() as profiler:
+            if profiler is not None:
+                # rendering runs on the pipeline thread, where cProfile has to be enabled
+                render = functools.partial(profiler.runcall, render)
+
+            # every page waiting in a queue is held in memory, so the queues bound the memory of the whole run
+            pipeline = RenderPipeline(
+                self._read_page,
+                render,
+                functools.partial(self._write_page, OutputDirs(), store=store),
+                readers=self.IO_THREADS,
+                writers=self.IO_THREADS,
+                read_ahead=read_ahead or self.READ_AHEAD,
+                write_queue=write_queue or self.WRITE_QUEUE,
+                pool=pool,
+                in_flight=2 * jobs)
+            saved = time.monotonic()
+            try:
+                with tqdm(total=len(stale)) as bar:
+                    for page, info in pipeline.run(stale):
+                        stats.add_page(page.source, info.pop('time'), info.pop('size'), info.pop('languages'),
+                                       info.pop('raw_size', None))
+                        manifest.record(page.source, page.md_file, os.path.relpath(page.out_file, html_dir_path),
+                                        info)
+                        if time.monotonic() - saved > self.CHECKPOINT_INTERVAL:
+                            manifest.save(manifest_path)
+                            saved = time.monotonic()
+                        if stats.live and bar.n % 50 == 0:
+                            bar.set_postfix(stats.postfix(), refresh=False)
+                        bar.update()
+            finally:
+                if pool is not None:
+                    pool.terminate()
+                # the pages written so far are kept, even if the run has failed
+                manifest.save(manifest_path)
+
+    def _finish(self, md_dir_path, html_dir_path, manifest, sources, static_math, stats, store=None):
+        """
+        Completes the output once every page has been rendered: the toc, the MathJax assets and the reports.
+
+        Args:
+            md_dir_path (str): The root dir with TensorFlow generated markdown docs.
+            html_dir_path (str): The root dir of the rendered HTML files.
+            manifest (Manifest): The manifest of the rendered tree.
+            sources (:list:`str`): The pages of the tree, in order.
+            static_math (bool): If the formulas have been converted into MathML while rendering.
+            stats (BuildStats): Collects the timings of the stages and the sizes of the pages.
+            store (BlobStore): If it is given, the files are linked from the store.
+
+        Returns:
+            symbols (:list:`tuple`): The (name, type, path) search index entries of the whole tree.
+        """
+        copy = store.copy if store is not None else atomic_copy
+        with stats.stage('finish'):
+            copy(os.path.join(md_dir_path, '_toc.yaml'), html_dir_path)
+            if self.optimize and stats.pages:
+                self._print('The rendered pages take {0:.1f}MB instead of {1:.1f}MB'.format(
+                    stats.output_bytes / (1 << 20), stats.raw_bytes / (1 << 20)), self.LENGTH, False)
+            math_pages = sum(1 for source in sources if manifest.pages[source].get('math'))
+            self._print('{0} out of {1} pages have math'.format(math_pages, len(sources)), self.LENGTH, False)
+            if static_math:
+                static_pages = sum(1 for source in sources if manifest.pages[source].get('static_math'))
+                self._print('{0} pages have static math'.format(static_pages), self.LENGTH, False)
+                self._update_math_assets(html_dir_path, math_pages > 0, copy)
+            self._report_broken_links(manifest, os.path.join(html_dir_path, self.BROKEN_LINKS_FILE))
+
+            return self._collect_symbols(manifest, sources)
+
+    def _collect_symbols(self, manifest, sources=None):
+        """
+        Collects the search index entries of the rendered pages from their manifest records.
+
+        Args:
+            manifest (Manifest): The manifest of the rendered tree.
+            sources (:list:`str`): The pages, in order (default: every page of the manifest, sorted).
+
+        Returns:
+            symbols (:list:`tuple`): The (name, type, path) search index entries.
+        """
+        symbols = []
+        for source in sources if sources is not None else sorted(manifest.pages):
+            record = manifest.pages[source]
+            path = record['output'].replace(os.sep, '/')
+            for name, symbol_type, anchor in record.get('symbols', []):
+                symbols.append((name, symbol_type, '{0}#{1}'.format(path, anchor) if anchor else path))
+        return symbols
+
+    def _bundle_css(self, html_dir_path, store=None):
+        """
+        Replaces the stylesheets of the output by one minified bundle, whose highlighting rules are scoped to the code
+        blocks and generated from the same style as the compact code blocks.
+
+        Args:
+            html_dir_path (str): The root dir of the rendered HTML files.
+            store (BlobStore): If it is given, the bundle is written once into the store and linked from there.
+
+        Returns:
+            size (int): The size of the bundle in bytes.
+            previous (int): The size of the stylesheets it replaces.
+        """
+        css_dir_path = os.path.join(html_dir_path, 'css')
+        previous = 0
+        stylesheets = [Highlighter(compact=True).stylesheet()]
+        for asset_path in self.ASSETS_MAP['css']:
+            with open(os.path.join(self.ASSETS_PATH, 'css', asset_path)) as f:
+                css = f.read()
+            previous += len(css.encode('utf-8'))
+            # the unscoped token rules would also style the spans outside of the code blocks
+            stylesheets.append(PYGMENTS_RULE_PATTERN.sub('', css))
+            os.remove(os.path.join(css_dir_path, asset_path))
+
+        bundle = minify_css('\n'.join(stylesheets)).encode('utf-8')
+        bundle_path = os.path.join(css_dir_path, self.CSS_BUNDLE)
+        if store is not None:
+            store.write(bundle_path, [bundle])
+        else:
+            atomic_write(bundle_path, [bundle])
+
+        self._print('The stylesheets take {0}B instead of {1}B'.format(len(bundle), previous), self.LENGTH, False)
+        return len(bundle), previous
+
+    def _update_math_assets(self, html_dir_path, needed, copy=atomic_copy):
+        """
+        Keeps MathJax in the output only if a page still needs it.
+
+        Args:
+            html_dir_path (str): The root dir of the rendered HTML files.
+            needed (bool): If any page has formulas which have not been converted at build time.
+            copy (callable): Copies an asset into the tree, like `shutil.copy`.
+
+        Returns:
+            None
+        """
+        for asset_path in self.MATH_ASSETS:
+            source = os.path.join(self.ASSETS_PATH, 'js', asset_path)
+            destination = os.path.join(html_dir_path, 'js', asset_path)
+            if needed and not os.path.exists(destination):
+                copy(source, destination)
+            elif not needed and os.path.exists(destination):
+                os.remove(destination)
+
+    def _report_broken_links(self, manifest, report_path):
+        """
+        Writes the links which do not point to any page of the tree.
+
+        Args:
+            manifest (Manifest): The manifest of the rendered tree.
+            report_path (str): The JSON report file.
+
+        Returns:
+            None
+        """
+        broken = {source: record['broken'] for source, record in sorted(manifest.pages.items())
+                  if record.get('broken')}
+        with open(report_path, 'w') as f:
+            json.dump(broken, f, indent=1)
+
+        if broken:
+            self._print('{0} broken links in {1} pages, see {2}'.format(
+                sum(len(targets) for targets in broken.values()), len(broken), report_path), self.LENGTH, False)
+
+    def _create_stats(self, report_path=None, profile=None, live=False):
+        """
+        Creates the statistics of a build.
+
+        Args:
+            report_path (str): The JSON report file, the profile is saved next to it.
+            profile (str): The profiler wrapped around the render loop, `cprofile` or `sampling` (default: none).
+            live (bool): If it is True, a summary is shown while rendering and at the end of the build.
+
+        Returns:
+            stats (BuildStats): The statistics.
+        """
+        profile_path = None
+        if profile and report_path:
+            profile_path = os.path.splitext(report_path)[0] + ('.prof' if profile == 'cprofile' else '.stacks')
+
+        return BuildStats(live=live, profile=profile, profile_path=profile_path)
+
+    def _report_stats(self, stats, report_path=None):
+        """
+        Saves and/or shows the statistics of a build.
+
+        Args:
+            stats (BuildStats): The statistics.
+            report_path (str): The JSON report file.
+
+        Returns:
+            None
+        """
+        if report_path:
+            stats.save(report_path)
+            self._print('The build report has been saved in {0}'.format(report_path), self.LENGTH, False)
+
+        if stats.live:
+            self._print(stats.summary(), self.LENGTH, False)
+
+    def _dashing_config(self):
+        """
+        Fills the dashing template with the configuration of this DocSet.
+
+        Returns:
+            dashing_cfg (dict): The dashing configuration.
+        """
+        dashing_cfg = json.loads(DASHING)
+        for k, v in self.DASHING_CONFIG.items():
+            dashing_cfg[k] = v
+
+        return dashing_cfg
+
+    def build_docset(self, html_dir_path, symbols, store=None):
+        """
+        Packs the rendered HTML files into a `.docset` bundle next to `html_dir_path`.
+
+        Args:
+            html_dir_path (str): The root dir of the rendered HTML files.
+            symbols (:list:`tuple`): The (name, type, path) search index entries.
+            store (BlobStore): If it is given, the documents are linked from the store instead of copied.
+
+        Returns:
+            docset_path (str): The written `.docset` bundle.
+        """
+        docset_path = os.path.join(os.path.dirname(os.path.abspath(html_dir_path)), self.DOCSET_NAME)
+        builder = DocSetBuilder(html_dir_path, docset_path, self._dashing_config(),
+                                copy=store.copy if store is not None else shutil.copy2)
+        rows = builder.build(symbols)
+        self._print('{0} entries have been indexed in {1}'.format(rows, docset_path), self.LENGTH, False)
+        return docset_path
 
     def run(self):
         raise NotImplementedError
@@ -1,20 +1,49 @@
 import json
+import logging
 import os
+import time
+from .store import BlobStore
 from .tf_doc_setup import TFDocSetup
-from .dashing import DASHING
+from .watch import create_watcher, wait_for_changes
 
 
 class TFManualDocSetup(TFDocSetup):
     """ This class is designed to create DocSet for all versions of TensorFlow 2.x automatically."""
 
-    def __init__(self, md_dir_path, html_dir_path, version=''):
+    def __init__(self, md_dir_path, html_dir_path, version='', jobs=1, incremental=True, docset=False,
+                 static_math=False, report_path=None, profile=None, live=False, store_path=None,
+                 optimize=False, backend='misaka', base_path=None):
         """
         Initializing the DocSet automation based on which version of x in TensorFlow 2.x
 
         Args:
             md_dir_path (str): The root dir with generated markdown docs
             html_dir_path (str): The root dir to save rendered HTML files
+            version (str): What version of TensorFlow do you need?
+            jobs (int): The number of processes used for rendering.
+            incremental (bool): If it is True, only the pages changed since the previous run are rendered.
+            docset (bool): If it is True, the `.docset` bundle is packed next to `html_dir_path`.
+            static_math (bool): If it is True, the formulas are converted into MathML at build time.
+            report_path (str): If it is given, the build report is saved there as JSON.
+            profile (str): The profiler wrapped around the render loop, `cprofile` or `sampling` (default: none).
+            live (bool): If it is True, a summary is shown while rendering and at the end of the build.
+            store_path (str): If it is given, the files are written once into this content-addressed store and
+                hardlinked into `html_dir_path`, so the trees of several versions share their unchanged files.
+            optimize (bool): If it is True, the pages are minified and the stylesheets are bundled.
+            backend (str): The markdown engine, one of `backends.BACKENDS`.
+            base_path (str): The HTML dir of a previous version, the pages which have not changed since then are
+                linked from it instead of rendered, if `html_dir_path` has not been built yet.
         """
+        self.jobs = jobs
+        self.incremental = incremental
+        self.docset = docset
+        self.static_math = static_math
+        self.optimize = optimize
+        self.backend = backend
+        self.base_path = base_path
+        self.report_path = report_path
+        self.stats = self._create_stats(report_path, profile, live)
+        self.store = BlobStore(store_path) if store_path else None
 
         self.md_dir_path = os.path.join(md_dir_path)
         self.html_dir_path = os.path.join(html_dir_path)
@@ -37,13 +66,68 @@ class TFManualDocSetup(TFDocSetup):
             None
         """
 
-        self._print('Preparing documents for DocSet [Manual]', self.LENGTH)
-        self.md_to_html(self.md_dir_path, self.html_dir_path)
-        dashing_cfg = json.loads(DASHING)
-        for k, v in self.DASHING_CONFIG.items():
-            dashing_cfg[k] = v
+        try:
+            self._print('Preparing documents for DocSet [Manual]', self.LENGTH)
+            symbols = self.md_to_html(self.md_dir_path, self.html_dir_path, jobs=self.jobs,
+                                      incremental=self.incremental, static_math=self.static_math, stats=self.stats,
+                                      store=self.store, optimize=self.optimize,
+                                      backend=self.backend, base=self.base_path)
+            with self.stats.stage('dashing'):
+                with open(os.path.join(self.html_dir_path, 'dashing.json'), 'w') as fout:
+                    json.dump(self._dashing_config(), fout)
 
-        with open(os.path.join(self.html_dir_path, 'dashing.json'), 'w') as fout:
-            json.dump(dashing_cfg, fout)
+            if self.docset:
+                self._print('Packing the DocSet', self.LENGTH)
+                with self.stats.stage('docset'):
+                    self.build_docset(self.html_dir_path, symbols, self.store)
+        finally:
+            self._report_stats(self.stats, self.report_path)
 
         self._print('It is done!', signature=True)
+
+    def _is_watched(self, path):
+        # the markdown pages, the toc, removed dirs and the assets; not the hidden files of editors
+        name = os.path.basename(path)
+        if name.startswith('.') or name.endswith(('~', '.tmp', '.swp')):
+            return False
+        if path.startswith(self.ASSETS_PATH + os.sep):
+            return True
+        return name.endswith('.md') or name == '_toc.yaml' or not os.path.splitext(name)[1]
+
+    def watch(self, debounce=0.2, interval=0.5):
+        """
+        Renders the changed pages again whenever the markdown docs (or the assets) change, until it is interrupted.
+        The renderer stays loaded and the manifest limits every run to the affected pages.
+
+        Args:
+            debounce (float): The seconds without any change which end a burst of changes.
+            interval (float): The seconds between two scans, if the trees have to be polled (no inotify).
+
+        Returns:
+            None
+        """
+        watcher = create_watcher([self.md_dir_path, self.ASSETS_PATH], interval)
+        renderer = self._create_renderer(self.static_math)
+        self._print('Watching {0} ({1}), press Ctrl+C to stop'.format(
+            self.md_dir_path, type(watcher).__name__), self.LENGTH, False)
+
+        try:
+            while True:
+                changed, first = wait_for_changes(watcher, debounce, self._is_watched)
+                try:
+                    # a page can not be rendered in several processes faster than the pool starts
+                    self.md_to_html(self.md_dir_path, self.html_dir_path, jobs=1, incremental=True,
+                                    static_math=self.static_math, store=self.store, renderer=renderer,
+                                    optimize=self.optimize, backend=self.backend)
+                except Exception:
+                    # e.g. a page saved halfway, the next change renders it again
+                    logging.exception('The HTML could not be updated, still watching')
+                    # the failed run has stopped all its threads, but the renderer may have been left halfway
+                    renderer = self._create_renderer(self.static_math)
+                    continue
+                self._print('{0} changes, the HTML has been updated {1:.0f}ms after the first one'.format(
+                    len(changed), 1000 * (time.time() - first)), self.LENGTH, False)
+        except KeyboardInterrupt:
+            pass
+        finally:
+            watcher.close()
@@ -0,0 +1,311 @@
+import hashlib
+import json
+import os
+import sys
+from .backends import BACKENDS
+from .formulas import StaticMath
+from .links import LinkIndex, to_posix
+from .manifest import Manifest, file_hash
+from .pipeline import OutputDirs
+from .store import BlobStore, atomic_copy, atomic_write
+from .tasks import run_tasks
+from .tf_doc_setup import Page, TFDocSetup
+
+
+def shard_of(source, shards):
+    """
+    Assigns a page to a shard by the hash of its source path, so adding or removing pages never moves the others.
+
+    Args:
+        source (str): The source path of the page, relative to the markdown root.
+        shards (int): The number of shards.
+
+    Returns:
+        index (int): The shard of the page, in `[0, shards)`.
+    """
+    return int(hashlib.sha1(to_posix(source).encode('utf-8')).hexdigest()[:8], 16) % shards
+
+
+class TFShardedDocSetup(TFDocSetup):
+    """ This class is designed to render one large markdown tree in shards, on several processes or machines, and to
+    merge them into a single HTML tree."""
+    PLAN_FILE = 'plan.json'
+    # the CLI the local shards are run with
+    SHARD_SCRIPT = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'shard.py')
+
+    def __init__(self, md_dir_path, work_dir_path, version='', jobs=1, docset=False, static_math=False,
+                 optimize=False, store_path=None, report_path=None, live=False, backend='misaka'):
+        """
+        Initializing the sharded DocSet generation.
+
+        Args:
+            md_dir_path (str): The root dir with generated markdown docs, every shard needs a copy of it.
+            work_dir_path (str): The dir of the plan and of the rendered shards (`shard-{K}-of-{N}`); the shards
+                rendered on other machines are copied there before merging.
+            version (str): What version of TensorFlow do you need?
+            jobs (int): The number of processes used for rendering a shard.
+            docset (bool): If it is True, the `.docset` bundle is packed next to the merged HTML dir.
+            static_math (bool): If it is True, the formulas are converted into MathML at build time.
+            optimize (bool): If it is True, the pages are minified and the stylesheets are bundled.
+            store_path (str): If it is given, the merged files are written once into this content-addressed store.
+            report_path (str): If it is given, the build report is saved there as JSON.
+            live (bool): If it is True, a summary is shown while rendering and at the end of the build.
+            backend (str): The markdown engine, one of `backends.BACKENDS`.
+        """
+        self.md_dir_path = md_dir_path
+        self.work_dir_path = work_dir_path
+        self.version = version
+        self.jobs = jobs
+        self.docset = docset
+        self.static_math = static_math
+        self.optimize = optimize
+        self.backend = backend
+        self.store = BlobStore(store_path) if store_path else None
+        self.report_path = report_path
+        self.stats = self._create_stats(report_path, live=live)
+        os.makedirs(self.work_dir_path, exist_ok=True)
+
+        # configures the dashing
+        self.DASHING_CONFIG = {
+            'name': '{0} {1}'.format('TensorFlow', version),
+            'package': '{0}{1}'.format('tensorflow', version),
+            'index': 'index.html',
+            'icon16x16': os.path.join('images', 'icon.png'),
+            'icon32x32': os.path.join('images', 'icon@2x.png')
+        }
+
+    def _shard_dir_path(self, index, shards):
+        return os.path.join(self.work_dir_path, 'shard-{0}-of-{1}'.format(index, shards))
+
+    def _load_plan(self):
+        """
+        Reads the plan and configures the rendering as it says.
+
+        Raises:
+            Exception: If there is no plan.
+
+        Returns:
+            plan (dict): The plan.
+        """
+        plan_path = os.path.join(self.work_dir_path, self.PLAN_FILE)
+        if not os.path.exists(plan_path):
+            raise Exception('There is no plan in {0}, run `plan` first'.format(self.work_dir_path))
+
+        with open(plan_path) as f:
+            plan = json.load(f)
+        # every shard renders with the configuration of the plan, whatever its own command line
+        self.static_math = plan['static_math']
+        self.optimize = plan['optimize']
+        self.backend = plan['backend']
+        self.link_index = LinkIndex({source: record['output'] for source, record in plan['pages'].items()})
+        return plan
+
+    def plan(self, shards):
+        """
+        Splits the markdown tree into shards. The output paths, including the conflict suffixes of the names which
+        only differ in case, are assigned here for the whole tree, so the shards never disagree on them.
+
+        Args:
+            shards (int): The number of shards.
+
+        Returns:
+            plan (dict): The shards, the rendering configuration and the source -> (output, shard) of every page.
+        """
+        plan_path = os.path.join(self.work_dir_path, self.PLAN_FILE)
+        previous = None
+        if os.path.exists(plan_path):
+            # the output paths of the previous plan are kept, like the ones of an incremental build
+            with open(plan_path) as f:
+                previous = json.load(f)['pages']
+
+        if self.static_math and not StaticMath.available:
+            self._print('`latex2mathml` is not installed, the formulas are left to MathJax', self.LENGTH, False)
+            self.static_math = False
+
+        pages = self._plan_pages(self.md_dir_path, '', previous)
+        plan = {
+            'shards': shards,
+            'static_math': self.static_math,
+            'optimize': self.optimize,
+            'backend': self.backend,
+            'pages': {page.source: {'output': page.out_file, 'shard': shard_of(page.source, shards)}
+                      for page in pages},
+        }
+        atomic_write(plan_path, [json.dumps(plan, indent=1).encode('utf-8')])
+
+        sizes = [0] * shards
+        for record in plan['pages'].values():
+            sizes[record['shard']] += 1
+        self._print('{0} pages planned in {1} shards of {2} to {3} pages'.format(
+            len(pages), shards, min(sizes), max(sizes)), self.LENGTH, False)
+        return plan
+
+    def render_shard(self, index, shards=None):
+        """
+        Renders the pages of one shard into its own dir, only the ones changed since its previous run.
+
+        Args:
+            index (int): The shard, in `[0, shards)`.
+            shards (int): The number of shards, checked against the plan (default: the one of the plan).
+
+        Raises:
+            Exception: If the shard is not part of the plan, or the formulas can not be converted here.
+
+        Returns:
+            rendered (int): The number of rendered pages.
+        """
+        plan = self._load_plan()
+        if shards is not None and shards != plan['shards']:
+            raise Exception('The plan has {0} shards, not {1}'.format(plan['shards'], shards))
+        if not 0 <= index < plan['shards']:
+            raise Exception('There is no shard {0} out of {1}'.format(index, plan['shards']))
+        if self.static_math and not StaticMath.available:
+            raise Exception('The plan converts the formulas into MathML, `latex2mathml` has to be installed')
+        if not BACKENDS[self.backend].available:
+            raise Exception('The plan renders with {0}, which is not installed'.format(self.backend))
+
+        shard_dir_path = self._shard_dir_path(index, plan['shards'])
+        manifest_path = os.path.join(shard_dir_path, self.MANIFEST_FILE)
+        with self.stats.stage('plan'):
+            config = self._config_hash(self.static_math)
+            manifest = Manifest.load(manifest_path)
+            rebuild = manifest is None or manifest.config != config
+            if manifest is None:
+                manifest = Manifest(config)
+
+            pages = [Page(source, os.path.join(self.md_dir_path, source),
+                          os.path.join(shard_dir_path, record['output']))
+                     for source, record in plan['pages'].items() if record['shard'] == index]
+            os.makedirs(shard_dir_path, exist_ok=True)
+            stale = self._stale_pages(pages, manifest, rebuild, shard_dir_path)
+        self._print('Rendering {0} out of {1} pages of shard {2}/{3}'.format(
+            len(stale), len(pages), index, plan['shards']), self.LENGTH, False)
+
+        manifest.config = config
+        self._render_pages(stale, shard_dir_path, manifest, self.stats, self.jobs, self.static_math)
+        self._report_stats(self.stats, self.report_path)
+        return len(stale)
+
+    def merge(self, html_dir_path):
+        """
+        Merges the rendered shards into one HTML tree, along with their search index entries and links, and
+        completes it like a regular build (assets, toc, reports, dashing and optionally the `.docset`).
+
+        Args:
+            html_dir_path (str): The root dir of the merged HTML files.
+
+        Raises:
+            Exception: If a shard is missing, or has not been rendered with the current plan and markdown tree.
+
+        Returns:
+            symbols (:list:`tuple`): The (name, type, path) search index entries of the whole tree.
+        """
+        plan = self._load_plan()
+        config = self._config_hash(self.static_math)
+        manifest_path = os.path.join(html_dir_path, self.MANIFEST_FILE)
+        previous = Manifest.load(manifest_path)
+        rebuild = previous is None or previous.config != config
+        manifest = Manifest(config, assets='' if rebuild else previous.assets)
+
+        with self.stats.stage('merge'):
+            # the plan settles the conflicts, this catches a plan edited or merged by hand
+            taken = {}
+            for source, record in plan['pages'].items():
+                key = record['output'].lower()
+                if key in taken:
+                    raise Exception('{0} and {1} are both rendered into {2}'.format(taken[key], source, key))
+                taken[key] = source
+
+            shard_manifests = []
+            for index in range(plan['shards']):
+                shard = Manifest.load(os.path.join(self._shard_dir_path(index, plan['shards']), self.MANIFEST_FILE))
+                if shard is None or shard.config != config:
+                    raise Exception('The shard {0}/{1} has not been rendered with the current plan'.format(
+                        index, plan['shards']))
+                shard_manifests.append(shard)
+
+            for source, record in plan['pages'].items():
+                shard_record = shard_manifests[record['shard']].pages.get(source)
+                # a missing page, or one rendered before the plan has added or renamed the pages it links to
+                if (not shard_record or 'hash' not in shard_record or shard_record['output'] != record['output']
+                        or self.link_index.changed(shard_record)):
+                    raise Exception('The page {0} of the shard {1}/{2} is missing or stale'.format(
+                        source, record['shard'], plan['shards']))
+                # the shards may have been rendered from another copy of the markdown tree
+                md_file = os.path.join(self.md_dir_path, source)
+                if not os.path.exists(md_file) or file_hash(md_file) != shard_record['hash']:
+                    raise Exception('The page {0} of the shard {1}/{2} has been rendered from another {3}'.format(
+                        source, record['shard'], plan['shards'], md_file))
+                manifest.pages[source] = shard_record
+
+            # the pages which have been removed or renamed since the previous merge
+            for source, record in (previous.pages.items() if previous else []):
+                if manifest.pages.get(source, {}).get('output') != record['output']:
+                    out_file = os.path.join(html_dir_path, record['output'])
+                    # unless another page is rendered there now
+                    if os.path.exists(out_file) and taken.get(record['output'].lower()) is None:
+                        os.remove(out_file)
+
+            copy = self.store.copy if self.store is not None else atomic_copy
+            out_dirs = OutputDirs()
+            copied = 0
+            for source, record in plan['pages'].items():
+                out_file = os.path.join(html_dir_path, record['output'])
+                # the same source, links and configuration render the same page
+                if not rebuild and previous.pages.get(source) == manifest.pages[source] and os.path.exists(out_file):
+                    continue
+                out_dirs.ensure(os.path.dirname(out_file))
+                copy(os.path.join(self._shard_dir_path(record['shard'], plan['shards']), record['output']),
+                     out_file)
+                copied += 1
+        self._print('{0} out of {1} pages have been merged from {2} shards'.format(
+            copied, len(manifest.pages), plan['shards']), self.LENGTH, False)
+
+        self._copy_assets(html_dir_path, manifest, rebuild, self.stats, self.store)
+        manifest.save(manifest_path)
+        symbols = self._finish(self.md_dir_path, html_dir_path, manifest, list(plan['pages']), self.static_math,
+                               self.stats, self.store)
+
+        with self.stats.stage('dashing'):
+            with open(os.path.join(html_dir_path, 'dashing.json'), 'w') as fout:
+                json.dump(self._dashing_config(), fout)
+
+        if self.docset:
+            self._print('Packing the DocSet', self.LENGTH)
+            with self.stats.stage('docset'):
+                self.build_docset(html_dir_path, symbols, self.store)
+
+        self._report_stats(self.stats, self.report_path)
+        return symbols
+
+    def run(self, html_dir_path, shards):
+        """
+        Plans, renders every shard in its own local process and merges them, e.g. to try a sharded build on one box.
+
+        Args:
+            html_dir_path (str): The root dir of the merged HTML files.
+            shards (int): The number of shards.
+
+        Raises:
+            Exception: If a shard has failed.
+
+        Returns:
+            None
+        """
+        self._print('Rendering {0} in {1} shards'.format(self.md_dir_path, shards), self.LENGTH)
+        with self.stats.stage('plan'):
+            self.plan(shards)
+
+        commands = [[sys.executable, self.SHARD_SCRIPT, 'render-shard', '{0}/{1}'.format(index, shards),
+                     '-i', self.md_dir_path, '-w', self.work_dir_path, '-j', str(self.jobs)]
+                    for index in range(shards)]
+        with self.stats.stage('shards'):
+            results = run_tasks(commands, concurrency=shards)
+        failed = [index for index, result in enumerate(results) if not result.status]
+        if failed:
+            raise Exception('The shards {0} out of {1} have failed'.format(
+                ', '.join(str(index) for index in failed), shards))
+
+        self._print('Merging the shards', self.LENGTH)
+        self.merge(html_dir_path)
+        self._print('It is done!', signature=True)
@@ -1,79 +1,202 @@
-import misaka
+import collections
+import hashlib
+import importlib
+import json
 import os
 import pygments
+import re
 from pygments.lexers import get_lexer_by_name
 from pygments.formatters import HtmlFormatter
+from pygments.util import ClassNotFound
 import shutil
 import subprocess
 import sys
-from tqdm import tqdm
+import threading
+from .tasks import run_task
+
+try:
+    from importlib import metadata
+except ImportError:
+    # Python < 3.8
+    import importlib_metadata as metadata
+
+
+class Highlighter:
+    """ Highlights code blocks with Pygments, reusing the lexers, the formatter and the output of repeated blocks."""
+    # the style of the token rules in `assets/css/style.css`
+    STYLE = 'colorful'
+    SPAN_PATTERN = re.compile(r'<span class="([\w-]+)">([^<]*)</span>')
+    RULE_PATTERN = re.compile(r'^\.highlight \.([\w-]+) \{', re.M)
+
+    def __init__(self, cache_size=2048, compact=False):
+        """
+        Initializing the highlighter.
+
+        Args:
+            cache_size (int): The maximum number of highlighted blocks kept in the LRU cache.
+            compact (bool): If it is True, the tokens the style does not color (names, punctuation, whitespace, ...)
+                are not wrapped into spans.
+        """
+        self.cache_size = cache_size
+        self.cache = collections.OrderedDict()
+        self.lexers = {}
+        self.compact = compact
+        self.formatter = HtmlFormatter(style=self.STYLE, nowrap=compact)
+        # the token classes which have a rule in the stylesheet
+        self.styled = set(self.RULE_PATTERN.findall(self.stylesheet()))
+        # the color of whitespace does not show
+        self.styled.discard('w')
+        self.hits = 0
+        self.misses = 0
+        # the characters the compact markup has saved so far
+        self.saved = 0
+
+    def stylesheet(self):
+        """
+        Generates the token rules of the style, scoped to the code blocks.
+
+        Returns:
+            css (str): The stylesheet.
+        """
+        # the unscoped rules (`pre`, line numbers) would restyle the rest of the page
+        return '\n'.join(line for line in self.formatter.get_style_defs('.highlight').splitlines()
+                         if line.startswith('.highlight'))
+
+    def _unwrap(self, match):
+        return match.group(0) if match.group(1) in self.styled else match.group(2)
+
+    def _format(self, text, lang):
+        # returns the highlighted block and the characters saved by the compact markup
+        highlighted = pygments.highlight(text, self.get_lexer(lang), self.formatter)
+        if not self.compact:
+            return highlighted, 0
+
+        compact = '<div class="highlight"><pre>{0}</pre></div>\n'.format(
+            self.SPAN_PATTERN.sub(self._unwrap, highlighted))
+        # the regular markup is the same tokens, all in spans, wrapped into `<div class="highlight"><pre><span></span>`
+        return compact, len(highlighted) + len('<div class="highlight"><pre><span></span></pre></div>\n') - len(compact)
+
+    def get_lexer(self, lang):
+        """
+        Looks up the lexer of a language once, falling back to plain text for the unknown ones.
+
+        Args:
+            lang (str): The language of the code block.
+
+        Returns:
+            lexer (pygments.lexer.Lexer): The lexer.
+        """
+        lexer = self.lexers.get(lang)
+        if lexer is None:
+            try:
+                lexer = get_lexer_by_name(lang, stripall=True)
+            except ClassNotFound:
+                lexer = self.get_lexer('text')
+            self.lexers[lang] = lexer
+
+        return lexer
+
+    def highlight(self, text, lang):
+        """
+        Highlights a code block.
+
+        Args:
+            text (str): The code.
+            lang (str): The language of the code block.
+
+        Returns:
+            highlighted (str): The highlighted HTML.
+        """
+        lang = lang or 'text'
+        key = (lang, hashlib.sha1(text.encode('utf-8')).digest())
+
+        entry = self.cache.get(key)
+        if entry is not None:
+            self.hits += 1
+            self.cache.move_to_end(key)
+        else:
+            self.misses += 1
+            entry = self.cache[key] = self._format(text, lang)
+            if len(self.cache) > self.cache_size:
+                self.cache.popitem(last=False)
+
+        self.saved += entry[1]
+        return entry[0]
+
+    def stats(self):
+        """
+        Reports how effective the cache has been.
+
+        Returns:
+            stats (dict): The hits, misses and size of the cache.
+        """
+        return {'hits': self.hits, 'misses': self.misses, 'size': len(self.cache), 'lexers': len(self.lexers)}
+
+
+def normalize_name(name):
+    """
+    Normalizes a distribution name the way pip does (PEP 503), e.g. `TensorFlow_Docs` -> `tensorflow-docs`.
 
+    Args:
+        name (str): The distribution name.
 
-class HighlighterRenderer(misaka.HtmlRenderer):
+    Returns:
+        name (str): The normalized name.
+    """
+    return re.sub(r'[-_.]+', '-', name).lower()
 
-    def blockcode(self, text, lang):
-        if not lang:
-            lang = 'text'
-        try:
-            lexer = get_lexer_by_name(lang, stripall=True)
-        except:
-            lexer = get_lexer_by_name('text', stripall=True)
-        formatter = HtmlFormatter()
 
-        return pygments.highlight(text, lexer, formatter)
+# interpreter -> normalized name -> version of its installed distributions, see `get_installed_packages`
+_PACKAGES = {}
+_PACKAGES_LOCK = threading.Lock()
 
-    def table(self, header, body):
-        return '<table class="table">\n' + header + '\n' + body + '\n</table>'
+# prints the installed distributions of another interpreter, e.g. of an isolated environment
+_PROBE = ('import json\n'
+          'try:\n'
+          '    from importlib import metadata\n'
+          'except ImportError:\n'
+          '    import importlib_metadata as metadata\n'
+          'print(json.dumps([[d.metadata["Name"], d.version] for d in metadata.distributions()]))\n')
 
 
-def run_task(cmd):
-    result = []
-    status = False
+def _read_packages(python):
+    if python == sys.executable:
+        importlib.invalidate_caches()
+        return [(distribution.metadata['Name'], distribution.version) for distribution in metadata.distributions()]
 
     try:
-        print('run_task: {}'.format(cmd))
-        with tqdm(unit='B', unit_scale=True, miniters=1) as pbar:
-            cmd = cmd.split(' ')
-            process = subprocess.Popen(cmd,
-                                       bufsize=0,
-                                       universal_newlines=True,
-                                       stdout=subprocess.PIPE,
-                                       stderr=subprocess.STDOUT)
-            result = []
-
-            while True:
-                line = process.stdout.readline()
-                result.append(line)
-                pbar.update()
-                sys.stdout.flush()
-
-                if not line:
-                    break
-
-            process.stdout.close()
-            return_code = process.wait()
-            if return_code != 0:
-                raise subprocess.CalledProcessError(return_code, cmd)
-            else:
-                status = True
-
-        return ''.join(result), status
-    except subprocess.CalledProcessError as e:
-        sys.stderr.write(
-            "common::run_command() : [ERROR]: output = {}, error code = {}\n".format(e.output, e.returncode))
-        return ''.join(result), status
-
-
-def pip_get_all_packages():
-    # pkgs = subprocess.check_output([sys.executable, '-m', 'pip', 'freeze'])
-    pkgs, _ = run_task('pip freeze')
-    pkgs = [pkg.split('==') for pkg in pkgs.split()]
-    pkgs = [(pkg.lower().replace('-', '_'), version) for pkg, version in pkgs]
-    return dict(pkgs)
-
-
-def search_package(name, version=None):
-    packages = pip_get_all_packages()
+        output = subprocess.check_output([python, '-c', _PROBE], stderr=subprocess.DEVNULL)
+    except (OSError, subprocess.CalledProcessError):
+        return []
+    return json.loads(output.decode('utf-8'))
+
+
+def get_installed_packages(refresh=False, python=None):
+    """
+    Reads the installed distributions from their metadata, instead of running `pip freeze`.
+
+    Args:
+        refresh (bool): If it is True, the environment is read again (e.g. after an install).
+        python (str): The interpreter whose environment is read (default: the current one, read in-process).
+
+    Returns:
+        packages (dict): The normalized name -> version of every installed distribution.
+    """
+    python = python or sys.executable
+    with _PACKAGES_LOCK:
+        if refresh or python not in _PACKAGES:
+            packages = {}
+            for name, version in _read_packages(python):
+                if name:
+                    packages.setdefault(normalize_name(name), version)
+            _PACKAGES[python] = packages
+
+        return _PACKAGES[python]
+
+
+def search_package(name, version=None, refresh=False, python=None):
+    packages = get_installed_packages(refresh, python)
+    name = normalize_name(name)
     if name in packages:
         if version:
             if not packages[name] == version:
@@ -82,22 +205,25 @@ def search_package(name, version=None):
     return False
 
 
-def install_package(pkg, name, version=None):
+def install_package(pkg, name, version=None, python=None, find_links=None):
+    python = python or sys.executable
     pkg = '{0}=={1}'.format(pkg, version) if pkg and version else '{0}'.format(pkg)
-    # subprocess.call([sys.executable, '-m', 'pip', 'install', pkg])
-    _, status = run_task('pip install {0}'.format(pkg))
+    # offline installs only look into the given dir of wheels
+    options = ['--no-index', '--find-links', find_links] if find_links else []
+    # the pip of the target interpreter, so the package lands where `get_installed_packages` looks
+    _, status = run_task([python, '-m', 'pip', 'install'] + options + [pkg])
 
     if not status:
         return False
 
     print('Evaluating ...')
-    if search_package(name):
+    if search_package(name, refresh=True, python=python):
         return True
 
     return False
 
 
-def copytree(source, destination):
+def copytree(source, destination, copy=shutil.copy):
     for item in os.listdir(source):
         if item.startswith('.'):
             continue
@@ -108,6 +234,6 @@ def copytree(source, destination):
             # shutil.copytree(source, destination, symlinks, ignore)
             new_destination = os.path.join(destination, item)
             os.makedirs(new_destination, exist_ok=True)
-            copytree(file_path, new_destination)
+            copytree(file_path, new_destination, copy)
         else:
-            shutil.copy(file_path, destination)
+            copy(file_path, destination)
@@ -0,0 +1,210 @@
+import ctypes
+import ctypes.util
+import os
+import select
+import struct
+import sys
+import time
+
+# see `inotify(7)`
+IN_MODIFY = 0x00000002
+IN_ATTRIB = 0x00000004
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_DELETE_SELF = 0x00000400
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_ISDIR = 0x40000000
+IN_NONBLOCK = 0o4000
+IN_CLOEXEC = 0o2000000
+WATCH_MASK = IN_CLOSE_WRITE | IN_ATTRIB | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | IN_DELETE | IN_DELETE_SELF
+EVENT_HEADER = struct.Struct('iIII')
+
+
+class PollingWatcher:
+    """ Finds the changed files of some trees by comparing their mtimes and sizes every `interval` seconds."""
+
+    def __init__(self, dir_paths, interval=0.5):
+        """
+        Initializing the watcher.
+
+        Args:
+            dir_paths (:list:`str`): The root dirs to watch.
+            interval (float): The seconds between two scans.
+        """
+        self.dir_paths = dir_paths
+        self.interval = interval
+        self.snapshot = self._scan()
+
+    def _scan(self):
+        snapshot = {}
+        for dir_path in self.dir_paths:
+            for root, _, filenames in os.walk(dir_path):
+                for filename in filenames:
+                    file_path = os.path.join(root, filename)
+                    try:
+                        stat = os.stat(file_path)
+                    except OSError:
+                        continue
+                    snapshot[file_path] = (stat.st_mtime_ns, stat.st_size)
+        return snapshot
+
+    def wait(self, timeout=None):
+        """
+        Waits for changes.
+
+        Args:
+            timeout (float): The maximum seconds to wait (default: until something changes).
+
+        Returns:
+            changed (set): The changed (modified, created or removed) paths, empty if none has changed in time.
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            time.sleep(self.interval if deadline is None else max(0, min(self.interval, deadline - time.monotonic())))
+            snapshot = self._scan()
+            changed = set(path for path in set(snapshot) | set(self.snapshot)
+                          if snapshot.get(path) != self.snapshot.get(path))
+            self.snapshot = snapshot
+            if changed or (deadline is not None and time.monotonic() >= deadline):
+                return changed
+
+    def close(self):
+        pass
+
+
+class InotifyWatcher:
+    """ Finds the changed files of some trees with inotify (Linux), through ctypes."""
+
+    def __init__(self, dir_paths):
+        """
+        Initializing the watcher, every dir of the trees is watched.
+
+        Args:
+            dir_paths (:list:`str`): The root dirs to watch.
+
+        Raises:
+            OSError: If inotify is not available.
+        """
+        self.libc = ctypes.CDLL(ctypes.util.find_library('c') or 'libc.so.6', use_errno=True)
+        self.fd = self.libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), 'inotify_init1 has failed')
+
+        # watch descriptor -> dir
+        self.dirs = {}
+        for dir_path in dir_paths:
+            self._add_tree(dir_path)
+
+    def _add_tree(self, dir_path):
+        # returns the files already there, they may have been written before the dir was watched
+        files = set()
+        for root, dirnames, filenames in os.walk(dir_path):
+            wd = self.libc.inotify_add_watch(self.fd, os.fsencode(root), WATCH_MASK)
+            if wd < 0:
+                raise OSError(ctypes.get_errno(), 'inotify_add_watch has failed for {0}'.format(root))
+            self.dirs[wd] = root
+            files.update(os.path.join(root, filename) for filename in filenames)
+        return files
+
+    def _read(self):
+        changed = set()
+        data = os.read(self.fd, 1 << 16)
+        offset = 0
+        while offset < len(data):
+            wd, mask, _, length = EVENT_HEADER.unpack_from(data, offset)
+            name = os.fsdecode(data[offset + EVENT_HEADER.size:offset + EVENT_HEADER.size + length].rstrip(b'\0'))
+            offset += EVENT_HEADER.size + length
+
+            if mask & IN_Q_OVERFLOW:
+                # events have been lost, everything may have changed
+                changed.update(self.dirs.values())
+                continue
+            if mask & IN_IGNORED:
+                self.dirs.pop(wd, None)
+                continue
+
+            dir_path = self.dirs.get(wd)
+            if dir_path is None:
+                continue
+            path = os.path.join(dir_path, name) if name else dir_path
+            changed.add(path)
+
+            if mask & IN_ISDIR and mask & (IN_CREATE | IN_MOVED_TO) and os.path.isdir(path):
+                changed.update(self._add_tree(path))
+        return changed
+
+    def wait(self, timeout=None):
+        """
+        Waits for changes.
+
+        Args:
+            timeout (float): The maximum seconds to wait (default: until something changes).
+
+        Returns:
+            changed (set): The changed (modified, created or removed) paths, empty if none has changed in time.
+        """
+        readable, _, _ = select.select([self.fd], [], [], timeout)
+        if not readable:
+            return set()
+        return self._read()
+
+    def close(self):
+        os.close(self.fd)
+
+
+def create_watcher(dir_paths, interval=0.5):
+    """
+    Creates an inotify watcher on Linux and a polling one elsewhere (or if inotify is not available).
+
+    Args:
+        dir_paths (:list:`str`): The root dirs to watch.
+        interval (float): The seconds between two scans of the polling watcher.
+
+    Returns:
+        watcher (InotifyWatcher|PollingWatcher): The watcher.
+    """
+    if sys.platform.startswith('linux'):
+        try:
+            return InotifyWatcher(dir_paths)
+        except (OSError, AttributeError):
+            # e.g. too many watches (`fs.inotify.max_user_watches`)
+            pass
+    return PollingWatcher(dir_paths, interval)
+
+
+def wait_for_changes(watcher, debounce=0.2, relevant=None):
+    """
+    Waits for a burst of changes to settle, e.g. an editor saving through a temporary file or a `git checkout`.
+
+    Args:
+        watcher (InotifyWatcher|PollingWatcher): The watcher.
+        debounce (float): The seconds without any change which end a burst.
+        relevant (callable): If it is given, only the paths it accepts are kept.
+
+    Returns:
+        changed (set): The changed paths of the burst.
+        first (float): The time (`time.time()`) of its first change.
+    """
+    changed = set()
+    first = None
+    while not changed:
+        changed = set(filter(relevant, watcher.wait()))
+        # the mtime is when the change has been made, which is before it has been noticed
+        first = min([_mtime(path) for path in changed] + [time.time()])
+
+    while True:
+        more = set(filter(relevant, watcher.wait(debounce)))
+        if not more:
+            return changed, first
+        changed |= more
+
+
+def _mtime(path):
+    try:
+        return os.stat(path).st_mtime
+    except OSError:
+        return time.time()
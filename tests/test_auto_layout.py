@@ -0,0 +1,39 @@
+import json
+import os
+from src.tf_auto_doc_setup import TFAutoDocSetup
+
+
+def _make(dir_path, manifest=False):
+    os.makedirs(dir_path)
+    with open(os.path.join(dir_path, 'index.html'), 'w') as f:
+        f.write(os.path.basename(dir_path))
+    if manifest:
+        with open(os.path.join(dir_path, TFAutoDocSetup.MANIFEST_FILE), 'w') as f:
+            json.dump({'config': '', 'pages': {}, 'assets': ''}, f)
+
+
+def test_the_dirs_of_the_earlier_attempts_are_migrated(tmp_path):
+    version_dir_path = tmp_path / 'v2.0.0'
+    for name in ('md--0', 'md--1', 'md--10'):
+        _make(str(version_dir_path / name))
+    _make(str(version_dir_path / 'html--0'), manifest=True)
+    _make(str(version_dir_path / 'html--2'), manifest=True)
+    # the latest attempt failed before rendering anything
+    _make(str(version_dir_path / 'html--10'))
+
+    doc_setup = TFAutoDocSetup('v2.0.0', str(tmp_path))
+
+    assert sorted(name for name in os.listdir(str(version_dir_path)) if '--' in name) == []
+    with open(os.path.join(doc_setup.html_dir_path, 'index.html')) as f:
+        assert f.read() == 'html--2'
+
+
+def test_the_shared_html_dir_is_kept(tmp_path):
+    doc_setup = TFAutoDocSetup('v2.0.0', str(tmp_path))
+    _make(os.path.join(doc_setup.html_dir_path, 'tf'), manifest=True)
+    _make(str(tmp_path / 'v2.0.0' / 'html--3'), manifest=True)
+
+    TFAutoDocSetup('v2.0.0', str(tmp_path))
+
+    assert os.path.exists(os.path.join(doc_setup.html_dir_path, 'tf', 'index.html'))
+    assert not os.path.exists(str(tmp_path / 'v2.0.0' / 'html--3'))
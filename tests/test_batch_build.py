@@ -0,0 +1,108 @@
+import os
+import shutil
+import subprocess
+import zipfile
+import pytest
+from src.scheduler import BatchScheduler
+
+# a docs generator with the interface of `tensorflow/tools/docs/generate2.py`
+GENERATOR = """import argparse, os, tensorflow
+parser = argparse.ArgumentParser()
+parser.add_argument('--output_dir')
+output_dir = parser.parse_args().output_dir
+os.makedirs(os.path.join(output_dir, 'tf'), exist_ok=True)
+with open(os.path.join(output_dir, 'tf.md'), 'w') as f:
+    f.write('# Module: tf\\n\\n[`add`](tf/add.md) of TF {0}\\n'.format(tensorflow.__version__))
+with open(os.path.join(output_dir, 'tf', 'add.md'), 'w') as f:
+    f.write('# tf.add\\n\\n```python\\ntf.add(1, 2)\\n```\\n')
+with open(os.path.join(output_dir, '_toc.yaml'), 'w') as f:
+    f.write('toc:\\n')
+"""
+
+# an in-tree build backend, so the tensorflow-docs repo installs without setuptools from the index
+BACKEND = """import os, zipfile
+
+
+def build_wheel(wheel_directory, config_settings=None, metadata_directory=None):
+    name = 'tensorflow_docs-0.1-py3-none-any.whl'
+    with zipfile.ZipFile(os.path.join(wheel_directory, name), 'w') as wheel:
+        wheel.writestr('tensorflow_docs/__init__.py', '')
+        wheel.writestr('tensorflow_docs-0.1.dist-info/METADATA',
+                       'Metadata-Version: 2.1\\nName: tensorflow_docs\\nVersion: 0.1\\n')
+        wheel.writestr('tensorflow_docs-0.1.dist-info/WHEEL',
+                       'Wheel-Version: 1.0\\nGenerator: test\\nRoot-Is-Purelib: true\\nTag: py3-none-any\\n')
+        wheel.writestr('tensorflow_docs-0.1.dist-info/RECORD', '')
+    return name
+"""
+
+
+def _git(cwd, *args):
+    subprocess.run(['git', '-c', 'user.name=test', '-c', 'user.email=test@localhost'] + list(args), cwd=cwd,
+                   check=True, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+
+def _write(path, content):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'w') as f:
+        f.write(content)
+
+
+def _tensorflow_wheel(dir_path, version):
+    dist_info = 'tensorflow-{0}.dist-info'.format(version)
+    with zipfile.ZipFile(os.path.join(dir_path, 'tensorflow-{0}-py3-none-any.whl'.format(version)), 'w') as wheel:
+        wheel.writestr('tensorflow/__init__.py', '__version__ = {0!r}\n'.format(version))
+        wheel.writestr(dist_info + '/METADATA', 'Metadata-Version: 2.1\nName: tensorflow\nVersion: {0}\n'.format(
+            version))
+        wheel.writestr(dist_info + '/WHEEL',
+                       'Wheel-Version: 1.0\nGenerator: test\nRoot-Is-Purelib: true\nTag: py3-none-any\n')
+        wheel.writestr(dist_info + '/RECORD', '')
+
+
+@pytest.fixture
+def sources(tmp_path):
+    """ A TensorFlow repo with two tagged versions, their wheels and a tensorflow-docs repo, all local."""
+    tf_path = str(tmp_path / 'tensorflow')
+    _git(str(tmp_path), 'init', '-q', tf_path)
+    _write(os.path.join(tf_path, 'tensorflow', 'tools', 'docs', 'generate2.py'), GENERATOR)
+    _write(os.path.join(tf_path, 'tensorflow', 'core', 'BUILD'), '')
+    for version in ('v2.0.0', 'v2.1.0'):
+        _write(os.path.join(tf_path, 'RELEASE.md'), version)
+        _git(tf_path, 'add', '-A')
+        _git(tf_path, 'commit', '-q', '-m', version)
+        _git(tf_path, 'tag', version)
+
+    wheels_path = str(tmp_path / 'wheels')
+    os.makedirs(wheels_path)
+    for version in ('2.0.0', '2.1.0'):
+        _tensorflow_wheel(wheels_path, version)
+
+    docs_path = str(tmp_path / 'docs')
+    _git(str(tmp_path), 'init', '-q', docs_path)
+    _write(os.path.join(docs_path, 'backend.py'), BACKEND)
+    _write(os.path.join(docs_path, 'pyproject.toml'),
+           '[build-system]\nrequires = []\nbuild-backend = "backend"\nbackend-path = ["."]\n')
+    _git(docs_path, 'add', '-A')
+    _git(docs_path, 'commit', '-q', '-m', 'docs')
+
+    return tf_path, wheels_path, 'file://' + docs_path
+
+
+@pytest.mark.skipif(shutil.which('git') is None, reason='needs git')
+def test_a_batch_builds_every_version_offline(tmp_path, sources):
+    tf_url, find_links, tf_doc_url = sources
+    dir_path = str(tmp_path / 'docs-out')
+    scheduler = BatchScheduler(['v2.0.0', 'v2.1.0'], dir_path, concurrency=2, jobs=2, cpu_slots=4,
+                               find_links=find_links, tf_url=tf_url, tf_doc_url=tf_doc_url)
+    results = scheduler.run()
+
+    assert [result['status'] for result in results] == [True, True], scheduler.summary(results)
+    for result in results:
+        version = result['version']
+        with open(os.path.join(result['html_dir_path'], 'tf.html')) as f:
+            # rendered from the docs generated by the TensorFlow of the version, installed into its environment
+            assert 'of TF {0}'.format(version[1:]) in f.read()
+        assert os.path.exists(os.path.join(result['html_dir_path'], 'tf', 'add.html'))
+        # only the docs generator has been checked out
+        tf_dir_path = os.path.join(dir_path, version, 'tf')
+        assert os.path.exists(os.path.join(tf_dir_path, 'tensorflow', 'tools', 'docs', 'generate2.py'))
+        assert not os.path.exists(os.path.join(tf_dir_path, 'tensorflow', 'core'))
@@ -0,0 +1,71 @@
+import os
+import shutil
+import subprocess
+import pytest
+from src.gitstore import GitMirror
+
+SPARSE_PATHS = ('tensorflow/tools/docs',)
+
+
+def _git(cwd, *args):
+    return subprocess.run(['git', '-c', 'user.name=test', '-c', 'user.email=test@localhost'] + list(args), cwd=cwd,
+                          check=True, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL).stdout.decode()
+
+
+def _write(path, content):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'w') as f:
+        f.write(content)
+
+
+def _files(dir_path):
+    files = []
+    for root, _, filenames in os.walk(dir_path):
+        # `.git` of a worktree is a file pointing to the mirror
+        files.extend(os.path.relpath(os.path.join(root, filename), dir_path).replace(os.sep, '/')
+                     for filename in filenames if filename != '.git')
+    return sorted(files)
+
+
+@pytest.fixture
+def upstream(tmp_path):
+    """ A bare repository with the tags `v1` and `v2`, the docs generator changes between them."""
+    work_path = str(tmp_path / 'work')
+    _git(str(tmp_path), 'init', '-q', work_path)
+    _write(os.path.join(work_path, 'README.md'), 'tf')
+    _write(os.path.join(work_path, 'tensorflow', 'core', 'BUILD'), 'core')
+    for version in ('v1', 'v2'):
+        _write(os.path.join(work_path, 'tensorflow', 'tools', 'docs', 'generate2.py'), version)
+        _git(work_path, 'add', '-A')
+        _git(work_path, 'commit', '-q', '-m', version)
+        _git(work_path, 'tag', version)
+
+    bare_path = str(tmp_path / 'upstream.git')
+    _git(str(tmp_path), 'clone', '-q', '--bare', work_path, bare_path)
+    return 'file://' + bare_path
+
+
+@pytest.mark.skipif(shutil.which('git') is None, reason='needs git')
+def test_versions_are_checked_out_sparse_from_one_mirror(tmp_path, upstream):
+    mirror = GitMirror(str(tmp_path / 'tensorflow.git'), upstream)
+    checkouts = {version: str(tmp_path / version / 'tf') for version in ('v1', 'v2')}
+
+    for version, path in checkouts.items():
+        assert mirror.fetch(version)
+        assert mirror.checkout(version, path, SPARSE_PATHS)
+        # only the sparse paths (and the files at the top) are materialized
+        assert _files(path) == ['README.md', 'tensorflow/tools/docs/generate2.py']
+        with open(os.path.join(path, 'tensorflow', 'tools', 'docs', 'generate2.py')) as f:
+            assert f.read() == version
+
+    # a fetched version is not fetched again, even if the upstream is gone
+    mirror.url = str(tmp_path / 'missing.git')
+    assert mirror.fetch('v1')
+    assert mirror.checkout('v1', checkouts['v1'], SPARSE_PATHS)
+
+    mirror.clean([checkouts['v1']])
+    assert not os.path.exists(checkouts['v1'])
+    worktrees = _git(str(tmp_path), '--git-dir={0}'.format(mirror.path), 'worktree', 'list', '--porcelain')
+    # the removed worktree has been pruned, the other one is kept
+    assert checkouts['v1'] not in worktrees
+    assert checkouts['v2'] in worktrees
@@ -0,0 +1,67 @@
+import threading
+import time
+import pytest
+from src.pipeline import RenderPipeline
+
+
+class _Recorder:
+    """ Renders the items by doubling them, fails on one of them and records every stage it has gone through."""
+
+    def __init__(self, failing=None):
+        self.failing = failing
+        self.lock = threading.Lock()
+        self.read = []
+        self.written = []
+
+    def read_item(self, item):
+        with self.lock:
+            self.read.append(item)
+        return item
+
+    def render(self, item):
+        if item == self.failing:
+            raise ValueError('broken page {0}'.format(item))
+        return item * 2
+
+    def write(self, result):
+        # slower than the rest, so the bounded queues fill up behind it
+        time.sleep(0.001)
+        with self.lock:
+            self.written.append(result)
+        return result
+
+
+def _pipeline(recorder):
+    return RenderPipeline(recorder.read_item, recorder.render, recorder.write, readers=2, writers=2, read_ahead=2,
+                          write_queue=2)
+
+
+def test_every_item_is_written():
+    recorder = _Recorder()
+    assert sorted(_pipeline(recorder).run(range(100))) == [item * 2 for item in range(100)]
+
+
+def test_a_failure_stops_every_stage():
+    recorder = _Recorder(failing=10)
+    threads = threading.active_count()
+
+    with pytest.raises(ValueError):
+        list(_pipeline(recorder).run(range(1000)))
+    assert threading.active_count() == threads
+
+    read, written = len(recorder.read), len(recorder.written)
+    time.sleep(0.1)
+    # nothing is read or written after the error has been raised
+    assert (read, written) == (len(recorder.read), len(recorder.written))
+    assert read < 1000
+
+
+def test_closing_the_outputs_early_stops_every_stage():
+    recorder = _Recorder()
+    threads = threading.active_count()
+
+    outputs = _pipeline(recorder).run(range(1000))
+    next(outputs)
+    outputs.close()
+    assert threading.active_count() == threads
+    assert len(recorder.read) < 1000
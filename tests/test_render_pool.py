@@ -0,0 +1,29 @@
+import filecmp
+import os
+from src.benchmark import generate_corpus
+from src.tf_manual_doc_setup import TFManualDocSetup
+
+
+def _build(md_dir_path, html_dir_path, jobs, start_method=None):
+    # the manual setup holds the stats (and their lock) like a real build
+    doc_setup = TFManualDocSetup(md_dir_path, html_dir_path, jobs=jobs, incremental=False,
+                                 report_path=html_dir_path + '-report.json')
+    doc_setup.START_METHOD = start_method
+    doc_setup.run()
+
+
+def _html_files(dir_path):
+    return sorted(os.path.relpath(os.path.join(root, filename), dir_path)
+                  for root, _, filenames in os.walk(dir_path) for filename in filenames if filename.endswith('.html'))
+
+
+def test_spawn_pool_renders_like_one_process(tmp_path):
+    md_dir_path = str(tmp_path / 'md')
+    generate_corpus(md_dir_path, 30)
+    _build(md_dir_path, str(tmp_path / 'serial'), jobs=1)
+    _build(md_dir_path, str(tmp_path / 'spawn'), jobs=2, start_method='spawn')
+
+    files = _html_files(str(tmp_path / 'serial'))
+    assert files == _html_files(str(tmp_path / 'spawn'))
+    _, mismatch, errors = filecmp.cmpfiles(str(tmp_path / 'serial'), str(tmp_path / 'spawn'), files, shallow=False)
+    assert not mismatch and not errors
@@ -0,0 +1,124 @@
+import threading
+import time
+from src.instrument import BuildStats
+from src.scheduler import BatchScheduler, SlotBudget
+
+
+class _Activity:
+    """ Tracks how many downloads and render processes run at the same time."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.downloading = 0
+        self.rendering = 0
+        self.max_downloading = 0
+        self.max_rendering = 0
+        # a download happened while a version was rendering
+        self.overlap = False
+
+    def enter(self, stage, processes=1):
+        with self.lock:
+            if stage == 'prepare':
+                self.downloading += 1
+            else:
+                self.rendering += processes
+            self.max_downloading = max(self.max_downloading, self.downloading)
+            self.max_rendering = max(self.max_rendering, self.rendering)
+            self.overlap = self.overlap or (self.downloading > 0 and self.rendering > 0)
+
+    def leave(self, stage, processes=1):
+        with self.lock:
+            if stage == 'prepare':
+                self.downloading -= 1
+            else:
+                self.rendering -= processes
+
+
+class _FakeSetup:
+
+    def __init__(self, version, activity, jobs, seconds=0.05, fail=False):
+        self.version = version
+        self.activity = activity
+        self.jobs = jobs
+        self.seconds = seconds
+        self.fail = fail
+        self.stats = BuildStats()
+        self.report_path = None
+        self.html_dir_path = version
+
+    def prepare(self):
+        self.activity.enter('prepare')
+        time.sleep(self.seconds)
+        self.activity.leave('prepare')
+        if self.fail:
+            raise Exception('no such version')
+
+    def generate(self):
+        jobs = self.jobs
+        self.activity.enter('generate', jobs)
+        time.sleep(self.seconds * 2)
+        self.activity.leave('generate', jobs)
+
+    def _report_stats(self, stats, report_path):
+        pass
+
+
+class _FakeScheduler(BatchScheduler):
+
+    def __init__(self, versions, activity, failing=(), **kwargs):
+        super().__init__(versions, 'unused', isolated=False, **kwargs)
+        self.activity = activity
+        self.failing = failing
+
+    def _create_setup(self, version, python, options):
+        return _FakeSetup(version, self.activity, self.jobs, fail=version in self.failing)
+
+
+def test_downloads_overlap_rendering_within_the_limits():
+    activity = _Activity()
+    scheduler = _FakeScheduler(['v{0}'.format(index) for index in range(6)], activity, concurrency=4,
+                               network_slots=1, jobs=2, cpu_slots=4)
+    results = scheduler.run()
+
+    assert all(result['status'] for result in results)
+    assert [result['version'] for result in results] == scheduler.versions
+    assert activity.max_downloading == 1
+    # two versions of 2 jobs render at once, never more processes than the budget
+    assert activity.max_rendering == 4
+    assert activity.overlap
+
+
+def test_jobs_are_capped_by_the_cpu_budget():
+    activity = _Activity()
+    scheduler = _FakeScheduler(['v0', 'v1', 'v2'], activity, concurrency=3, network_slots=3, jobs=8, cpu_slots=3)
+    assert all(result['status'] for result in scheduler.run())
+    assert activity.max_downloading <= 3
+    assert activity.max_rendering == 3
+
+
+def test_a_failed_build_does_not_stop_the_others():
+    activity = _Activity()
+    scheduler = _FakeScheduler(['v0', 'v1', 'v2'], activity, failing=('v1',), concurrency=2, cpu_slots=2)
+    results = scheduler.run()
+
+    assert [result['status'] for result in results] == [True, False, True]
+    assert results[1]['stage'] == 'prepare'
+
+
+def test_slot_budget_waits_for_enough_free_slots():
+    budget = SlotBudget(3)
+    taken = []
+
+    def take():
+        with budget.take(2) as slots:
+            taken.append(slots)
+
+    with budget.take(2) as slots:
+        assert slots == 2
+        thread = threading.Thread(target=take)
+        thread.start()
+        thread.join(0.1)
+        # only one slot is free
+        assert not taken
+    thread.join(1)
+    assert taken == [2]
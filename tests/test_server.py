@@ -0,0 +1,54 @@
+import os
+import threading
+import urllib.error
+import urllib.request
+from src.benchmark import generate_corpus
+from src.server import DocRequestHandler, DocServer, ThreadingHTTPServer
+
+
+def _server(tmp_path):
+    md_dir_path = str(tmp_path / 'md')
+    generate_corpus(md_dir_path, 5)
+    server = DocServer(md_dir_path)
+    scans = []
+    plan_pages = server.doc_setup._plan_pages
+    server.doc_setup._plan_pages = lambda *args: scans.append(args) or plan_pages(*args)
+    return server, scans
+
+
+def test_unknown_pages_rescan_the_tree_once_per_interval(tmp_path):
+    server, scans = _server(tmp_path)
+    for _ in range(5):
+        assert server.page('favicon.html') is None
+    assert not scans
+
+    # a new page shows up once the interval has passed
+    with open(os.path.join(server.md_dir_path, 'new.md'), 'w') as f:
+        f.write('# New\n')
+    assert server.page('new.html') is None
+    server.scanned -= server.RESCAN_INTERVAL
+    assert server.page('new.html') is not None
+    assert server.page('favicon.html') is None
+    assert len(scans) == 1
+
+
+def test_pages_are_served_over_http(tmp_path):
+    server, _ = _server(tmp_path)
+    path = sorted(server.routes)[0]
+    handler = type('Handler', (DocRequestHandler,), {'doc_server': server, 'log_message': lambda *args: None})
+    httpd = ThreadingHTTPServer(('127.0.0.1', 0), handler)
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    try:
+        url = 'http://127.0.0.1:{0}/'.format(httpd.server_address[1])
+        with urllib.request.urlopen(url + path) as response:
+            assert response.status == 200
+            assert b'<h1>' in response.read()
+        try:
+            urllib.request.urlopen(url + 'missing.html')
+            assert False
+        except urllib.error.HTTPError as e:
+            assert e.code == 404
+    finally:
+        httpd.shutdown()
+        httpd.server_close()
@@ -0,0 +1,21 @@
+import os
+import pytest
+from src.benchmark import generate_corpus
+from src.tf_sharded_doc_setup import TFShardedDocSetup
+
+
+def test_merge_rejects_shards_rendered_from_other_sources(tmp_path):
+    md_dir_path = str(tmp_path / 'md')
+    generate_corpus(md_dir_path, 20)
+    doc_setup = TFShardedDocSetup(md_dir_path, str(tmp_path / 'work'))
+    doc_setup.plan(2)
+    for index in range(2):
+        doc_setup.render_shard(index)
+    doc_setup.merge(str(tmp_path / 'html'))
+
+    # e.g. the markdown tree of the merging machine has been generated again since the shards were rendered
+    source = sorted(doc_setup._load_plan()['pages'])[0]
+    with open(os.path.join(md_dir_path, source), 'a') as f:
+        f.write('\nchanged\n')
+    with pytest.raises(Exception, match='rendered from another'):
+        doc_setup.merge(str(tmp_path / 'html'))
@@ -0,0 +1,57 @@
+import sys
+import threading
+from src.tasks import RingBuffer, run_task, run_tasks
+
+
+def _python(code):
+    return [sys.executable, '-c', code]
+
+
+def test_run_task_spawns_a_child_and_reads_its_output():
+    output, status = run_task(_python('import sys; print("out"); sys.stderr.write("err\\n")'))
+    assert status
+    assert output.split() == ['out', 'err']
+
+
+def test_run_task_reports_a_failed_child():
+    output, status = run_task(_python('import sys; print("bad"); sys.exit(3)'))
+    assert not status
+    assert output.strip() == 'bad'
+
+
+def test_run_task_reports_a_missing_program():
+    _, status = run_task(['no-such-program-for-sure'])
+    assert not status
+
+
+def test_run_task_kills_a_child_after_the_timeout():
+    _, status = run_task(_python('import time; time.sleep(30)'), timeout=0.5)
+    assert not status
+
+
+def test_run_tasks_from_threads():
+    # the batch scheduler runs the tasks of every version on its own thread
+    results = {}
+
+    def run(index):
+        results[index] = run_tasks([_python('print({0} * {1})'.format(index, child)) for child in range(3)],
+                                   concurrency=2)
+
+    threads = [threading.Thread(target=run, args=(index,)) for index in range(3)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(60)
+
+    for index in range(3):
+        assert [result.status for result in results[index]] == [True] * 3
+        assert [int(result.output) for result in results[index]] == [index * child for child in range(3)]
+        assert [result.return_code for result in results[index]] == [0] * 3
+
+
+def test_ring_buffer_keeps_the_tail():
+    buffer = RingBuffer(4)
+    for chunk in (b'abc', b'def', b'g'):
+        buffer.write(chunk)
+    assert buffer.getvalue() == 'defg'
+    assert buffer.total == 7
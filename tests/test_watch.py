@@ -0,0 +1,36 @@
+import time
+from src import tf_manual_doc_setup
+from src.tf_manual_doc_setup import TFManualDocSetup
+
+
+class _Watcher:
+
+    def close(self):
+        pass
+
+
+def test_a_failed_update_keeps_watching(tmp_path, monkeypatch, caplog):
+    bursts = [(['a.md'], time.time()), (['a.md'], time.time())]
+
+    def wait_for_changes(watcher, debounce, is_watched):
+        if not bursts:
+            raise KeyboardInterrupt
+        return bursts.pop(0)
+
+    monkeypatch.setattr(tf_manual_doc_setup, 'create_watcher', lambda paths, interval: _Watcher())
+    monkeypatch.setattr(tf_manual_doc_setup, 'wait_for_changes', wait_for_changes)
+
+    doc_setup = TFManualDocSetup(str(tmp_path / 'md'), str(tmp_path / 'html'))
+    updates = []
+
+    def md_to_html(*args, **kwargs):
+        updates.append(kwargs)
+        if len(updates) == 1:
+            raise ValueError('a page saved halfway')
+
+    doc_setup.md_to_html = md_to_html
+    doc_setup.watch()
+    assert len(updates) == 2
+    # the retry does not reuse the renderer of the failed update
+    assert updates[0]['renderer'] is not updates[1]['renderer']
+    assert 'a page saved halfway' in caplog.text